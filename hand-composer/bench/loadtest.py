@@ -0,0 +1,449 @@
+# Load test for the quality classifier service (server.py): how many
+# performers can one instance carry?
+#
+# N simulated performers each stream a left hand (21x3 landmarks) at --fps,
+# paced on absolute deadlines like the demo's camera:
+#
+#   http  one POST /predict per frame; a frame that comes due while the
+#         previous request is still out is skipped (counted as dropped),
+#         exactly what the blocking demo client would do
+#   ws    binary /stream; frames are sent on time regardless, the server
+#         answers only the newest, latency is per answered frame
+#
+# Concurrency is stepped up (--clients 1,2,4,...) and each level reports
+# offered vs sustained throughput, latency p50/p95/p99, drop and error
+# rates and the load generator's own CPU use (in-process that includes the
+# server, since they share the process). A level is saturated when
+# throughput falls below 95% of offered, p99 exceeds --budget-ms (default
+# one frame period) or more than 1% of requests fail; the last level
+# before that is the saturation point.
+#
+# Targets:
+#   inproc       the ASGI app driven in this process, no sockets (default)
+#   spawn        `python -m server --workers N` per --workers x --backends combination
+#   http://h:p   an already running server
+#
+#   python -m bench.loadtest
+#   python -m bench.loadtest --protocol ws --backends numpy,torch
+#   python -m bench.loadtest --target spawn --workers 1,2,4 --backends numpy,torch --seconds 10
+#   python -m bench.loadtest --target http://localhost:8000 --replay take.hclm
+#
+# Landmarks are synthetic (bench/synthetic.py, one seed per performer) unless
+# --replay points at a recorded .hclm session. --no-cache turns off the
+# server's prediction cache / hysteresis so every frame reaches the model.
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from bench.synthetic import synthetic_session
+from classifier.protocol import RESULT_BYTES, pack_frame, unpack_result
+
+SATURATION_THROUGHPUT = 0.95
+SATURATION_ERRORS = 0.01
+
+
+# ---- landmarks ----
+def left_hands(n_clients, frames, replay=None):
+    """Per client (frames, 21, 3) float32 left hands."""
+    if replay:
+        from perception.recording import LandmarkRecording
+        _, _, _, xyz = LandmarkRecording(replay).as_arrays()
+        left = np.asarray(xyz[:, -1], dtype=np.float32)      # last row = left hand when two are tracked
+        # every performer plays the same take, started at a different point
+        return [np.roll(left, -(k * len(left) // max(1, n_clients)), axis=0) for k in range(n_clients)]
+    return [synthetic_session(frames, seed=k)[:, 1] for k in range(n_clients)]
+
+
+# ---- per-level accounting ----
+class LevelStats:
+    def __init__(self):
+        self.lat_ms = []
+        self.sent = 0
+        self.answered = 0
+        self.errors = 0
+        self.shed = 0             # errors that were 503s: the server refused quickly
+        self.dropped = 0
+        self.recording = False    # off during warmup
+
+    def summary(self, n_clients, fps, seconds, cpu_s, budget_ms):
+        offered = n_clients * fps
+        lat = np.asarray(self.lat_ms) if self.lat_ms else np.zeros(1)
+        p50, p95, p99 = (float(v) for v in np.percentile(lat, [50, 95, 99]))
+        throughput = self.answered / seconds
+        attempts = self.sent + self.errors
+        error_rate = self.errors / attempts if attempts else 0.0
+        out = {
+            "clients": n_clients,
+            "offered_hz": offered,
+            "throughput_hz": throughput,
+            "latency_p50_ms": p50,
+            "latency_p95_ms": p95,
+            "latency_p99_ms": p99,
+            "sent": self.sent,
+            "answered": self.answered,
+            "dropped_rate": self.dropped / max(1, self.sent + self.dropped),
+            "error_rate": error_rate,
+            "shed_rate": self.shed / attempts if attempts else 0.0,
+            "generator_cpu": cpu_s / seconds,
+        }
+        out["saturated"] = bool(throughput < SATURATION_THROUGHPUT * offered or p99 > budget_ms
+                                or error_rate > SATURATION_ERRORS)
+        return out
+
+
+# ---- clients ----
+async def http_client(post, frames, fps, start, end, stats):
+    """One performer on POST /predict, paced on absolute deadlines."""
+    period = 1.0 / fps
+    due = start
+    i = 0
+    while True:
+        now = time.perf_counter()
+        if now >= end:
+            return
+        if due > now:
+            await asyncio.sleep(due - now)
+        body = {"left21": frames[i % len(frames)].tolist()}
+        i += 1
+        t0 = time.perf_counter()
+        try:
+            r = await post("/predict", json=body)
+            ok = r.status_code == 200
+            shed = r.status_code == 503
+        except Exception:
+            ok = shed = False
+        t1 = time.perf_counter()
+        if stats.recording:
+            if ok:
+                stats.sent += 1
+                stats.answered += 1
+                stats.lat_ms.append((t1 - t0) * 1000.0)
+            else:
+                stats.errors += 1
+                stats.shed += shed
+        due += period
+        if t1 > due:        # frames that came due while we waited are never sent
+            missed = int((t1 - due) / period) + 1
+            due += missed * period
+            if stats.recording:
+                stats.dropped += missed
+
+
+async def ws_client(connect, frames, fps, start, end, stats):
+    """One performer on /stream: send every frame on time, match answers by seq."""
+    period = 1.0 / fps
+    sent_at = {}
+    try:
+        ws = await connect()
+    except Exception:
+        stats.errors += 1
+        return
+
+    async def receiver():
+        while True:
+            data = await ws.recv()
+            if not isinstance(data, bytes) or len(data) != RESULT_BYTES:
+                continue
+            seq, _ = unpack_result(data)
+            t0 = sent_at.pop(seq, None)
+            for s in [s for s in sent_at if s < seq]:
+                del sent_at[s]          # superseded on the server, never answered
+                if stats.recording:
+                    stats.dropped += 1
+            if t0 is not None and stats.recording:
+                stats.answered += 1
+                stats.lat_ms.append((time.perf_counter() - t0) * 1000.0)
+
+    rx = asyncio.create_task(receiver())
+    try:
+        due = start
+        seq = 0
+        while True:
+            now = time.perf_counter()
+            if now >= end:
+                break
+            if due > now:
+                await asyncio.sleep(due - now)
+            seq += 1
+            try:
+                await ws.send(pack_frame(seq, frames[seq % len(frames)]))
+                sent_at[seq] = time.perf_counter()
+                if stats.recording:
+                    stats.sent += 1
+            except Exception:
+                if stats.recording:
+                    stats.errors += 1
+                break
+            due += period
+        await asyncio.sleep(0.1)        # let the last answers arrive
+        if stats.recording:
+            stats.dropped += len(sent_at)
+    finally:
+        rx.cancel()
+        await ws.close()
+
+
+async def run_level(transport, hands, n_clients, args, on_record=None):
+    stats = LevelStats()
+    t_start = time.perf_counter() + 0.05
+    t_rec = t_start + args.warmup
+    t_end = t_rec + args.seconds
+    rng = np.random.default_rng(n_clients)
+    tasks = []
+    for k in range(n_clients):
+        start = t_start + rng.uniform(0, 1.0 / args.fps)   # performers aren't frame-locked
+        if args.protocol == "http":
+            tasks.append(http_client(transport.post, hands[k], args.fps, start, t_end, stats))
+        else:
+            tasks.append(ws_client(transport.connect, hands[k], args.fps, start, t_end, stats))
+
+    async def recorder():
+        await asyncio.sleep(max(0.0, t_rec - time.perf_counter()))
+        stats.recording = True
+        if on_record is not None:
+            on_record()
+        cpu = time.process_time()
+        await asyncio.sleep(max(0.0, t_end - time.perf_counter()))
+        return time.process_time() - cpu
+
+    cpu_s, *_ = await asyncio.gather(recorder(), *tasks)
+    return stats.summary(n_clients, args.fps, args.seconds, cpu_s, args.budget_ms)
+
+
+async def ramp(transport, args, server_stats=None):
+    """Step through args.clients; server_stats(reset) -> dict of server-side numbers (in-process only)."""
+    levels = []
+    hands = left_hands(max(args.clients), int(args.fps * (args.warmup + args.seconds + 1)), args.replay)
+    for n in args.clients:
+        level = await run_level(transport, hands, n, args,
+                                on_record=server_stats and (lambda: server_stats(reset=True)))
+        if server_stats is not None:
+            level.update(server_stats())
+        levels.append(level)
+        print(f"  {n:4d} clients: {level['throughput_hz']:8.1f} / {level['offered_hz']:.0f} Hz, "
+              f"p99 {level['latency_p99_ms']:7.2f} ms, err {level['error_rate'] * 100:.1f}%"
+              f"{'  SATURATED' if level['saturated'] else ''}", file=sys.stderr)
+        if level["saturated"] and not args.full:
+            break
+    ok = [lv["clients"] for lv in levels if not lv["saturated"]]
+    return {"levels": levels, "max_clients": max(ok) if ok else 0}
+
+
+# ---- transports ----
+class NetworkTransport:
+    def __init__(self, base, n_clients):
+        import httpx
+        self.base = base.rstrip("/")
+        self.client = httpx.AsyncClient(base_url=self.base, timeout=5.0,
+                                        limits=httpx.Limits(max_connections=n_clients))
+        self.post = self.client.post
+
+    async def connect(self):
+        from websockets.asyncio.client import connect
+        return await connect(self.base.replace("http", "ws", 1) + "/stream", compression=None)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+class _AsgiWebSocket:
+    """Minimal in-process ASGI websocket client (httpx's ASGITransport is HTTP only)."""
+    def __init__(self, app, path):
+        self._to_app = asyncio.Queue()
+        self._to_client = asyncio.Queue()
+        self._accepted = asyncio.Event()
+        scope = {"type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws", "path": path,
+                 "raw_path": path.encode(), "query_string": b"", "root_path": "", "headers": [],
+                 "client": ("127.0.0.1", 0), "server": ("inproc", 80), "subprotocols": []}
+        self._task = asyncio.create_task(app(scope, self._to_app.get, self._from_app))
+
+    async def _from_app(self, msg):
+        if msg["type"] == "websocket.accept":
+            self._accepted.set()
+        elif msg["type"] == "websocket.send":
+            await self._to_client.put(msg.get("bytes") or msg.get("text"))
+        elif msg["type"] == "websocket.close":
+            self._accepted.set()
+            await self._to_client.put(None)
+
+    async def start(self):
+        await self._to_app.put({"type": "websocket.connect"})
+        await self._accepted.wait()
+        return self
+
+    async def send(self, data):
+        await self._to_app.put({"type": "websocket.receive", "bytes": data})
+
+    async def recv(self):
+        msg = await self._to_client.get()
+        if msg is None:
+            raise ConnectionError("closed")
+        return msg
+
+    async def close(self):
+        await self._to_app.put({"type": "websocket.disconnect", "code": 1000})
+        try:
+            await asyncio.wait_for(self._task, 1.0)
+        except Exception:
+            self._task.cancel()
+
+
+class InProcessTransport:
+    def __init__(self, app):
+        import httpx
+        self.app = app
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://inproc")
+        self.post = self.client.post
+
+    async def connect(self):
+        return await _AsgiWebSocket(self.app, "/stream").start()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+# ---- targets ----
+def _server_env(args, backend):
+    env = dict(os.environ, HC_BACKEND=backend)
+    if args.no_cache:
+        env.update(HC_CACHE_SIZE="0", HC_HYSTERESIS="0")
+    return env
+
+
+async def inproc_levels(args):
+    """Runs in a child process whose HC_* env selects the backend (server.py reads it at import)."""
+    import server
+    app = server.app
+    async with app.router.lifespan_context(app):
+        while not server.backend_ready.is_set():      # measure the configured backend, not the interim one
+            await asyncio.sleep(0.05)
+        transport = InProcessTransport(app)
+
+        def server_side(reset=False):
+            hist = server.batcher.batch_size_hist
+            if reset:
+                hist.reset()
+                return {}
+            return {"batch_mean": hist.snapshot()["mean"]}
+        try:
+            return await ramp(transport, args, server_side)
+        finally:
+            await transport.aclose()
+
+
+def run_inproc(args, backend):
+    cmd = [sys.executable, "-m", "bench.loadtest", "--child", *args.passthrough]
+    proc = subprocess.run(cmd, env=_server_env(args, backend), stdout=subprocess.PIPE, text=True)
+    if proc.returncode:
+        raise RuntimeError(f"in-process run for {backend} failed ({proc.returncode})")
+    return json.loads(proc.stdout.strip().splitlines()[-1])   # server.py may print above it
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(base, timeout=90.0):
+    import requests
+    end = time.perf_counter() + timeout
+    while time.perf_counter() < end:
+        try:
+            if requests.get(base + "/stats", timeout=0.5).json().get("backend_ready"):
+                return True
+        except (requests.RequestException, ValueError):
+            pass
+        time.sleep(0.1)
+    return False
+
+
+async def network_levels(base, args):
+    transport = NetworkTransport(base, max(args.clients))
+    try:
+        return await ramp(transport, args)
+    finally:
+        await transport.aclose()
+
+
+def run_spawned(args, workers, backend):
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    proc = subprocess.Popen([sys.executable, "-m", "server", "--port", str(port),
+                             "--workers", str(workers), "--log-level", "warning"],
+                            env=_server_env(args, backend))
+    try:
+        if not _wait_ready(base):
+            raise RuntimeError("server did not come up")
+        time.sleep(0.5 * workers)      # /stats answered by one worker; give the others a moment
+        return asyncio.run(network_levels(base, args))
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="concurrent load test for the quality classifier service")
+    p.add_argument("--target", default="inproc", help="inproc | spawn | http://host:port")
+    p.add_argument("--protocol", choices=("http", "ws"), default="http")
+    p.add_argument("--clients", default="1,2,4,8,16,32,64,128,256", help="concurrency levels to step through")
+    p.add_argument("--fps", type=float, default=30.0, help="frames per second per performer")
+    p.add_argument("--seconds", type=float, default=5.0, help="measured time per level")
+    p.add_argument("--warmup", type=float, default=1.0, help="unmeasured ramp-in per level")
+    p.add_argument("--budget-ms", type=float, help="p99 latency budget (default: one frame period)")
+    p.add_argument("--backends", default=None, help="comma-separated (default: $HC_BACKEND or numpy)")
+    p.add_argument("--workers", default="1", help="server process counts for --target spawn")
+    p.add_argument("--replay", help="recorded .hclm session to take left hands from")
+    p.add_argument("--no-cache", action="store_true", help="server cache / hysteresis off")
+    p.add_argument("--full", action="store_true", help="keep stepping after saturation")
+    p.add_argument("--out", help="also write the JSON report here")
+    p.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = p.parse_args(argv)
+    args.passthrough = [a for a in (argv if argv is not None else sys.argv[1:]) if a != "--child"]
+    args.clients = [int(c) for c in args.clients.split(",")]
+    args.workers = [int(w) for w in args.workers.split(",")]
+    args.backends = (args.backends or os.getenv("HC_BACKEND", "numpy")).split(",")
+    if args.budget_ms is None:
+        args.budget_ms = 1000.0 / args.fps
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.child:
+        print(json.dumps(asyncio.run(inproc_levels(args))))
+        return
+
+    report = {"benchmark": "loadtest", "target": args.target, "protocol": args.protocol, "fps": args.fps,
+              "budget_ms": args.budget_ms, "cache": not args.no_cache, "cpus": os.cpu_count(), "runs": []}
+    if args.target.startswith("http"):
+        print(f"[loadtest] {args.target}", file=sys.stderr)
+        report["runs"].append({"server": args.target, **asyncio.run(network_levels(args.target, args))})
+    else:
+        for backend in args.backends:
+            for workers in (args.workers if args.target == "spawn" else [1]):
+                print(f"[loadtest] {args.target}: backend={backend} workers={workers}", file=sys.stderr)
+                if args.target == "spawn":
+                    result = run_spawned(args, workers, backend)
+                else:
+                    result = run_inproc(args, backend)
+                report["runs"].append({"backend": backend, "workers": workers, **result})
+    report["saturation"] = {(f"{r['backend']}/w{r['workers']}" if "backend" in r else r["server"]): r["max_clients"]
+                            for r in report["runs"]}
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
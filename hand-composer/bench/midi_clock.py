@@ -0,0 +1,153 @@
+# Tick jitter / drift of the MIDI clock over a long run.
+#
+# Runs MidiEngine(threaded=True) with its clock on an in-memory port (or a
+# real virtual port with --port) for --seconds, while chords are played at
+# random times with quantize on, then checks from the timestamped port log:
+#   - tick jitter: each 0xF8 against the ideal grid origin + n * 60/(bpm*24)
+#     (std-dev, p99, max), and the drift of the last tick
+#   - quantization: every note-on lands on a beat tick
+#   - lateness of everything the writer thread sent vs its target time
+# --tempo-sweep picks a new tempo every few seconds and wobbles it on every
+# chord, like the demo's hand-distance tempo (then only lateness and
+# quantization are checked, the grid isn't a single line any more).
+# Exits 1 if any note-on is off the quantize grid, or (fixed tempo) if
+# tick jitter or drift is over --max-jitter-ms / --max-drift-ms.
+#
+#   python -m bench.midi_clock [--seconds 180] [--bpm 120] [--load] [--tempo-sweep]
+
+import argparse
+import json
+import threading
+import time
+
+import numpy as np
+
+from bench.synthetic import synthetic_session
+from music.chord_table import default_table
+from music.clock import CLOCK, GRID, PPQN
+from music.midi_engine import MidiEngine
+from music.midi_output import LoopbackPort
+from common.features import HandFeatures
+
+
+def busy(stop):
+    """Keep the interpreter busy like the demo's perception/control threads do."""
+    frames = synthetic_session(300)
+    while not stop.is_set():
+        for hands in frames:
+            HandFeatures.from_hands(hands)
+
+
+def tick_stats(times, period):
+    """Residuals of tick times against the best grid with the nominal period."""
+    n = np.arange(len(times))
+    ideal = times[0] + n * period
+    err = (times - ideal) * 1000.0
+    err -= np.median(err)       # constant offset (lookahead / first-tick latency) isn't jitter
+    return {
+        "ticks": int(len(times)),
+        "jitter_ms": float(err.std()),
+        "abs_p99_ms": float(np.percentile(np.abs(err), 99)),
+        "abs_max_ms": float(np.abs(err).max()),
+        "drift_ms": float(err[-1] - err[0]),
+        "interval_std_ms": float(np.diff(times).std() * 1000.0),
+    }
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="MIDI clock jitter / drift")
+    p.add_argument("--seconds", type=float, default=180.0)
+    p.add_argument("--bpm", type=float, default=120.0)
+    p.add_argument("--quantize", default="beat", choices=list(GRID))
+    p.add_argument("--chords-per-s", type=float, default=3.0)
+    p.add_argument("--tempo-sweep", action="store_true", help="new tempo (80..140) every 5 s")
+    p.add_argument("--load", action="store_true", help="run a busy numpy thread alongside")
+    p.add_argument("--max-jitter-ms", type=float, default=2.0,
+                   help="fail if the tick jitter (std-dev vs the ideal grid) is above this; 0 = don't check")
+    p.add_argument("--max-drift-ms", type=float, default=5.0,
+                   help="fail if the last tick drifted more than this from the grid; 0 = don't check")
+    p.add_argument("--port", help="mido virtual output port name instead of the in-memory port")
+    p.add_argument("--out", help="write the JSON report here (default: stdout)")
+    args = p.parse_args(argv)
+
+    port = LoopbackPort(maxlen=2_000_000)
+    if args.port:
+        import mido
+        real = mido.open_output(args.port, virtual=True)
+        write = real._rt.send_message if hasattr(real, "_rt") else (lambda data: real.send(mido.Message.from_bytes(data)))
+        class Tee(LoopbackPort):
+            def send_raw(self, data):
+                write(data)
+                super().send_raw(data)
+        port = Tee(maxlen=2_000_000)
+
+    synth = MidiEngine(output=port, threaded=True)
+    clock = synth.start_clock(args.bpm, args.quantize)
+    stop = threading.Event()
+    loader = threading.Thread(target=busy, args=(stop,), daemon=True) if args.load else None
+    if loader:
+        loader.start()
+
+    table = default_table()
+    rng = np.random.default_rng(0)
+    end = time.perf_counter() + args.seconds
+    next_tempo = time.perf_counter() + 5.0
+    target = args.bpm
+    while time.perf_counter() < end:
+        time.sleep(rng.exponential(1.0 / args.chords_per_s))
+        synth.play_chord_id(table, table.chord_id(int(rng.integers(48, 72)), ["min", "maj", "7"][rng.integers(3)]), 90)
+        if args.tempo_sweep:
+            if time.perf_counter() > next_tempo:
+                target = float(rng.integers(80, 141))
+                next_tempo += 5.0
+            clock.set_bpm(target + float(rng.integers(-3, 4)))
+    stop.set()
+    clock_stats = clock.stats()
+    synth.tx.flush(1.0)
+    tx_stats = synth.tx.stats()
+    synth.stop()
+
+    log = list(port.log)
+    ticks = np.array([t for t, data in log if data == CLOCK])
+    tick_idx = {t: k for k, t in enumerate(ticks)}
+    # quantization: note-ons should follow a tick whose index is on the grid
+    grid = GRID[args.quantize]
+    off_grid, late_us, last_tick = 0, [], None
+    note_ons = 0
+    for t, data in log:
+        if data == CLOCK:
+            last_tick = t
+        elif data[0] & 0xF0 == 0x90 and data[2] > 0 and last_tick is not None:
+            note_ons += 1
+            if tick_idx[last_tick] % grid:
+                off_grid += 1
+            late_us.append((t - last_tick) * 1e6)
+
+    report = {"benchmark": "midi_clock", "seconds": args.seconds, "bpm": args.bpm, "ppqn": PPQN,
+              "load": args.load, "tempo_sweep": args.tempo_sweep, "clock": clock_stats,
+              "writer": tx_stats,
+              "quantize": {"grid": args.quantize, "note_ons": note_ons, "off_grid": off_grid,
+                           "after_tick_p99_us": float(np.percentile(late_us, 99)) if late_us else None}}
+    if not args.tempo_sweep and len(ticks) > 2:
+        report["ticks"] = tick_stats(ticks, 60.0 / (args.bpm * PPQN))
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    failed = []
+    if off_grid:
+        failed.append(f"{off_grid}/{note_ons} quantized note-ons off the {args.quantize} grid")
+    ticks_report = report.get("ticks")
+    if ticks_report is not None:
+        if args.max_jitter_ms and ticks_report["jitter_ms"] > args.max_jitter_ms:
+            failed.append(f"tick jitter {ticks_report['jitter_ms']:.3f} ms > {args.max_jitter_ms} ms")
+        if args.max_drift_ms and abs(ticks_report["drift_ms"]) > args.max_drift_ms:
+            failed.append(f"drift {ticks_report['drift_ms']:.3f} ms > {args.max_drift_ms} ms")
+    if failed:
+        raise SystemExit("FAIL: " + "; ".join(failed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# Send latency / jitter of MidiOutputThread against an in-memory port.
+#
+#   python -m bench.midi_output --events 2000 --interval-ms 5
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from music.midi_output import LoopbackPort, MidiOutputThread
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="MIDI output thread jitter")
+    p.add_argument("--events", type=int, default=2000)
+    p.add_argument("--interval-ms", type=float, default=5.0)
+    p.add_argument("--out", help="write the JSON report here (default: stdout)")
+    args = p.parse_args(argv)
+
+    port = LoopbackPort()
+    tx = MidiOutputThread(port)
+    period = args.interval_ms / 1000.0
+    t0 = time.perf_counter() + 0.05
+    targets = t0 + period * np.arange(args.events)
+    for i, t in enumerate(targets):
+        # post a little ahead of time, like a scheduler would
+        while time.perf_counter() < t - 0.002:
+            time.sleep(0.0005)
+        tx.set_chord((60 + i % 12, 64 + i % 12), 90, at=float(t))
+    tx.flush(2.0)
+    tx.close()
+
+    report = {"benchmark": "midi_output", "events": args.events,
+              "interval_ms": args.interval_ms, **tx.stats()}
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
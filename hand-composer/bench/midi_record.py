@@ -0,0 +1,104 @@
+# Cost of recording a performance, and speed of the offline export.
+#
+# record: --minutes of a synthetic performance (30 fps landmarks + the
+#         chord changes the mapping chain makes of them) are pushed into
+#         MidiRecorder --speed times faster than real time. Reports the
+#         per-call cost on the producer side (what the control / perception
+#         threads pay), drops, peak queue depth and memory growth.
+# export: the recorded .hclm sidecar through music.export back into MIDI,
+#         as a multiple of real time.
+#
+#   python -m bench.midi_record [--minutes 10] [--speed 50]
+
+import argparse
+import json
+import os
+import resource
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from bench.synthetic import synthetic_session
+from music.chord_table import default_table
+from music.export import export_session
+from music.offline import Session, render
+from music.recorder import MidiRecorder
+from music.smf import read_smf
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="MIDI/landmark recorder + offline export benchmark")
+    p.add_argument("--minutes", type=float, default=10.0)
+    p.add_argument("--speed", type=float, default=50.0, help="how much faster than real time to feed the recorder")
+    p.add_argument("--fps", type=float, default=30.0)
+    args = p.parse_args(argv)
+
+    frames = int(args.minutes * 60 * args.fps)
+    block = synthetic_session(min(frames, 9000), args.fps)     # looped: memory stays about the recorder
+    t = np.arange(frames) / args.fps
+    idx = np.arange(frames) % len(block)
+    r = render(Session(t, np.full(frames, block.shape[1]), block[idx]))
+    cids, vel = r["cid"], r["velocity"]
+    table = default_table()
+    changes = set(np.flatnonzero(np.diff(cids, prepend=cids[0] - 1)).tolist())
+    handedness = ["right", "left"]
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        mid, hclm = os.path.join(tmpdir, "take.mid"), os.path.join(tmpdir, "take.hclm")
+        tracemalloc.start()
+        rss0 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        rec = MidiRecorder(mid, landmarks=hclm)
+        cost_us, depth, prev = [], 0, None
+        start = time.perf_counter()
+        for i in range(frames):
+            due = start + t[i] / args.speed
+            while time.perf_counter() < due:
+                time.sleep(0.0002)
+            ts = rec.t0 + t[i]
+            c0 = time.perf_counter()
+            rec.append(block[idx[i]], handedness, t=ts)
+            if i in changes:
+                cid = int(cids[i])
+                on, off = (table.notes(cid), ()) if prev is None else table.diff(prev, cid)
+                for n in on:
+                    rec.midi(bytes((0x90, n, int(vel[i]))), t=ts)
+                for n in off:
+                    rec.midi(bytes((0x80, n, 0)), t=ts)
+                prev = cid
+            cost_us.append((time.perf_counter() - c0) * 1e6)
+            if i % 256 == 0:
+                depth = max(depth, rec.stats()["queued"])
+        fed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rec.close()
+        stats = rec.stats()
+        _, events = read_smf(mid)
+        cost = np.asarray(cost_us)
+        report = {
+            "benchmark": "midi_record", "minutes": args.minutes, "speed": args.speed, "frames": frames,
+            "record": {
+                "wall_s": fed,
+                "call_us_p50": float(np.percentile(cost, 50)),
+                "call_us_p99": float(np.percentile(cost, 99)),
+                "call_us_max": float(cost.max()),
+                "events_written": len(events),
+                "frames_written": stats["frames"],
+                "dropped": stats["dropped"],
+                "peak_queue": depth,
+                "python_peak_mb": peak / 1e6,
+                "rss_growth_mb": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss0) / 1024.0,
+                "mid_kb": os.path.getsize(mid) / 1024.0,
+                "hclm_mb": os.path.getsize(hclm) / 1e6,
+            },
+            "export": export_session(hclm, os.path.join(tmpdir, "export.mid")),
+        }
+    report["export"].pop("source")
+    report["export"].pop("out")
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
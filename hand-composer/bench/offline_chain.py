@@ -0,0 +1,82 @@
+# Offline mapping chain (music/offline.py) vs running the live chain frame
+# by frame, and how a parameter sweep scales with processes.
+#
+#   live     RootSmoother / left_pose_quality / velocity / tempo / ChordTable
+#            per frame, exactly as the demo's control loop calls them
+#   offline  render() on the whole timeline; must give the same chords,
+#            velocities and tempi (mismatches are reported)
+#   sweep    a grid of spread thresholds x smoother settings, for 1 and
+#            --workers processes
+#
+#   python -m bench.offline_chain [--minutes 10] [--workers 4]
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from bench.synthetic import synthetic_session
+from music.chord_mapper import left_pose_quality, tempo_from_distance, velocity_from_spread
+from music.chord_table import default_table
+from music.offline import ChainParams, Session, grid, parse_set, render, sweep
+from music.smoothing import RootSmoother, ROOT_SMOOTHING
+from common.features import EMPTY, HandFeatures
+
+
+def live_chain(t, n, xyz):
+    table = default_table()
+    smoother = RootSmoother(**ROOT_SMOOTHING)
+    cid, vel, bpm = (np.empty(len(t), dtype=np.int64) for _ in range(3))
+    for i in range(len(t)):
+        k = int(n[i])
+        f = HandFeatures.from_hands(xyz[i, :k]) if k else EMPTY
+        root = smoother.update(f, int(t[i] * 1000))
+        cid[i] = table.chord_id(root, left_pose_quality(f))
+        vel[i] = velocity_from_spread(f)
+        bpm[i] = tempo_from_distance(f)
+    return cid, vel, bpm
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="offline mapping chain benchmark")
+    p.add_argument("--minutes", type=float, default=10.0)
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = p.parse_args(argv)
+
+    frames = int(args.minutes * 60 * 30)
+    xyz = synthetic_session(frames, seed=1, noise=0.004)
+    t = np.arange(frames) / 30.0
+    n = np.random.default_rng(1).choice([0, 1, 2, 2, 2, 2, 2, 2], frames)   # hands drop in and out
+
+    t0 = time.perf_counter()
+    cid, vel, bpm = live_chain(t, n, xyz)
+    live_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    session = Session(t, n, xyz)
+    r = render(session)
+    offline_s = time.perf_counter() - t0
+
+    sets = [parse_set("spread_lo=0.05:0.08:4"), parse_set("spread_hi=0.09:0.13:3"),
+            parse_set("alpha=0.2,0.35,0.5"), parse_set("adaptive=true,false"), parse_set("max_step_semi=1,2")]
+    combos = list(grid(ChainParams(), sets))
+    timings = {}
+    for w in sorted({1, args.workers}):
+        t0 = time.perf_counter()
+        sweep([Session(t, n, xyz)], combos, workers=w)
+        timings[w] = time.perf_counter() - t0
+
+    print(json.dumps({
+        "benchmark": "offline_chain", "frames": frames, "minutes": args.minutes, "cpus": os.cpu_count(),
+        "live_s": live_s, "offline_s": offline_s, "speedup": live_s / offline_s,
+        "mismatch": {"cid": int((cid != r["cid"]).sum()), "velocity": int((vel != r["velocity"]).sum()),
+                     "bpm": int((bpm != r["bpm"]).sum())},
+        "sweep": {"combinations": len(combos),
+                  "seconds_by_workers": timings,
+                  "frames_per_s_by_workers": {w: frames * len(combos) / s for w, s in timings.items()}},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# PerceptionPool with replayed performers: per-performer throughput,
+# capture -> parent latency, and a check that every landmark row that came
+# back through shared memory matches the recording it was replayed from.
+#
+#   python -m bench.perception_pool --performers 4 --frames 600
+#   python -m bench.perception_pool --spec camera:0@left --spec camera:0@right --seconds 10
+#
+# Synthetic sessions are written to a temp dir unless --spec is given.
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from bench.synthetic import synthetic_session
+from perception.pool import PerceptionPool, PerformerSpec
+from perception.recording import LandmarkRecorder, LandmarkRecording
+
+
+def write_sessions(n, frames, fps, tmpdir):
+    paths = []
+    for i in range(n):
+        path = os.path.join(tmpdir, f"performer{i}.hclm")
+        rec = LandmarkRecorder(path)
+        for k, hands in enumerate(synthetic_session(frames, fps, seed=i)):
+            rec.append(hands, ["right", "left"], t=k / fps)
+        rec.close()
+        paths.append(path)
+    return paths
+
+
+def run(specs, seconds, references=None):
+    pool = PerceptionPool(specs).start()
+    try:
+        pool.wait_ready()
+        lat = [[] for _ in specs]
+        mismatches = 0
+        checked = 0
+        t0 = time.perf_counter()
+        end = t0 + seconds
+        while pool.running and time.perf_counter() < end:
+            got = pool.poll()
+            now = time.perf_counter()
+            for i, ts, hands, _ in got:
+                lat[i].append((now - ts) * 1000.0)
+                if references is not None and hands is not None:
+                    # replayed rows are exact copies of recorded rows, so find it by value
+                    checked += 1
+                    if not (references[i] == hands[0]).all(axis=(1, 2)).any():
+                        mismatches += 1
+            if not got:
+                time.sleep(0.0005)
+        wall = time.perf_counter() - t0
+        stats = pool.stats()
+    finally:
+        pool.close()
+    for s, l in zip(stats, lat):
+        s["observed"] = len(l)
+        s["rate_hz"] = s["frames"] / wall
+        if l:
+            s["latency_p50_ms"], s["latency_p99_ms"] = (float(v) for v in np.percentile(l, [50, 99]))
+    return {"wall_s": wall, "frames_total": sum(s["frames"] for s in stats),
+            "checked_rows": checked, "mismatched_rows": mismatches, "performers": stats}
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="multi-process perception benchmark")
+    p.add_argument("--performers", type=int, default=2, help="replayed performers (ignored with --spec)")
+    p.add_argument("--frames", type=int, default=600)
+    p.add_argument("--fps", type=float, default=30.0)
+    p.add_argument("--fast", action="store_true", help="replay as fast as possible instead of real time")
+    p.add_argument("--spec", action="append", help="performer spec, e.g. camera:0@left (repeatable)")
+    p.add_argument("--seconds", type=float, default=60.0, help="time limit")
+    args = p.parse_args(argv)
+
+    report = {"benchmark": "perception_pool", "cpus": os.cpu_count()}
+    if args.spec:
+        specs = [PerformerSpec.parse(s, channel=i) for i, s in enumerate(args.spec)]
+        report.update(run(specs, args.seconds))
+    else:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            paths = write_sessions(args.performers, args.frames, args.fps, tmpdir)
+            specs = [PerformerSpec("replay", path, channel=i, realtime=not args.fast)
+                     for i, path in enumerate(paths)]
+            refs = [np.array(LandmarkRecording(path).as_arrays()[3][:, 0]) for path in paths]
+            report.update(run(specs, args.seconds, refs))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
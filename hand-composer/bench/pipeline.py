@@ -0,0 +1,293 @@
+# Headless gesture-to-MIDI benchmark.
+#
+# Runs the control path of demo/run.py frame by frame on synthetic or
+# recorded landmarks with a NullOutput MIDI sink and reports, per stage
+# and for the whole path: p50/p95/p99 latency, frames/sec and allocations
+# per frame. Output is JSON so runs can be diffed between commits:
+#
+#   python -m bench.pipeline --out before.json
+#   ... change code ...
+#   python -m bench.pipeline --out after.json --compare before.json
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from bench.synthetic import synthetic_session
+from music.chord_mapper import (
+    left_pose_quality, chord_from, voice_chord,
+    velocity_from_spread, tempo_from_distance, label_chord,
+)
+from music.chord_table import ChordTable
+from music.midi_engine import MidiEngine, NullOutput
+from music.smoothing import RootSmoother
+from common.features import HandFeatures
+
+
+def load_frames(args):
+    if args.replay:
+        from perception.recording import LandmarkRecording
+        rec = LandmarkRecording(args.replay)
+        frames = [rec.hands(i)[0] for i in range(len(rec))]
+        return frames[:args.frames] if args.frames else frames
+    session = synthetic_session(args.frames or 3000, seed=args.seed)
+    return list(session)
+
+
+def make_classifier(kind, url, backend="torch", cache=False):
+    """-> callable(hands) -> quality string"""
+    if kind == "pose":
+        return left_pose_quality
+    if kind == "http":
+        from perception.quality_client import HttpQualityClient
+        if cache:
+            from classifier.cache import PredictionCache, Hysteresis
+            client = HttpQualityClient(url, cache=PredictionCache(), hysteresis=Hysteresis())
+        else:
+            client = HttpQualityClient(url)
+        def remote(hands):
+            if hands is None or hands.shape[0] < 2:
+                return "maj"
+            return client.predict(hands[1])
+        return remote
+    if kind == "model":
+        # in-process SimpleMLP, no HTTP
+        from classifier.backends import make_backend
+        from classifier.protocol import QUALITY
+        model = make_backend(backend, warmup=True)
+        if cache:
+            from classifier.cache import PredictionCache, Hysteresis
+            lru, hyst = PredictionCache(), Hysteresis()
+            def cached(hands):
+                if hands is None or hands.shape[0] < 2:
+                    return "maj"
+                norm, key = lru.key(hands[1])
+                idx = hyst.check(norm)
+                if idx is not None:
+                    return QUALITY[idx]     # reference pose stays where the last real answer was
+                idx = lru.get(key)
+                if idx is None:
+                    idx = int(model.predict(hands[1].reshape(1, 63))[0])
+                    lru.put(key, idx)
+                hyst.update(norm, idx)
+                return QUALITY[idx]
+            cached.cache_stats = lambda: {**lru.stats(), "hysteresis_skips": hyst.skips}
+            return cached
+        def local(hands):
+            if hands is None or hands.shape[0] < 2:
+                return "maj"
+            return QUALITY[int(model.predict(hands[1].reshape(1, 63))[0])]
+        return local
+    raise ValueError(f"unknown classifier: {kind}")
+
+
+class State:
+    """Per-frame values threaded through the stages."""
+    __slots__ = ("hands", "feats", "now_ms", "root", "qual", "notes", "chord", "velo", "bpm", "label", "last_notes")
+
+
+def build_stages(classify, chords="table"):
+    smoother = RootSmoother(low=48, high=72, alpha=0.35, deadband_semi=0.5, max_step_semi=1, min_interval_ms=100)
+    engine = MidiEngine(output=NullOutput())
+    table = ChordTable(low=48, high=72)
+
+    def features(st):     st.feats = HandFeatures.from_hands(st.hands)
+    def smooth(st):       st.root = smoother.update(st.feats, st.now_ms)
+    def classifier(st):   st.qual = classify(st.feats if classify is left_pose_quality else st.hands)
+    def chord(st):        st.notes = chord_from(st.root, st.qual)
+    def voicing(st):      st.notes = voice_chord(st.notes, low=48, high=72)
+    def velocity(st):     st.velo = velocity_from_spread(st.feats)
+    def tempo(st):        st.bpm = tempo_from_distance(st.feats)
+    def label(st):        st.label = label_chord(st.notes)
+    def play(st):
+        if st.notes != st.last_notes:
+            engine.play_chord(st.notes, st.velo)
+            st.last_notes = st.notes
+
+    def lookup(st):       st.chord = table.chord_id(st.root, st.qual)
+    def table_label(st):  st.label = table.label(st.chord)
+    def table_play(st):
+        if st.chord != st.last_notes:
+            engine.play_chord_id(table, st.chord, st.velo)
+            st.last_notes = st.chord
+
+    if chords == "legacy":
+        chord_stages = [("chord_from", chord), ("voice_chord", voicing)]
+        tail = [("label_chord", label), ("play_chord", play)]
+    else:
+        chord_stages = [("chord_lookup", lookup)]
+        tail = [("label_chord", table_label), ("play_chord", table_play)]
+    stages = [
+        ("hand_features", features),
+        ("root_smoother", smooth),
+        ("classifier", classifier),
+        *chord_stages,
+        ("velocity_from_spread", velocity),
+        ("tempo_from_distance", tempo),
+        *tail,
+    ]
+    return stages, engine
+
+
+def _new_state():
+    st = State()
+    st.last_notes = []
+    return st
+
+
+def time_stages(frames, stages, fps=30.0):
+    n, k = len(frames), len(stages)
+    ns = np.empty((n, k), dtype=np.int64)
+    total = np.empty(n, dtype=np.int64)
+    st = _new_state()
+    clock = time.perf_counter_ns
+    t_wall = clock()
+    for i, hands in enumerate(frames):
+        st.hands = hands
+        st.now_ms = int(i * 1000.0 / fps)   # simulated camera clock
+        t_frame = clock()
+        for j, (_, fn) in enumerate(stages):
+            t0 = clock()
+            fn(st)
+            ns[i, j] = clock() - t0
+        total[i] = clock() - t_frame
+    wall_s = (clock() - t_wall) / 1e9
+    return ns, total, wall_s
+
+
+def measure_allocations(frames, stages, fps=30.0):
+    """
+    Separate pass under tracemalloc (it slows everything down, so it never
+    overlaps the timing pass). Per stage and frame:
+      alloc_bytes  - transient high-water mark above the pre-call level
+      alloc_blocks - net memory blocks still alive after the call
+    """
+    k = len(stages)
+    peak_bytes = np.zeros(k, dtype=np.int64)
+    net_blocks = np.zeros(k, dtype=np.int64)
+    st = _new_state()
+    tracemalloc.start()
+    try:
+        for i, hands in enumerate(frames):
+            st.hands = hands
+            st.now_ms = int(i * 1000.0 / fps)
+            for j, (_, fn) in enumerate(stages):
+                before, _ = tracemalloc.get_traced_memory()
+                blocks = sys.getallocatedblocks()
+                tracemalloc.reset_peak()
+                fn(st)
+                _, peak = tracemalloc.get_traced_memory()
+                peak_bytes[j] += peak - before
+                net_blocks[j] += sys.getallocatedblocks() - blocks
+    finally:
+        tracemalloc.stop()
+    n = max(1, len(frames))
+    return peak_bytes / n, net_blocks / n
+
+
+def _summary(ns_col):
+    us = ns_col / 1000.0
+    p50, p95, p99 = np.percentile(us, [50, 95, 99])
+    return {
+        "p50_us": float(p50), "p95_us": float(p95), "p99_us": float(p99),
+        "mean_us": float(us.mean()), "max_us": float(us.max()),
+    }
+
+
+def _git_rev():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def run(args):
+    frames = load_frames(args)
+    classify = make_classifier(args.classifier, args.url, args.backend, args.cache)
+    stages, engine = build_stages(classify, args.chords)
+
+    # warm up caches / lazy imports / first-call costs
+    time_stages(frames[:min(len(frames), 200)], stages)
+    stages, engine = build_stages(classify, args.chords)
+
+    ns, total, wall_s = time_stages(frames, stages)
+    alloc_bytes, alloc_blocks = measure_allocations(frames, build_stages(classify, args.chords)[0])
+
+    report = {
+        "benchmark": "gesture_to_midi",
+        "git": _git_rev(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "source": args.replay or f"synthetic(seed={args.seed})",
+        "classifier": args.classifier,
+        "chords": args.chords,
+        "cache": args.cache,
+        "frames": len(frames),
+        "midi_messages": engine.out.sent,
+        "stages": {},
+    }
+    for j, (name, _) in enumerate(stages):
+        s = _summary(ns[:, j])
+        s["alloc_bytes_per_frame"] = float(alloc_bytes[j])
+        s["alloc_blocks_per_frame"] = float(alloc_blocks[j])
+        report["stages"][name] = s
+    report["total"] = _summary(total)
+    report["total"]["alloc_bytes_per_frame"] = float(alloc_bytes.sum())
+    report["total"]["fps"] = len(frames) / wall_s
+    if hasattr(classify, "cache_stats"):
+        report["cache_stats"] = classify.cache_stats()
+    return report
+
+
+def compare(new, old):
+    """Print a per-stage p50/p99 diff table of two reports."""
+    print(f"{'stage':24s} {'p50 old':>9s} {'p50 new':>9s} {'p99 old':>9s} {'p99 new':>9s}  change")
+    names = list(new["stages"]) + ["total"]
+    for name in names:
+        a = old["stages"].get(name) if name != "total" else old.get("total")
+        b = new["stages"][name] if name != "total" else new["total"]
+        if not a:
+            continue
+        change = (b["p50_us"] / a["p50_us"] - 1.0) * 100.0 if a["p50_us"] else 0.0
+        print(f"{name:24s} {a['p50_us']:9.2f} {b['p50_us']:9.2f} {a['p99_us']:9.2f} {b['p99_us']:9.2f}  {change:+.1f}%")
+    if "fps" in old.get("total", {}):
+        print(f"fps: {old['total']['fps']:.0f} -> {new['total']['fps']:.0f}")
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="end-to-end frame pipeline benchmark (landmarks -> chord -> MIDI)")
+    p.add_argument("--frames", type=int, default=0, help="frames to run (synthetic default 3000)")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--replay", help="use a recorded .hclm session instead of synthetic landmarks")
+    p.add_argument("--classifier", choices=["pose", "model", "http"], default="pose")
+    p.add_argument("--url", default="http://localhost:8000/predict")
+    p.add_argument("--backend", default="torch", help="SimpleMLP backend for --classifier model")
+    p.add_argument("--cache", action="store_true",
+                   help="put the quantized-pose cache + hysteresis in front of model/http")
+    p.add_argument("--chords", choices=["table", "legacy"], default="table",
+                   help="ChordTable lookups or per-frame chord_from/voice_chord/label_chord")
+    p.add_argument("--out", help="write the JSON report here (default: stdout)")
+    p.add_argument("--compare", help="previous JSON report to diff against")
+    args = p.parse_args(argv)
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
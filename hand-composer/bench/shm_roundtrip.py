@@ -0,0 +1,127 @@
+# Round-trip latency of one left-hand classification, per transport:
+#
+#   shm   ShmQualityClient.predict -> classifier.shm_worker (shared memory)
+#   http  HttpQualityClient.predict -> server.py /predict (JSON over keep-alive)
+#   ws    StreamQualityClient submit -> reply on /stream (binary WebSocket)
+#
+# Starts its own worker and server (NumPy backend, no cache, so every call
+# really runs the model) unless --url points at a running server.
+#
+#   python -m bench.shm_roundtrip --calls 2000
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from perception.quality_client import HttpQualityClient, StreamQualityClient, ShmQualityClient
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for(pred, timeout=20.0):
+    end = time.perf_counter() + timeout
+    while time.perf_counter() < end:
+        if pred():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def _summary(us):
+    us = np.asarray(us)
+    p50, p95, p99 = np.percentile(us, [50, 95, 99])
+    return {"calls": len(us), "p50_us": p50, "p95_us": p95, "p99_us": p99, "mean_us": us.mean()}
+
+
+def time_calls(call, frames):
+    for f in frames[:50]:   # warm up connections / first-call costs
+        call(f)
+    out = np.empty(len(frames))
+    for i, f in enumerate(frames):
+        t0 = time.perf_counter()
+        call(f)
+        out[i] = (time.perf_counter() - t0) * 1e6
+    return out
+
+
+def ws_call(client, timeout=1.0):
+    def call(f):
+        seq = client.submit(f)
+        end = time.perf_counter() + timeout
+        while client.result_seq < seq and time.perf_counter() < end:
+            time.sleep(0)
+    return call
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="shared-memory vs HTTP/WebSocket classifier round trip")
+    p.add_argument("--calls", type=int, default=2000)
+    p.add_argument("--name", default="hc-quality-bench")
+    p.add_argument("--url", help="existing server base URL, e.g. http://localhost:8000 (default: spawn one)")
+    p.add_argument("--transports", default="shm,http,ws")
+    args = p.parse_args(argv)
+    transports = args.transports.split(",")
+
+    rng = np.random.default_rng(0)
+    frames = [rng.random((21, 3), dtype=np.float32) for _ in range(args.calls)]
+    env = dict(os.environ, HC_BACKEND="numpy", HC_CACHE_SIZE="0", HC_HYSTERESIS="0")
+    procs = []
+    report = {"benchmark": "quality_roundtrip", "calls": args.calls, "transports": {}}
+    try:
+        if "shm" in transports:
+            procs.append(subprocess.Popen([sys.executable, "-m", "classifier.shm_worker", "--name", args.name],
+                                          env=env, stdout=subprocess.DEVNULL))
+            client = ShmQualityClient(args.name, reattach_s=0.0)
+            if not _wait_for(lambda: client._live_ring() is not None):
+                raise RuntimeError("shm worker did not come up")
+            report["transports"]["shm"] = _summary(time_calls(client.predict, frames))
+            client.close()
+
+        base = args.url
+        if base is None and ("http" in transports or "ws" in transports):
+            port = _free_port()
+            base = f"http://127.0.0.1:{port}"
+            procs.append(subprocess.Popen([sys.executable, "-m", "uvicorn", "server:app", "--port", str(port),
+                                           "--log-level", "warning"], env=env))
+
+            def up():
+                import requests
+                try:
+                    return requests.get(base + "/stats", timeout=0.5).ok
+                except requests.RequestException:
+                    return False
+            if not _wait_for(up, 60.0):
+                raise RuntimeError("server did not come up")
+        if "http" in transports:
+            client = HttpQualityClient(base + "/predict", timeout=2.0)
+            report["transports"]["http"] = _summary(time_calls(client.predict, frames))
+            client.close()
+        if "ws" in transports:
+            client = StreamQualityClient(base.replace("http", "ws", 1) + "/stream")
+            _wait_for(lambda: client.connected)
+            report["transports"]["ws"] = _summary(time_calls(ws_call(client), frames))
+            client.close()
+    finally:
+        for proc in procs:
+            proc.terminate()
+            proc.wait(timeout=5)
+
+    shm = report["transports"].get("shm")
+    if shm:
+        report["speedup_p50"] = {k: v["p50_us"] / shm["p50_us"]
+                                 for k, v in report["transports"].items() if k != "shm"}
+    print(json.dumps(report, indent=2, default=float))
+
+
+if __name__ == "__main__":
+    main()
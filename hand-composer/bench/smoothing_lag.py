@@ -0,0 +1,117 @@
+# Effective lag and at-rest jitter of the smoothing layers, on synthetic
+# motion at typical gesture speeds (30 fps, MediaPipe-like noise):
+#
+#   landmarks  HandTracker smoothing: legacy EMA(0.6) vs HandFilterBank
+#              (One-Euro), with and without latency-cancelling prediction
+#   root       RootSmoother continuous root: EMA(0.35) vs adaptive=True
+#
+# Lag = steady-state (truth - output) / speed during a constant-speed sweep.
+# Jitter = std-dev of the output while the input only carries noise.
+#
+#   python -m bench.smoothing_lag [--predict-ms 40]
+
+import argparse
+import json
+
+import numpy as np
+
+from bench.synthetic import hand_template
+from music.smoothing import RootSmoother
+from common.filters import HandFilterBank
+
+FPS = 30.0
+NOISE = 0.003            # normalized units, ~4 px at 1280 wide
+LANDMARK_SPEEDS = (0.25, 0.5, 1.0, 2.0)     # image widths per second
+ROOT_SPEEDS = (6.0, 12.0, 24.0, 48.0)       # semitones per second
+
+
+def sweep(speed, still_s=1.0, move_s=0.6, fps=FPS):
+    """Position over time: hold, then constant-speed move. -> (t, x, moving mask)"""
+    n_still, n_move = int(still_s * fps), int(move_s * fps)
+    t = np.arange(n_still + n_move) / fps
+    x = np.where(t < still_s, 0.0, (t - still_s) * speed)
+    moving = np.arange(len(t)) >= n_still + n_move // 2   # skip the acceleration transient
+    return t, x, moving
+
+
+def ema_tracker(alpha):
+    prev = [None]
+    def f(hands, handedness, t):
+        prev[0] = hands if prev[0] is None else alpha * hands + (1 - alpha) * prev[0]
+        return prev[0]
+    return f
+
+
+def landmark_layer(make_filter, rng):
+    base = hand_template() + np.array([0.3, 0.6, 0.0], dtype=np.float32)
+    out = {}
+    for v in LANDMARK_SPEEDS:
+        t, x, moving = sweep(v)
+        f = make_filter()
+        err = []
+        still = []
+        for i in range(len(t)):
+            hand = base.copy()
+            hand[:, 0] += x[i]
+            noisy = hand + rng.normal(0, NOISE, hand.shape).astype(np.float32)
+            y = f(noisy[None], ["right"], t[i])[0]
+            if moving[i]:
+                err.append((hand[:, 0] - y[:, 0]).mean())
+            elif t[i] < 1.0 and t[i] > 0.3:
+                still.append(y[:, 0] - hand[:, 0])
+        out[f"lag_ms@{v}"] = float(np.mean(err) / v * 1000.0)
+    out["still_jitter"] = float(np.std(still))
+    return out
+
+
+def root_layer(adaptive, rng):
+    out = {}
+    span = 24.0   # 48..72
+    for v in ROOT_SPEEDS:
+        t, x, moving = sweep(v / span, move_s=min(0.6, 0.8 * span / v))   # y units, stays on screen
+        sm = RootSmoother(low=48, high=72, alpha=0.35, deadband_semi=0.5, max_step_semi=1,
+                          min_interval_ms=100, adaptive=adaptive)
+        err, still = [], []
+        for i in range(len(t)):
+            y = 0.9 - x[i] + rng.normal(0, NOISE)
+            hands = np.zeros((1, 21, 3), dtype=np.float32)
+            hands[0, :, 1] = y
+            sm.update(hands, int(t[i] * 1000))
+            truth = 48 + (1.0 - (0.9 - x[i])) * span
+            if moving[i]:
+                err.append(truth - sm._ema)
+            elif 0.3 < t[i] < 1.0:
+                still.append(sm._ema - truth)
+        out[f"lag_ms@{v:g}semi/s"] = float(np.mean(err) / v * 1000.0)
+    out["still_jitter_semi"] = float(np.std(still))
+    return out
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="smoothing lag / jitter benchmark")
+    p.add_argument("--predict-ms", type=float, default=40.0, help="extrapolation for the predicting variant")
+    p.add_argument("--seed", type=int, default=0)
+    args = p.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+    report = {
+        "benchmark": "smoothing_lag",
+        "fps": FPS,
+        "noise": NOISE,
+        "landmarks": {
+            "raw": landmark_layer(lambda: (lambda h, hd, t: h), rng),
+            "ema_0.6": landmark_layer(lambda: ema_tracker(0.6), rng),
+            "one_euro": landmark_layer(HandFilterBank, rng),
+            f"one_euro+predict{args.predict_ms:g}ms": landmark_layer(
+                lambda: HandFilterBank(predict_s=args.predict_ms / 1000.0), rng),
+        },
+        "root": {
+            "ema_0.35": root_layer(False, rng),
+            "one_euro": root_layer(True, rng),
+        },
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# Cold-start time of the demo and the server, broken down by phase.
+#
+# demo:   `python -m demo.run ... --startup-report` in a fresh process
+#         (dummy SDL video driver), concurrent init vs --serial-init. Reports
+#         interpreter + import time, every startup phase (start / duration /
+#         thread), and the first-frame / first-note milestones, measured from
+#         the moment the process was spawned.
+# server: uvicorn server:app from spawn to the first answered /predict, with
+#         HC_WARM_START on (NumPy answers while torch loads) and off.
+# torch:  a bare `import torch`, i.e. what the demo no longer pays up front.
+#
+#   python -m bench.startup [--runs 3] [--video take.mp4 | --camera 0] [--skip-server]
+#
+# Without --video / --camera the demo replays a synthetic session, so the
+# camera / MediaPipe phases don't appear.
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from bench.synthetic import synthetic_session
+from perception.recording import LandmarkRecorder
+
+
+def _env(**extra):
+    env = dict(os.environ, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy", **extra)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (os.getcwd(), env.get("PYTHONPATH")) if p)
+    return env
+
+
+def demo_once(source_args, serial, tmpdir, timeout):
+    report = os.path.join(tmpdir, "startup.json")
+    if os.path.exists(report):
+        os.remove(report)
+    cmd = [sys.executable, "-m", "demo.run", *source_args,
+           "--startup-report", report, "--exit-after-startup"]
+    if serial:
+        cmd.append("--serial-init")
+    spawned = time.time()
+    proc = subprocess.run(cmd, env=_env(), capture_output=True, text=True, timeout=timeout)
+    if not os.path.exists(report):
+        raise RuntimeError(f"demo exited ({proc.returncode}) without a startup report:\n{proc.stderr[-2000:]}")
+    with open(report) as f:
+        r = json.load(f)
+    offset = (r["t0_unix"] - spawned) * 1000.0     # interpreter start + module imports
+    return {
+        "imports_ms": offset,
+        "phases": {k: {"start_ms": v["start_ms"] + offset, "ms": v["ms"], "thread": v["thread"]}
+                   for k, v in r["phases"].items()},
+        "marks": {k: v + offset for k, v in r["marks"].items()},
+    }
+
+
+def _median(runs, get):
+    vals = [v for v in (get(r) for r in runs) if v is not None]
+    return float(np.median(vals)) if vals else None
+
+
+def summarize(runs):
+    phases = sorted({p for r in runs for p in r["phases"]}, key=lambda p: runs[0]["phases"].get(p, {}).get("start_ms", 1e9))
+    marks = sorted({m for r in runs for m in r["marks"]}, key=lambda m: runs[0]["marks"].get(m, 1e9))
+    return {
+        "runs": len(runs),
+        "imports_ms": _median(runs, lambda r: r["imports_ms"]),
+        "phases": {p: {"start_ms": _median(runs, lambda r: r["phases"].get(p, {}).get("start_ms")),
+                       "ms": _median(runs, lambda r: r["phases"].get(p, {}).get("ms")),
+                       "thread": runs[0]["phases"].get(p, {}).get("thread")} for p in phases},
+        "since_spawn_ms": {m: _median(runs, lambda r: r["marks"].get(m)) for m in marks},
+    }
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def server_once(warm_start, timeout):
+    import requests
+    port = _free_port()
+    env = _env(HC_WARM_START="1" if warm_start else "0")
+    spawned = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "server:app", "--port", str(port),
+                             "--log-level", "warning"], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    body = {"left21": np.zeros((21, 3)).tolist()}
+    try:
+        end = spawned + timeout
+        while time.perf_counter() < end:
+            try:
+                r = requests.post(f"http://127.0.0.1:{port}/predict", json=body, timeout=1.0)
+                if r.ok:
+                    return (time.perf_counter() - spawned) * 1000.0
+            except requests.RequestException:
+                pass
+            time.sleep(0.02)
+        return None
+    finally:
+        proc.terminate()
+        proc.wait(timeout=5)
+
+
+def torch_import_ms():
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", "import torch"], capture_output=True)
+    t1 = time.perf_counter()
+    base = subprocess.run([sys.executable, "-c", "pass"], capture_output=True)
+    t2 = time.perf_counter()
+    if proc.returncode or base.returncode:
+        return None
+    return ((t1 - t0) - (t2 - t1)) * 1000.0
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="demo / server cold-start benchmark")
+    src = p.add_mutually_exclusive_group()
+    src.add_argument("--video", help="start the demo on this video (MediaPipe phases included)")
+    src.add_argument("--camera", type=int, help="start the demo on this camera")
+    p.add_argument("--runs", type=int, default=3)
+    p.add_argument("--timeout", type=float, default=60.0)
+    p.add_argument("--skip-server", action="store_true")
+    args = p.parse_args(argv)
+
+    report = {"benchmark": "startup", "cpus": os.cpu_count(), "torch_import_ms": torch_import_ms()}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        if args.video:
+            source = ["--video", args.video, "--fast"]
+        elif args.camera is not None:
+            source = ["--camera", str(args.camera)]
+        else:
+            path = os.path.join(tmpdir, "session.hclm")
+            rec = LandmarkRecorder(path)
+            for k, hands in enumerate(synthetic_session(300, 30.0)):
+                rec.append(hands, ["right", "left"], t=k / 30.0)
+            rec.close()
+            source = ["--replay", path]
+        report["demo_args"] = source
+        for name, serial in (("concurrent", False), ("serial", True)):
+            runs = [demo_once(source, serial, tmpdir, args.timeout) for _ in range(args.runs)]
+            report[f"demo_{name}"] = summarize(runs)
+
+    if not args.skip_server:
+        report["server_first_answer_ms"] = {
+            name: _median([{"v": server_once(warm, args.timeout)} for _ in range(args.runs)], lambda r: r["v"])
+            for name, warm in (("warm_start", True), ("blocking", False))
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# Synthetic two-hand landmark sessions for benchmarks and load tests.
+# Shapes and value ranges follow what MediaPipe Hands returns for the
+# mirrored 1280x720 camera frame (normalized x,y in [0..1], small z).
+
+import numpy as np
+
+# finger base angle (radians, 0 = straight up the screen) and joint lengths
+_FINGERS = [
+    (-0.9, (0.045, 0.035, 0.030, 0.025)),   # thumb  1-4
+    (-0.30, (0.090, 0.040, 0.025, 0.022)),  # index  5-8
+    (-0.05, (0.090, 0.045, 0.028, 0.024)),  # middle 9-12
+    (0.20, (0.085, 0.040, 0.026, 0.022)),   # ring   13-16
+    (0.45, (0.080, 0.032, 0.020, 0.018)),   # pinky  17-20
+]
+
+
+def hand_template(openness=1.0, scale=1.0, mirror=False):
+    """(21,3) hand relative to its wrist. openness 0 = fist, 1 = spread."""
+    pts = np.zeros((21, 3), dtype=np.float32)
+    k = 1
+    for base_angle, lengths in _FINGERS:
+        angle = base_angle * (0.4 + 0.6 * openness)
+        pos = np.zeros(2)
+        for j, seg in enumerate(lengths):
+            # the metacarpal (j=0) always points out; the rest curl with low openness
+            reach = 1.0 if j == 0 else 0.25 + 0.75 * openness
+            step = np.array([np.sin(angle), -np.cos(angle)]) * seg * reach * scale
+            pos = pos + step
+            pts[k, :2] = pos
+            pts[k, 2] = -0.01 * j
+            k += 1
+    if mirror:
+        pts[:, 0] *= -1
+    return pts
+
+
+def synthetic_session(n_frames=3000, fps=30.0, n_hands=2, seed=0, noise=0.002):
+    """
+    (T, n_hands, 21, 3) float32 landmarks: the right hand (row 0) sweeps
+    up and down (root), the left hand (row 1) opens and closes (quality),
+    and the hands drift together and apart (tempo). Plus tracker jitter.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_frames) / fps
+    out = np.empty((n_frames, n_hands, 21, 3), dtype=np.float32)
+
+    wrist_r = np.stack([0.65 + 0.1 * np.sin(0.21 * t), 0.55 + 0.3 * np.sin(0.5 * t)], axis=1)
+    wrist_l = np.stack([0.30 - 0.1 * np.sin(0.17 * t), 0.70 + 0.05 * np.sin(0.9 * t)], axis=1)
+    open_r = 0.5 + 0.5 * np.sin(0.33 * t)
+    open_l = 0.5 + 0.5 * np.sign(np.sin(0.6 * t)) * np.abs(np.sin(0.6 * t)) ** 0.3
+
+    for i in range(n_frames):
+        out[i, 0] = hand_template(open_r[i])
+        out[i, 0, :, :2] += wrist_r[i]
+        if n_hands > 1:
+            out[i, 1] = hand_template(open_l[i], mirror=True)
+            out[i, 1, :, :2] += wrist_l[i]
+    out += rng.normal(0.0, noise, out.shape).astype(np.float32)
+    return out
@@ -0,0 +1,70 @@
+# HandTracker cost per frame for each tracking mode on the same video:
+# full frame (original), ROI crop, ROI + reduced inference width, and ROI +
+# reduced width + motion gating. Reports cost percentiles, MediaPipe time,
+# skip / ROI rates, and how far each mode's landmarks drift from the
+# full-frame run (mean wrist error in pixels) so CPU can be traded against
+# responsiveness.
+#
+#   python -m bench.tracker --video take.mp4 [--frames 600] [--infer-width 640] [--motion-threshold 2]
+
+import argparse
+import json
+
+import numpy as np
+
+from perception.hands import HandTracker
+from perception.sources import VideoFileSource
+
+
+def run_mode(path, frames, **kw):
+    tracker = HandTracker(source=VideoFileSource(path, realtime=False), **kw)
+    wrists = np.full((frames, 2, 2), np.nan)
+    n = 0
+    try:
+        while n < frames:
+            frame = tracker.grab()
+            if frame is None:
+                break
+            h, w = frame.shape[:2]
+            _, hands = tracker.process(frame)
+            if hands is not None:
+                for k, label in enumerate(tracker.handedness):
+                    wrists[n, 0 if label == "right" else 1] = hands[k, 0, :2] * (w, h)
+            n += 1
+    finally:
+        tracker.release()
+    return tracker.stats(), wrists[:n]
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="HandTracker ROI / motion-gating benchmark")
+    p.add_argument("--video", required=True, help="video with hands in it (played as fast as possible)")
+    p.add_argument("--frames", type=int, default=600)
+    p.add_argument("--infer-width", type=int, default=640)
+    p.add_argument("--motion-threshold", type=float, default=2.0)
+    args = p.parse_args(argv)
+
+    modes = {
+        "full": {},
+        "roi": {"roi": True},
+        "roi_small": {"roi": True, "infer_width": args.infer_width},
+        "roi_small_gated": {"roi": True, "infer_width": args.infer_width,
+                            "motion_threshold": args.motion_threshold},
+    }
+    report = {"benchmark": "tracker", "video": args.video, "modes": {}}
+    baseline = None
+    for name, kw in modes.items():
+        stats, wrists = run_mode(args.video, args.frames, **kw)
+        if baseline is None:
+            baseline = wrists
+        else:
+            m = min(len(baseline), len(wrists))
+            err = np.linalg.norm(wrists[:m] - baseline[:m], axis=-1)
+            stats["wrist_err_px_mean"] = float(np.nanmean(err)) if np.isfinite(err).any() else None
+            stats["wrist_err_px_p95"] = float(np.nanpercentile(err, 95)) if np.isfinite(err).any() else None
+        report["modes"][name] = stats
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
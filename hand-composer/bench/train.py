@@ -0,0 +1,75 @@
+# End-to-end check of classifier/train.py on synthetic labelled takes.
+#
+# Writes one take per chord quality (left hand held at fist / half-open /
+# spread openness, moving around and rotating a little, with tracker
+# noise), trains on them with the real CLI, then evaluates the written
+# weights. Prints wall time, training samples/sec and per-class accuracy.
+#
+#   python -m bench.train [--frames 6000] [--epochs 8] [--workers 2]
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from bench.synthetic import hand_template
+from classifier import train
+from perception.recording import LandmarkRecorder
+
+# openness range of the left hand per class (fist ... spread)
+OPENNESS = {"min": (0.0, 0.25), "maj": (0.4, 0.6), "7": (0.8, 1.0)}
+
+
+def labelled_take(path, openness, frames, fps=30.0, seed=0, noise=0.003):
+    rng = np.random.default_rng(seed)
+    t = np.arange(frames) / fps
+    lo, hi = openness
+    open_l = lo + (hi - lo) * (0.5 + 0.5 * np.sin(0.4 * t + rng.uniform(0, 6)))
+    wrist = np.stack([0.3 + 0.1 * np.sin(0.23 * t), 0.65 + 0.1 * np.sin(0.7 * t)], axis=1)
+    scale = 0.9 + 0.2 * (0.5 + 0.5 * np.sin(0.11 * t))
+    tilt = np.radians(10.0) * np.sin(0.3 * t)
+    rec = LandmarkRecorder(path)
+    for i in range(frames):
+        hand = hand_template(open_l[i], scale[i], mirror=True)
+        c, s = np.cos(tilt[i]), np.sin(tilt[i])
+        hand[:, :2] = hand[:, :2] @ np.array([[c, s], [-s, c]], dtype=np.float32)
+        hand[:, :2] += wrist[i]
+        hand += rng.normal(0.0, noise, hand.shape).astype(np.float32)
+        rec.append(hand[None], ["left"], t=t[i])
+    rec.close()
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="train the quality classifier on synthetic takes")
+    p.add_argument("--frames", type=int, default=6000, help="frames per class take")
+    p.add_argument("--epochs", type=int, default=8)
+    p.add_argument("--batch", type=int, default=1024)
+    p.add_argument("--workers", type=int, default=None)
+    args = p.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        t0 = time.perf_counter()
+        sources = []
+        for k, (label, openness) in enumerate(OPENNESS.items()):
+            path = os.path.join(tmpdir, f"{label}.hclm")
+            labelled_take(path, openness, args.frames, seed=k)
+            sources.append(f"{label}={path}")
+        t_write = time.perf_counter() - t0
+
+        out = os.path.join(tmpdir, "weights")
+        cli = [*sources, "--out", out, "--epochs", str(args.epochs), "--batch", str(args.batch)]
+        if args.workers is not None:
+            cli += ["--workers", str(args.workers)]
+        t0 = time.perf_counter()
+        train.main(cli)
+        t_train = time.perf_counter() - t0
+
+        print(json.dumps({"benchmark": "train", "cpus": os.cpu_count(), "frames_per_class": args.frames,
+                          "write_sessions_s": t_write, "train_and_eval_s": t_train}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+# Interchangeable inference backends for SimpleMLP.
+#
+# Every backend exposes predict((N, 63) float32) -> (N,) int class indices
+# and warmup(). Weights trained by classifier/train.py expect wrist-relative,
+# hand-size-normalized poses (meta.input == "normalized"); the backends
+# then normalize raw landmarks themselves. Pick one with make_backend(name, ...):
+#
+#   torch        eager PyTorch under inference_mode (CPU or CUDA/ROCm)
+#   torchscript  traced + frozen TorchScript module
+#   compile      torch.compile (falls back to torchscript if unavailable)
+#   int8         dynamically quantized Linear layers (CPU)
+#   numpy        pure NumPy forward pass; never imports torch
+#
+#   python -m classifier.backends --compare [--weights w.npz] [--threads 1]
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from classifier.cache import normalize_poses
+from classifier.weights import load_weights, dims
+
+BACKENDS = ("torch", "torchscript", "compile", "int8", "numpy")
+
+
+def _random_state(in_dim=63, hidden=64, out_dim=3, seed=0):
+    # untrained fallback, same init scale as nn.Linear
+    rng = np.random.default_rng(seed)
+    state = {}
+    for name, (i, o) in zip(("fc1", "fc2", "fc3"), ((in_dim, hidden), (hidden, hidden), (hidden, out_dim))):
+        bound = 1.0 / np.sqrt(i)
+        state[f"{name}.weight"] = rng.uniform(-bound, bound, (o, i)).astype(np.float32)
+        state[f"{name}.bias"] = rng.uniform(-bound, bound, o).astype(np.float32)
+    return state
+
+
+class NumpyBackend:
+    name = "numpy"
+
+    def __init__(self, state, normalize=False):
+        # pre-transposed, contiguous weights: x @ W is one BLAS call per layer
+        self.w = [np.ascontiguousarray(state[f"{l}.weight"].T) for l in ("fc1", "fc2", "fc3")]
+        self.b = [state[f"{l}.bias"] for l in ("fc1", "fc2", "fc3")]
+        self.normalize = normalize
+
+    def logits(self, x):
+        h = x @ self.w[0]
+        h += self.b[0]
+        np.maximum(h, 0.0, out=h)
+        h2 = h @ self.w[1]
+        h2 += self.b[1]
+        np.maximum(h2, 0.0, out=h2)
+        out = h2 @ self.w[2]
+        out += self.b[2]
+        return out
+
+    def predict(self, batch):
+        x = normalize_poses(batch) if self.normalize else np.asarray(batch, dtype=np.float32)
+        return self.logits(x.reshape(-1, self.w[0].shape[0])).argmax(axis=1)
+
+    def warmup(self, n=20, batch_sizes=(1, 8, 32)):
+        _warmup(self, n, batch_sizes, self.w[0].shape[0])
+
+
+class TorchBackend:
+    def __init__(self, state, device="cpu", kind="torch", normalize=False):
+        import torch
+        from classifier.model import SimpleMLP
+        self.torch = torch
+        self.name = kind
+        self.device = torch.device(device)
+        in_dim, hidden, out_dim = dims(state)
+        self.in_dim = in_dim
+        self.normalize = normalize
+        model = SimpleMLP(in_dim, hidden, out_dim)
+        model.load_state_dict({k: torch.from_numpy(v) for k, v in state.items()})
+        model = model.to(self.device).eval()
+
+        if kind == "int8":
+            if self.device.type != "cpu":
+                raise ValueError("int8 backend is CPU only")
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        elif kind in ("torchscript", "compile"):
+            compiled = None
+            if kind == "compile" and hasattr(torch, "compile"):
+                try:
+                    compiled = torch.compile(model, dynamic=True)
+                    with torch.inference_mode():
+                        compiled(torch.zeros(1, in_dim, device=self.device))
+                except Exception as e:
+                    print("[classifier] torch.compile unavailable, using TorchScript:", e)
+                    compiled = None
+                    self.name = "torchscript"
+            if compiled is None:
+                with torch.inference_mode():
+                    traced = torch.jit.trace(model, torch.zeros(1, in_dim, device=self.device))
+                compiled = torch.jit.optimize_for_inference(torch.jit.freeze(traced))
+            model = compiled
+        self.model = model
+
+    def predict(self, batch):
+        torch = self.torch
+        if self.normalize:
+            batch = normalize_poses(batch)
+        with torch.inference_mode():
+            x = torch.from_numpy(np.ascontiguousarray(batch, dtype=np.float32).reshape(-1, self.in_dim))
+            if self.device.type != "cpu":
+                x = x.to(self.device, non_blocking=True)
+            return torch.argmax(self.model(x), dim=1).cpu().numpy()
+
+    def warmup(self, n=20, batch_sizes=(1, 8, 32)):
+        _warmup(self, n, batch_sizes, self.in_dim)
+
+
+def _warmup(backend, n, batch_sizes, in_dim):
+    # first calls pay for allocator growth, kernel selection, JIT profiling
+    for bs in batch_sizes:
+        x = np.zeros((bs, in_dim), dtype=np.float32)
+        for _ in range(n):
+            backend.predict(x)
+
+
+def set_threads(n):
+    """Pin intra-op threads for torch (NumPy's BLAS reads OMP_NUM_THREADS at import)."""
+    if not n:
+        return
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(int(n))
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # already set, or parallel work already started
+
+
+def make_backend(name="torch", weights=None, device="cpu", threads=None, warmup=False):
+    if name not in BACKENDS:
+        raise ValueError(f"unknown backend {name!r}, expected one of {BACKENDS}")
+    # weights: a file, an already loaded (state, meta) pair, or None for random init
+    if isinstance(weights, tuple):
+        state, meta = weights
+    else:
+        state, meta = load_weights(weights) if weights else (_random_state(), {})
+    normalize = meta.get("input") == "normalized"
+    if name == "numpy":
+        backend = NumpyBackend(state, normalize)
+    else:
+        set_threads(threads)
+        backend = TorchBackend(state, device=device, kind=name, normalize=normalize)
+    if warmup:
+        backend.warmup()
+    return backend
+
+
+# ---- comparison ----
+def _bench(backend, batch, seconds):
+    x = np.random.default_rng(0).random((batch, backend_in_dim(backend)), dtype=np.float32)
+    lat = []
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        t0 = time.perf_counter()
+        backend.predict(x)
+        lat.append(time.perf_counter() - t0)
+    lat = np.array(lat) * 1e6
+    p50, p99 = np.percentile(lat, [50, 99])
+    return {"p50_us": float(p50), "p99_us": float(p99),
+            "samples_per_s": float(batch * len(lat) / lat.sum() * 1e6)}
+
+
+def backend_in_dim(backend):
+    return backend.w[0].shape[0] if isinstance(backend, NumpyBackend) else backend.in_dim
+
+
+def compare(names=BACKENDS, weights=None, threads=None, seconds=1.0, batch=32):
+    state, meta = load_weights(weights) if weights else (_random_state(), {})
+    ref = NumpyBackend(state, meta.get("input") == "normalized")
+    probe = np.random.default_rng(1).random((256, dims(state)[0]), dtype=np.float32)
+    expected = ref.predict(probe)
+    report = {}
+    for name in names:
+        try:
+            b = make_backend(name, weights, threads=threads)
+        except Exception as e:
+            report[name] = {"error": str(e)}
+            continue
+        b.warmup()
+        report[name] = {
+            "agreement": float((b.predict(probe) == expected).mean()),
+            "single": _bench(b, 1, seconds),
+            f"batch{batch}": _bench(b, batch, seconds),
+        }
+    return report
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="SimpleMLP backend comparison")
+    p.add_argument("--compare", action="store_true", help="benchmark all backends")
+    p.add_argument("--backends", default=",".join(BACKENDS))
+    p.add_argument("--weights", help=".npz or .pt weights (default: random init)")
+    p.add_argument("--threads", type=int, default=1)
+    p.add_argument("--seconds", type=float, default=1.0)
+    p.add_argument("--batch", type=int, default=32)
+    args = p.parse_args(argv)
+    report = compare(args.backends.split(","), args.weights, args.threads, args.seconds, args.batch)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+# Dynamic micro-batching in front of the quality classifier.
+#
+# Callers submit one or more 63-d landmark rows and get a Future back.
+# A single worker thread collects everything that arrives within
+# `max_wait_ms` of the first queued item (or until `max_batch` rows are
+# queued), runs ONE forward pass over the stacked (N, 63) array and hands
+# each caller its own slice of the result.
+#
+# workers > 1: the collecting thread hands finished batches to a fixed pool
+# of inference threads (the forward pass releases the GIL), never more than
+# `workers` at a time; meanwhile the next batch keeps filling up.
+# Rows may carry a deadline (perf_counter seconds): rows still queued when
+# it passes, or whose Future was cancelled, are dropped before inference.
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+from perf.stats import Histogram, BATCH_BUCKETS
+
+
+class DeadlineExceeded(Exception):
+    """The row's deadline passed before its batch ran."""
+
+
+class MicroBatcher:
+    def __init__(self, infer_fn, max_batch=32, max_wait_ms=2.0, in_dim=63, workers=1):
+        """
+        infer_fn: callable (N, in_dim) float32 -> (N,) class indices
+        workers:  inference threads (1 = run batches on the collecting thread)
+        """
+        self.infer_fn = infer_fn
+        self.max_batch = int(max_batch)
+        self.max_wait = max_wait_ms / 1000.0
+        self.in_dim = in_dim
+        self.workers = max(1, int(workers))
+        self._q = queue.Queue()
+        self._buf = np.empty((self.max_batch, in_dim), dtype=np.float32)
+        self._pending = None       # item pulled off the queue that didn't fit
+        self._stop = threading.Event()
+        self._thread = None
+        self._pool = None
+        self._slots = threading.Semaphore(self.workers)
+        self.expired = 0           # rows dropped: deadline passed while queued
+        self.cancelled = 0         # rows dropped: caller gave up (Future cancelled)
+
+        self.batch_size_hist = Histogram("batch_size", BATCH_BUCKETS)
+        self.queue_wait_hist = Histogram("queue_wait_ms")
+        self.infer_hist = Histogram("batch_infer_ms")
+
+    # ---- lifecycle ----
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            if self.workers > 1:
+                self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="infer")
+            self._thread = threading.Thread(target=self._loop, name="micro-batcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self):
+        self._stop.set()
+        self._q.put(None)  # wake the worker
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    # ---- producer side ----
+    def submit(self, row, deadline=None):
+        """Queue a single (63,) or (21,3) sample. Future resolves to one int."""
+        x = np.asarray(row, dtype=np.float32).reshape(1, self.in_dim)
+        return self._put(x, single=True, deadline=deadline)
+
+    def submit_many(self, rows, deadline=None):
+        """Queue (N, 63) or (N, 21, 3) samples. Future resolves to an int array (N,)."""
+        x = np.asarray(rows, dtype=np.float32).reshape(-1, self.in_dim)
+        return self._put(x, single=False, deadline=deadline)
+
+    def _put(self, x, single, deadline=None):
+        fut = Future()
+        if x.shape[0] == 0:
+            fut.set_result(np.empty(0, dtype=np.int64))
+            return fut
+        self._q.put((x, fut, single, time.perf_counter(), deadline))
+        return fut
+
+    @property
+    def queued(self):
+        """Requests waiting for a batch (approximate)."""
+        return self._q.qsize() + (self._pending is not None)
+
+    # ---- worker side ----
+    def _next(self, timeout):
+        if self._pending is not None:
+            item, self._pending = self._pending, None
+            return item
+        try:
+            return self._q.get(timeout=timeout) if timeout is not None else self._q.get()
+        except queue.Empty:
+            return None
+
+    def _loop(self):
+        while not self._stop.is_set():
+            first = self._next(None)
+            if first is None:
+                continue
+            items = [first]
+            rows = first[0].shape[0]
+            deadline = first[3] + self.max_wait
+            while rows < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                item = self._next(remaining)
+                if item is None:
+                    break
+                if rows + item[0].shape[0] > self.max_batch and rows > 0:
+                    self._pending = item  # start of the next batch
+                    break
+                items.append(item)
+                rows += item[0].shape[0]
+            if self._pool is None:
+                self._run(items, rows, self._buf)
+                continue
+            self._slots.acquire()     # at most `workers` batches in flight; the queue absorbs the rest
+            self._pool.submit(self._run_slot, items, rows)
+
+    def _run_slot(self, items, rows):
+        try:
+            self._run(items, rows, np.empty((self.max_batch, self.in_dim), dtype=np.float32))
+        finally:
+            self._slots.release()
+
+    def _live(self, items, now):
+        """Items still worth computing; the rest get DeadlineExceeded or are already cancelled."""
+        live = []
+        for item in items:
+            fut, deadline = item[1], item[4]
+            if deadline is not None and now > deadline:
+                if fut.set_running_or_notify_cancel():
+                    fut.set_exception(DeadlineExceeded())
+                    self.expired += 1
+                else:
+                    self.cancelled += 1
+            elif fut.set_running_or_notify_cancel():
+                live.append(item)
+            else:
+                self.cancelled += 1
+        return live
+
+    def _run(self, items, rows, buf):
+        t_start = time.perf_counter()
+        live = self._live(items, t_start)
+        if len(live) < len(items):
+            items = live
+            rows = sum(it[0].shape[0] for it in items)
+            if not items:
+                return
+        # oversized single requests (e.g. a big /predict_batch) bypass the buffer
+        if rows <= self.max_batch:
+            batch = buf[:rows]
+            i = 0
+            for x, *_ in items:
+                batch[i:i + x.shape[0]] = x
+                i += x.shape[0]
+        else:
+            batch = np.concatenate([it[0] for it in items], axis=0)
+
+        for _, _, _, t_enq, _ in items:
+            self.queue_wait_hist.observe((t_start - t_enq) * 1000.0)
+        self.batch_size_hist.observe(rows)
+
+        try:
+            out = np.asarray(self.infer_fn(batch))
+        except Exception as e:
+            for _, fut, *_ in items:
+                fut.set_exception(e)
+            return
+        self.infer_hist.observe((time.perf_counter() - t_start) * 1000.0)
+
+        i = 0
+        for x, fut, single, *_ in items:
+            n = x.shape[0]
+            fut.set_result(int(out[i]) if single else out[i:i + n].copy())
+            i += n
+
+    def stats(self):
+        return {
+            "batch_size": self.batch_size_hist.snapshot(),
+            "queue_wait_ms": self.queue_wait_hist.snapshot(),
+            "batch_infer_ms": self.infer_hist.snapshot(),
+            "infer_workers": self.workers,
+            "queued": self.queued,
+            "expired": self.expired,
+            "cancelled": self.cancelled,
+        }
@@ -0,0 +1,112 @@
+# Prediction cache in front of the quality classifier.
+#
+# A held left-hand pose produces nearly identical landmarks frame after
+# frame. Poses are normalized for wrist position and hand size, quantized
+# into a compact byte key and looked up in a bounded LRU. Hysteresis adds
+# a cheaper short-circuit: if the pose has barely moved since the last
+# real prediction, that prediction is reused without even hashing.
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+WRIST = 0
+MIDDLE_MCP = 9  # wrist -> middle knuckle is a stable hand-size reference
+
+
+def normalize_pose(left21):
+    """(21,3) -> (21,3) float32, wrist at origin, wrist-to-middle-knuckle length 1."""
+    p = np.asarray(left21, dtype=np.float32).reshape(21, 3)
+    rel = p - p[WRIST]
+    scale = float(np.sqrt((rel[MIDDLE_MCP] * rel[MIDDLE_MCP]).sum()))
+    if scale > 1e-6:
+        rel *= 1.0 / scale
+    return rel
+
+
+def normalize_poses(batch):
+    """normalize_pose over a whole batch: (N,63) or (N,21,3) -> (N,63) float32."""
+    p = np.asarray(batch, dtype=np.float32).reshape(-1, 21, 3)
+    rel = p - p[:, WRIST:WRIST + 1]
+    scale = np.sqrt((rel[:, MIDDLE_MCP] * rel[:, MIDDLE_MCP]).sum(axis=1))
+    rel *= np.where(scale > 1e-6, 1.0 / np.maximum(scale, 1e-6), 1.0)[:, None, None]
+    return rel.reshape(-1, 63)
+
+
+class PredictionCache:
+    """Thread-safe bounded LRU: quantized pose key -> class index."""
+    def __init__(self, capacity=4096, quant=0.1):
+        self.capacity = capacity
+        self.quant = quant
+        self._inv_q = 1.0 / quant
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, left21):
+        """-> (normalized pose, bytes key)"""
+        norm = normalize_pose(left21)
+        q = np.clip(np.rint(norm * self._inv_q), -127, 127).astype(np.int8)
+        return norm, q.tobytes()
+
+    def get(self, key):
+        with self._lock:
+            idx = self._lru.get(key)
+            if idx is None:
+                self.misses += 1
+                return None
+            self._lru.move_to_end(key)
+            self.hits += 1
+            return idx
+
+    def put(self, key, idx):
+        with self._lock:
+            self._lru[key] = idx
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.capacity:
+                self._lru.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._lru),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class Hysteresis:
+    """
+    Per-performer: reuse the last prediction while no landmark has moved more
+    than `threshold` (in normalized hand units) from where it was when that
+    prediction was made. Keep one per stream / client, never share.
+    """
+    def __init__(self, threshold=0.05):
+        self.threshold_sq = threshold * threshold
+        self._pose = None
+        self._idx = None
+        self.skips = 0
+
+    def check(self, norm):
+        if self._pose is None:
+            return None
+        d = norm - self._pose
+        if float((d * d).sum(axis=1).max()) < self.threshold_sq:
+            self.skips += 1
+            return self._idx
+        return None
+
+    def update(self, norm, idx):
+        self._pose = norm
+        self._idx = idx
+
+    def reset(self):
+        self._pose = None
+        self._idx = None
@@ -0,0 +1,166 @@
+# Training data for the chord-quality classifier.
+#
+# Samples are the left hands of recorded .hclm sessions
+# (perception/recording.py). The recordings stay memory-mapped; only the
+# rows of a drawn batch are ever copied. Labels per session come from, in
+# order of preference:
+#   - the command line: "maj=take.hclm" labels every left hand in the take
+#   - a sidecar "take.hclm.labels.npy": one uint8 class per record
+#     (index into QUALITY, 255 = unlabelled)
+#   - only with spread_rule=True (train.py --spread-rule-labels): the CPU
+#     spread rule (music.chord_mapper.left_pose_quality). The rule reads
+#     absolute hand size, which the model's normalized input doesn't have,
+#     so those labels are largely unlearnable; otherwise an unlabelled
+#     take is an error
+#
+# augment() perturbs a whole (B,21,3) batch in a few numpy calls:
+# in-plane rotation about the wrist, scale with a little aspect change,
+# mirroring, and tracker-like jitter.
+
+import os
+
+import numpy as np
+
+from classifier.cache import normalize_poses
+from classifier.protocol import QUALITY
+from common.features import HandFeatures
+from perception.recording import HAND_CODES, LandmarkRecording
+
+UNLABELLED = 255
+LEFT = HAND_CODES["left"]
+
+
+def spread_labels(left, spread_thresholds=(0.065, 0.11)):
+    """(N,21,3) left hands -> (N,) QUALITY indices by the same spread rule as left_pose_quality."""
+    spread = HandFeatures.from_hands(np.asarray(left)[:, None]).spread[:, 0]
+    return np.digitize(spread, spread_thresholds).astype(np.uint8)   # 0 min, 1 maj, 2 7
+
+
+def parse_source(text):
+    """'maj=take.hclm' -> (path, class index); 'take.hclm' -> (path, None)."""
+    label, sep, path = text.partition("=")
+    if not sep:
+        return text, None
+    if label not in QUALITY:
+        raise ValueError(f"unknown class {label!r} in {text!r}, expected one of {QUALITY}")
+    return path, QUALITY.index(label)
+
+
+class SessionSet:
+    """
+    Every labelled left hand in a list of sessions, as an index
+    (session, record, row) into the memory-mapped recordings.
+    Picklable: worker processes reopen the maps instead of copying them.
+    """
+    def __init__(self, sources, spread_rule=False):
+        self.paths = []
+        index, labels, how = [], [], []
+        for k, src in enumerate(sources):
+            path, label = parse_source(src) if isinstance(src, str) else src
+            rec = LandmarkRecording(path)
+            _, _, hand, xyz = rec.as_arrays()
+            rows = np.argwhere(hand == LEFT)                  # (M, 2): record, row
+            if label is not None:
+                y = np.full(len(rows), label, dtype=np.uint8)
+                how.append("argument")
+            elif os.path.exists(path + ".labels.npy"):
+                y = np.load(path + ".labels.npy")[rows[:, 0]].astype(np.uint8)
+                how.append("sidecar")
+            elif spread_rule:
+                y = spread_labels(xyz[rows[:, 0], rows[:, 1]])
+                how.append("spread rule")
+            else:
+                raise ValueError(f"{path}: no labels - pass CLASS={path} or write {path}.labels.npy "
+                                 f"(or opt in to spread-rule labels)")
+            keep = y != UNLABELLED
+            index.append(np.column_stack([np.full(keep.sum(), k), rows[keep]]).astype(np.int64))
+            labels.append(y[keep])
+            self.paths.append(path)
+        self.index = np.concatenate(index) if index else np.zeros((0, 3), np.int64)
+        self.labels = np.concatenate(labels) if labels else np.zeros(0, np.uint8)
+        self.label_source = dict(zip(self.paths, how))
+        self._xyz = None
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["_xyz"] = None
+        return state
+
+    def _maps(self):
+        if self._xyz is None:
+            self._xyz = [LandmarkRecording(p).as_arrays()[3] for p in self.paths]
+        return self._xyz
+
+    def gather(self, idx):
+        """Samples `idx` -> ((B,21,3) float32 copy, (B,) labels)."""
+        sel = self.index[idx]
+        out = np.empty((len(sel), 21, 3), dtype=np.float32)
+        maps = self._maps()
+        for k in np.unique(sel[:, 0]):
+            m = sel[:, 0] == k
+            out[m] = maps[k][sel[m, 1], sel[m, 2]]
+        return out, self.labels[idx]
+
+    def class_counts(self):
+        return np.bincount(self.labels, minlength=len(QUALITY))
+
+    def split(self, val_frac=0.15):
+        """
+        (train, val) sample indices. The last `val_frac` of every session is
+        held out, so near-duplicate neighbouring frames never straddle the split.
+        """
+        train, val = [], []
+        for k in range(len(self.paths)):
+            ids = np.flatnonzero(self.index[:, 0] == k)
+            cut = len(ids) - int(round(len(ids) * val_frac))
+            train.append(ids[:cut])
+            val.append(ids[cut:])
+        return np.concatenate(train), np.concatenate(val)
+
+
+def augment(hands, rng, rotate_deg=20.0, scale=(0.85, 1.2), aspect=0.08, mirror=0.5, jitter=0.004):
+    """
+    Randomly perturbed copy of a (B,21,3) batch, in image units (before
+    normalization, so `jitter` means the same thing as tracker noise).
+    Overall scale is undone by normalize_poses later; the aspect change is not.
+    """
+    b = len(hands)
+    wrist = hands[:, :1, :2]
+    xy = hands[:, :, :2] - wrist
+    theta = np.radians(rng.uniform(-rotate_deg, rotate_deg, b))
+    c, s = np.cos(theta)[:, None], np.sin(theta)[:, None]
+    x = c * xy[..., 0] - s * xy[..., 1]
+    y = s * xy[..., 0] + c * xy[..., 1]
+    k = rng.uniform(*scale, b)[:, None]
+    sx = k * (1.0 + rng.uniform(-aspect, aspect, (b, 1)))
+    sy = k * (1.0 + rng.uniform(-aspect, aspect, (b, 1)))
+    x *= np.where(rng.random((b, 1)) < mirror, -sx, sx)
+    y *= sy
+    out = np.empty_like(hands)
+    out[..., 0] = x + wrist[..., 0]
+    out[..., 1] = y + wrist[..., 1]
+    out[..., 2] = hands[..., 2] * k
+    out += rng.normal(0.0, jitter, out.shape).astype(np.float32)
+    return out
+
+
+def batches(data, ids, batch_size, steps, rng, augmentation=None, balance=True):
+    """
+    `steps` training batches (normalized (B,63) float32, (B,) int64) drawn
+    from sample ids `ids`; balance=True samples every class equally often.
+    """
+    p = None
+    if balance:
+        counts = np.bincount(data.labels[ids], minlength=len(QUALITY)).astype(np.float64)
+        w = 1.0 / np.maximum(counts, 1.0)
+        p = w[data.labels[ids]]
+        p /= p.sum()
+    for _ in range(steps):
+        pick = ids[rng.choice(len(ids), batch_size, p=p)]
+        hands, y = data.gather(np.sort(pick))     # sorted: sequential reads from the maps
+        if augmentation is not None:
+            hands = augment(hands, rng, **augmentation)
+        yield normalize_poses(hands), y.astype(np.int64)
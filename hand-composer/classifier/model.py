@@ -0,0 +1,12 @@
+# The chord-quality classifier network.
+
+import torch.nn as nn, torch.nn.functional as F
+
+class SimpleMLP(nn.Module):
+    def __init__(self, in_dim=63, hidden=64, out_dim=3):
+        super().__init__()
+        self.fc1 = nn.Linear(in_dim, hidden)
+        self.fc2 = nn.Linear(hidden, hidden)
+        self.fc3 = nn.Linear(hidden, out_dim)
+    def forward(self, x):
+        x = F.relu(self.fc1(x)); x = F.relu(self.fc2(x)); return self.fc3(x)
@@ -0,0 +1,40 @@
+# Binary wire format shared by server.py and the demo's streaming client.
+#
+# frame  (client -> server): uint32 seq | 63 x float32 landmarks      = 256 bytes
+# result (server -> client): uint32 seq | uint8 quality index        =   5 bytes
+# All little-endian. No JSON, no per-frame validation of nested lists.
+
+import struct
+import numpy as np
+
+QUALITY = ["min", "maj", "7"]
+
+N_LANDMARKS = 21
+FRAME_DIM = N_LANDMARKS * 3
+
+_SEQ = struct.Struct("<I")
+_RESULT = struct.Struct("<IB")
+FRAME_BYTES = _SEQ.size + FRAME_DIM * 4
+RESULT_BYTES = _RESULT.size
+
+
+def pack_frame(seq, left21):
+    arr = np.ascontiguousarray(left21, dtype="<f4").reshape(FRAME_DIM)
+    return _SEQ.pack(seq & 0xFFFFFFFF) + arr.tobytes()
+
+
+def unpack_frame(data):
+    """-> (seq, (63,) float32 view into `data`)"""
+    if len(data) != FRAME_BYTES:
+        raise ValueError(f"expected {FRAME_BYTES} bytes, got {len(data)}")
+    (seq,) = _SEQ.unpack_from(data)
+    return seq, np.frombuffer(data, dtype="<f4", count=FRAME_DIM, offset=_SEQ.size)
+
+
+def pack_result(seq, idx):
+    return _RESULT.pack(seq & 0xFFFFFFFF, idx)
+
+
+def unpack_result(data):
+    """-> (seq, quality index)"""
+    return _RESULT.unpack(data)
@@ -0,0 +1,152 @@
+# Same-host transport: a shared-memory ring of landmark frames plus one
+# result word, so the demo and a local classifier process never touch
+# sockets, HTTP or JSON.
+#
+# layout (little-endian, 64-byte header, then the slots):
+#
+#   u64[0]  magic / version
+#   u64[1]  write_seq       last frame published by the client (0 = none)
+#   u64[2]  result          (seq << 8) | quality index, one aligned store
+#   f64[3]  heartbeat       worker's time.time(), refreshed while idle
+#   u64[4]  n_slots
+#   u64[5]  worker pid
+#   f32[n_slots, 63]        frame slots, frame `seq` lives in slot seq % n_slots
+#
+# One producer, one consumer. The producer fills a slot, then bumps
+# write_seq; the consumer reads write_seq, works on the slot in place and
+# re-checks write_seq afterwards - if the producer may have started on the
+# frame's slot in the meantime (write_seq >= seq + n_slots - 1: the next
+# publish goes there) the frame is discarded. The result is a single 8-byte word so
+# it can never be seen half-written.
+
+import os
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from classifier.protocol import FRAME_DIM
+
+MAGIC = 0x48434C5152494E01  # "HCLQRIN" v1
+HEADER_BYTES = 64
+DEFAULT_NAME = "hc-quality"
+DEFAULT_SLOTS = 8
+
+_WRITE, _RESULT, _HEARTBEAT, _SLOTS, _PID = 1, 2, 3, 4, 5
+
+
+def _untrack(shm):
+    # Python < 3.13 registers attached segments with the resource tracker,
+    # which unlinks them when *this* process exits. Only the owner should.
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+
+
+class ShmRing:
+    """Shared-memory landmark ring. Use ShmRing.create() in the worker, ShmRing.attach() in clients."""
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner
+        buf = shm.buf
+        self._u64 = np.ndarray((HEADER_BYTES // 8,), dtype="<u8", buffer=buf)
+        self._f64 = np.ndarray((HEADER_BYTES // 8,), dtype="<f8", buffer=buf)
+        if self._u64[0] != MAGIC:
+            raise ValueError(f"shared memory {shm.name!r} is not a landmark ring")
+        self.n_slots = int(self._u64[_SLOTS])
+        self.slots = np.ndarray((self.n_slots, FRAME_DIM), dtype="<f4", buffer=buf, offset=HEADER_BYTES)
+
+    @classmethod
+    def create(cls, name=DEFAULT_NAME, n_slots=DEFAULT_SLOTS):
+        """Raises FileExistsError if a live worker already serves a ring under `name`."""
+        size = HEADER_BYTES + n_slots * FRAME_DIM * 4
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            old = cls.attach(name)
+            pid = int(old._u64[_PID])
+            alive = old.owner_alive()
+            old.close()
+            if alive:
+                raise FileExistsError(f"shared memory {name!r} is served by a live worker (pid {pid})")
+            # left over from a worker that crashed; take it over
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        hdr = np.ndarray((HEADER_BYTES // 8,), dtype="<u8", buffer=shm.buf)
+        hdr[:] = 0
+        hdr[_SLOTS] = n_slots
+        hdr[0] = MAGIC
+        ring = cls(shm, owner=True)
+        ring.heartbeat(os.getpid())     # claimed from the start, not from the first beat
+        return ring
+
+    @classmethod
+    def attach(cls, name=DEFAULT_NAME):
+        """Raises FileNotFoundError if no worker has created the ring."""
+        shm = shared_memory.SharedMemory(name=name)
+        _untrack(shm)
+        return cls(shm, owner=False)
+
+    # ---- producer (client) ----
+    def publish(self, left21):
+        seq = int(self._u64[_WRITE]) + 1
+        self.slots[seq % self.n_slots] = np.asarray(left21, dtype=np.float32).reshape(FRAME_DIM)
+        self._u64[_WRITE] = seq
+        return seq
+
+    def result(self):
+        """-> (seq, quality index); seq 0 means no result yet."""
+        word = int(self._u64[_RESULT])
+        return word >> 8, word & 0xFF
+
+    def worker_alive(self, max_age_s=1.0):
+        return self._u64[_PID] != 0 and time.time() - float(self._f64[_HEARTBEAT]) < max_age_s
+
+    def owner_alive(self, max_age_s=5.0):
+        """The creating worker's process still exists and heartbeated recently (create() won't take it over)."""
+        pid = int(self._u64[_PID])
+        if not pid:
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass                # exists, owned by another user
+        return self.worker_alive(max_age_s)
+
+    # ---- consumer (worker) ----
+    def write_seq(self):
+        return int(self._u64[_WRITE])
+
+    def frame(self, seq):
+        """Zero-copy (63,) view of frame `seq`; check still_valid(seq) after using it."""
+        return self.slots[seq % self.n_slots]
+
+    def still_valid(self, seq):
+        # write_seq is bumped after the slot is filled, so frame seq + n_slots
+        # is already being written into seq's slot while it reads seq + n_slots - 1
+        return int(self._u64[_WRITE]) - seq < self.n_slots - 1
+
+    def set_result(self, seq, idx):
+        self._u64[_RESULT] = (seq << 8) | (idx & 0xFF)
+
+    def heartbeat(self, pid):
+        self._f64[_HEARTBEAT] = time.time()
+        self._u64[_PID] = pid
+
+    def close(self):
+        if self.owner:
+            self._u64[_PID] = 0
+        # drop our numpy views first, otherwise the mmap can't be released
+        self._u64 = self._f64 = self.slots = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,94 @@
+# Local classifier process for the shared-memory transport (shm_ring.py).
+#
+#   python -m classifier.shm_worker [--name hc-quality] [--backend numpy] [--weights w.npz]
+#
+# Polls the ring for the newest frame, classifies it in place and writes the
+# result word. Busy-polls (yielding the CPU) for `spin_us` after each frame,
+# then backs off to short sleeps so an idle worker costs next to nothing.
+
+import argparse
+import os
+import signal
+import time
+
+from classifier.backends import make_backend
+from classifier.shm_ring import ShmRing, DEFAULT_NAME, DEFAULT_SLOTS
+
+HEARTBEAT_S = 0.1
+_yield = getattr(os, "sched_yield", lambda: time.sleep(0))
+
+
+class ShmWorker:
+    def __init__(self, backend, name=DEFAULT_NAME, n_slots=DEFAULT_SLOTS, spin_us=2000, idle_sleep_us=200):
+        self.backend = backend
+        self.ring = ShmRing.create(name, n_slots)
+        self.spin = spin_us / 1e6
+        self.idle_sleep = idle_sleep_us / 1e6
+        self.pid = os.getpid()
+        self.handled = 0
+        self.stale = 0       # frames overwritten by the client while being classified
+        self._stop = False
+
+    def stop(self, *_):
+        self._stop = True
+
+    def run(self):
+        ring = self.ring
+        clock = time.perf_counter
+        last = 0
+        last_frame = clock()
+        next_beat = 0.0
+        ring.heartbeat(self.pid)
+        while not self._stop:
+            seq = ring.write_seq()
+            if seq == last:
+                now = clock()
+                if now >= next_beat:
+                    ring.heartbeat(self.pid)
+                    next_beat = now + HEARTBEAT_S
+                if now - last_frame < self.spin:
+                    _yield()
+                else:
+                    time.sleep(self.idle_sleep)
+                continue
+            # newest frame only; anything in between is already stale
+            idx = int(self.backend.predict(ring.frame(seq).reshape(1, -1))[0])
+            if ring.still_valid(seq):
+                ring.set_result(seq, idx)
+                self.handled += 1
+            else:
+                self.stale += 1
+            last = seq
+            last_frame = clock()
+
+    def close(self):
+        self.ring.close()
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="shared-memory chord-quality worker")
+    p.add_argument("--name", default=DEFAULT_NAME, help="shared memory segment name")
+    p.add_argument("--slots", type=int, default=DEFAULT_SLOTS)
+    p.add_argument("--backend", default="numpy", help="classifier backend (see classifier.backends)")
+    p.add_argument("--weights", help=".npz or .pt weights (default: random init)")
+    p.add_argument("--threads", type=int, default=1)
+    p.add_argument("--spin-us", type=int, default=2000, help="busy-poll window after each frame")
+    args = p.parse_args(argv)
+
+    backend = make_backend(args.backend, args.weights, threads=args.threads, warmup=True)
+    try:
+        worker = ShmWorker(backend, args.name, args.slots, spin_us=args.spin_us)
+    except FileExistsError as e:
+        raise SystemExit(f"[shm-worker] {e}")
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    print(f"[shm-worker] {backend.name} serving /dev/shm/{args.name} (pid {worker.pid})", flush=True)
+    try:
+        worker.run()
+    finally:
+        worker.close()
+        print(f"[shm-worker] handled {worker.handled}, stale {worker.stale}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# Train / evaluate the chord-quality classifier (SimpleMLP) on recorded
+# landmark sessions (see classifier/dataset.py for where labels come from).
+#
+#   python -m classifier.train min=takes/fist.hclm maj=takes/half.hclm 7=takes/open.hclm \
+#       [labelled.hclm (+ .labels.npy) ...] [--epochs 15] [--batch 1024] [--workers 2] [--out weights]
+#   python -m classifier.train --eval weights/quality-v3.npz takes/*.hclm
+#
+# Training runs on CPU. Augmented batches are produced by a torch DataLoader
+# with --workers processes, each drawing from the memory-mapped sessions
+# with its own random stream. Weights are written as the next
+# weights/quality-v<N>.npz (classifier/weights.py format, with meta.version,
+# meta.classes and meta.input="normalized") and load straight into the
+# server:  HC_WEIGHTS=weights/quality-v3.npz uvicorn server:app
+#
+# Prints samples/sec for training and a per-class accuracy / confusion
+# report on held-out data (the tail of every session), computed on the
+# written file through the same NumPy backend the server uses. It also
+# reports how often the model agrees with the CPU spread rule there: the
+# rule reads absolute hand size, which the model's normalized input no
+# longer has, so agreement is measured rather than assumed.
+
+import argparse
+import glob
+import json
+import os
+import re
+import time
+
+import numpy as np
+
+from classifier.backends import NumpyBackend
+from classifier.dataset import SessionSet, batches, spread_labels
+from classifier.protocol import QUALITY
+from classifier.weights import load_weights, save_weights
+
+AUGMENTATION = {"rotate_deg": 20.0, "scale": (0.85, 1.2), "aspect": 0.08, "mirror": 0.5, "jitter": 0.004}
+
+
+def next_version(out_dir):
+    versions = [int(m.group(1)) for p in glob.glob(os.path.join(out_dir, "quality-v*.npz"))
+                if (m := re.search(r"quality-v(\d+)\.npz$", p))]
+    return max(versions, default=0) + 1
+
+
+def evaluate(backend, data, ids, chunk=8192):
+    """
+    Per-class accuracy and confusion matrix (rows = truth) of `backend` on
+    samples `ids`, plus its agreement with the spread rule on the same hands.
+    """
+    n = len(QUALITY)
+    confusion = np.zeros((n, n), dtype=np.int64)
+    agree = 0
+    t0 = time.perf_counter()
+    for i in range(0, len(ids), chunk):
+        hands, y = data.gather(ids[i:i + chunk])
+        pred = backend.predict(hands.reshape(len(hands), 63))
+        np.add.at(confusion, (y, pred), 1)
+        agree += int((pred == spread_labels(hands)).sum())
+    secs = time.perf_counter() - t0
+    per_class = {q: (float(confusion[k, k] / confusion[k].sum()) if confusion[k].sum() else None)
+                 for k, q in enumerate(QUALITY)}
+    total = confusion.sum()
+    return {
+        "samples": int(total),
+        "accuracy": float(np.trace(confusion) / total) if total else None,
+        "per_class_accuracy": per_class,
+        "confusion": confusion.tolist(),
+        "spread_rule_agreement": agree / total if total else None,
+        "samples_per_s": total / secs if secs > 0 else None,
+    }
+
+
+def _loader(data, ids, args, epoch):
+    """DataLoader over augmented batches; each worker makes its share of the steps."""
+    import torch
+    from torch.utils.data import DataLoader, IterableDataset
+
+    steps = max(1, len(ids) // args.batch)
+
+    class Batches(IterableDataset):
+        def __iter__(self):
+            info = torch.utils.data.get_worker_info()
+            wid, nw = (info.id, info.num_workers) if info is not None else (0, 1)
+            rng = np.random.default_rng((args.seed, epoch, wid))
+            mine = steps // nw + (wid < steps % nw)
+            for x, y in batches(data, ids, args.batch, mine, rng, AUGMENTATION):
+                yield torch.from_numpy(x), torch.from_numpy(y)
+
+    return DataLoader(Batches(), batch_size=None, num_workers=args.workers,
+                      prefetch_factor=4 if args.workers else None), steps
+
+
+def train(data, train_ids, args):
+    import torch
+    from classifier.model import SimpleMLP
+    torch.manual_seed(args.seed)
+    torch.set_num_threads(args.threads)
+    model = SimpleMLP(63, args.hidden, len(QUALITY))
+    opt = torch.optim.AdamW(model.parameters(), lr=args.lr, weight_decay=1e-4)
+    total_steps = args.epochs * max(1, len(train_ids) // args.batch)
+    sched = torch.optim.lr_scheduler.OneCycleLR(opt, max_lr=args.lr, total_steps=total_steps)
+    loss_fn = torch.nn.CrossEntropyLoss()
+
+    seen = 0
+    t0 = time.perf_counter()
+    for epoch in range(args.epochs):
+        loader, _ = _loader(data, train_ids, args, epoch)
+        running = 0.0
+        n = 0
+        for x, y in loader:
+            loss = loss_fn(model(x), y)
+            opt.zero_grad(set_to_none=True)
+            loss.backward()
+            opt.step()
+            if sched.last_epoch < total_steps - 1:
+                sched.step()
+            running += loss.item() * len(y)
+            n += len(y)
+        seen += n
+        elapsed = time.perf_counter() - t0
+        print(f"epoch {epoch + 1:3d}/{args.epochs}  loss {running / max(1, n):.4f}  "
+              f"{seen / elapsed:,.0f} samples/s", flush=True)
+    secs = time.perf_counter() - t0
+    return model, {"epochs": args.epochs, "samples": seen, "seconds": secs, "samples_per_s": seen / secs}
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="train / evaluate the chord-quality classifier")
+    p.add_argument("sessions", nargs="+", help="recorded .hclm sessions, optionally CLASS=path (CLASS in min, maj, 7)")
+    p.add_argument("--spread-rule-labels", action="store_true",
+                   help="label unlabelled sessions with the CPU spread rule (reads hand size, "
+                        "which the model never sees: expect poor accuracy)")
+    p.add_argument("--eval", metavar="WEIGHTS", help="only evaluate these weights on the sessions")
+    p.add_argument("--out", default="weights", help="directory for quality-v<N>.npz")
+    p.add_argument("--epochs", type=int, default=15)
+    p.add_argument("--batch", type=int, default=1024)
+    p.add_argument("--lr", type=float, default=3e-3)
+    p.add_argument("--hidden", type=int, default=64)
+    p.add_argument("--val-frac", type=float, default=0.15, help="tail of every session held out for eval")
+    p.add_argument("--workers", type=int, default=min(4, max(0, (os.cpu_count() or 1) - 1)),
+                   help="data loader processes (0 = in the training process)")
+    p.add_argument("--threads", type=int, default=1, help="torch intra-op threads for the training step")
+    p.add_argument("--seed", type=int, default=0)
+    args = p.parse_args(argv)
+
+    try:
+        data = SessionSet(args.sessions, spread_rule=args.spread_rule_labels)
+    except ValueError as e:
+        raise SystemExit(f"{e}\n(--spread-rule-labels labels them with the CPU spread rule)")
+    if not len(data):
+        raise SystemExit("no labelled left hands in these sessions")
+    report = {"sessions": data.label_source, "samples": int(len(data)),
+              "class_counts": dict(zip(QUALITY, data.class_counts().tolist()))}
+
+    if args.eval:
+        state, meta = load_weights(args.eval)
+        backend = NumpyBackend(state, meta.get("input") == "normalized")
+        report.update(weights=args.eval, meta=meta, eval=evaluate(backend, data, np.arange(len(data))))
+        print(json.dumps(report, indent=2))
+        return
+
+    train_ids, val_ids = data.split(args.val_frac)
+    model, report["train"] = train(data, train_ids, args)
+
+    os.makedirs(args.out, exist_ok=True)
+    version = next_version(args.out)
+    path = os.path.join(args.out, f"quality-v{version}.npz")
+    save_weights(path, model.state_dict(), version=version, classes=QUALITY, input="normalized",
+                 created=time.time(), sessions=[os.path.basename(s) for s in data.paths],
+                 samples=len(train_ids), epochs=args.epochs)
+    # evaluate exactly what the server will run: the saved file through NumpyBackend,
+    # then add the results to its meta (the arrays are written back unchanged)
+    state, meta = load_weights(path)
+    report["eval"] = evaluate(NumpyBackend(state, meta.get("input") == "normalized"), data, val_ids)
+    save_weights(path, state, **meta, val_accuracy=report["eval"]["accuracy"] or 0.0,
+                 per_class_accuracy=[np.nan if a is None else a for a in report["eval"]["per_class_accuracy"].values()])
+    report["weights"] = path
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
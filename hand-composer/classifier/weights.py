@@ -0,0 +1,41 @@
+# SimpleMLP weight files, readable without torch.
+#
+# .npz (preferred): arrays named like the state_dict ("fc1.weight", ...) plus
+#                   optional "meta.version" / "meta.classes" entries
+# .pt / .pth:       a torch state_dict (needs torch to read)
+
+import os
+import numpy as np
+
+LAYERS = ("fc1", "fc2", "fc3")
+
+
+def load_weights(path):
+    """-> (dict of float32 numpy arrays keyed like SimpleMLP.state_dict(), meta dict)"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".npz":
+        with np.load(path, allow_pickle=False) as z:
+            state = {k: z[k].astype(np.float32) for k in z.files if not k.startswith("meta.")}
+            meta = {k[5:]: z[k].tolist() for k in z.files if k.startswith("meta.")}
+    else:
+        import torch
+        sd = torch.load(path, map_location="cpu", weights_only=True)
+        state = {k: v.detach().float().numpy() for k, v in sd.items()}
+        meta = {}
+    missing = [f"{l}.{p}" for l in LAYERS for p in ("weight", "bias") if f"{l}.{p}" not in state]
+    if missing:
+        raise ValueError(f"{path}: missing weights {missing}")
+    return state, meta
+
+
+def save_weights(path, state, **meta):
+    """state: name -> array (numpy or torch); meta: extra scalars/lists stored as meta.<key>."""
+    arrays = {k: np.asarray(v.detach().cpu().numpy() if hasattr(v, "detach") else v, dtype=np.float32)
+              for k, v in state.items()}
+    arrays.update({f"meta.{k}": np.asarray(v) for k, v in meta.items()})
+    np.savez(path, **arrays)
+
+
+def dims(state):
+    """(in_dim, hidden, out_dim) implied by a state dict."""
+    return state["fc1.weight"].shape[1], state["fc1.weight"].shape[0], state["fc3.weight"].shape[0]
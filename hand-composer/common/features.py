@@ -0,0 +1,73 @@
+# Per-frame hand features, computed once and shared by every mapper.
+# Plain numpy on landmark arrays, in a package of its own so the music
+# mappers, the classifier's dataset and the demo share it without music
+# depending on perception.
+#
+# Works on one frame (H,21,3) or a batch of frames (N,H,21,3); all fields
+# keep the leading batch axes. Row order follows HandTracker: 0 = right
+# (if present), 1 = left.
+
+import numpy as np
+
+WRIST = 0
+TIPS = [4, 8, 12, 16, 20]
+# joint chains per finger (thumb..pinky) are landmarks 4i+1 .. 4i+4
+
+
+class HandFeatures:
+    """
+    centroid   (...,H,2)  mean x,y of all 21 landmarks
+    tip_dist   (...,H,5)  fingertip-to-wrist distance in x,y
+    spread     (...,H)    mean of tip_dist (openness)
+    curl       (...,H,5)  0 = straight finger, -> 1 = fully curled
+    inter_hand (...)      distance between hand centroids (nan if < 2 hands)
+    """
+    __slots__ = ("n_hands", "centroid", "tip_dist", "spread", "curl", "inter_hand")
+
+    def __init__(self, n_hands, centroid, tip_dist, spread, curl, inter_hand):
+        self.n_hands = n_hands
+        self.centroid = centroid
+        self.tip_dist = tip_dist
+        self.spread = spread
+        self.curl = curl
+        self.inter_hand = inter_hand
+
+    @classmethod
+    def from_hands(cls, hands):
+        if hands is None or hands.shape[-3] == 0:
+            return EMPTY
+        # few, large numpy calls: per-call overhead dominates on a single frame
+        xy = hands[..., :2]
+        centroid = np.add.reduce(xy, axis=-2) * (1.0 / 21)
+        v = xy[..., TIPS, :] - xy[..., WRIST:WRIST + 1, :]
+        tip_dist = np.sqrt(np.add.reduce(v * v, axis=-1))
+        spread = np.add.reduce(tip_dist, axis=-1) * (1.0 / len(TIPS))
+
+        # curl: 1 - (straight base->tip distance / length along the joints).
+        # Consecutive-landmark steps, viewed as (5 fingers, 4 steps); step 0
+        # of each finger is the jump from the previous finger and is ignored.
+        steps = (hands[..., 1:, :] - hands[..., :-1, :]).reshape(*hands.shape[:-2], 5, 4, 3)[..., 1:, :]
+        seg = np.add.reduce(np.sqrt(np.add.reduce(steps * steps, axis=-1)), axis=-1)
+        chord = np.add.reduce(steps, axis=-2)
+        direct = np.sqrt(np.add.reduce(chord * chord, axis=-1))
+        curl = 1.0 - direct / np.maximum(seg, 1e-6)
+
+        n = hands.shape[-3]
+        if n >= 2:
+            dc = centroid[..., 0, :] - centroid[..., 1, :]
+            inter_hand = np.sqrt(np.add.reduce(dc * dc, axis=-1))
+        else:
+            inter_hand = np.full(hands.shape[:-3], np.nan, dtype=np.float32)
+            if inter_hand.ndim == 0:
+                inter_hand = float("nan")
+        return cls(n, centroid, tip_dist, spread, curl, inter_hand)
+
+
+def features_of(hands):
+    """Accept either raw landmarks or already-computed features."""
+    if isinstance(hands, HandFeatures):
+        return hands
+    return HandFeatures.from_hands(hands)
+
+
+EMPTY = HandFeatures(0, None, None, None, None, float("nan"))
@@ -0,0 +1,126 @@
+# Speed-adaptive smoothing (One-Euro filter, Casiez et al. 2012).
+#
+# A low-pass whose cutoff rises with the signal's own (smoothed) speed:
+#   cutoff = min_cutoff + beta * |dx/dt|
+# so a still hand gets heavy smoothing (no jitter) and a fast one gets
+# almost none (no lag). Optionally the output is pushed forward along the
+# smoothed velocity by `predict_s` to cancel known pipeline latency.
+#
+# OneEuroFilter works on an array of any fixed shape in one vectorized
+# step; HandFilterBank keeps one (21,3) filter per hand, keyed by
+# handedness, so hands appearing / disappearing never blend into each other.
+
+import math
+
+import numpy as np
+
+
+def _alpha(cutoff, dt):
+    r = 2.0 * math.pi * cutoff * dt
+    return r / (r + 1.0)
+
+
+class OneEuroFilter:
+    """
+    shape: shape of each sample (() for a scalar).
+    speed_axis: if set, the cutoff follows the velocity norm along that axis
+    (e.g. -1 for xyz points, so all three coordinates of a landmark share
+    one cutoff); otherwise each element adapts on its own.
+    """
+    def __init__(self, shape=(), min_cutoff=1.0, beta=0.0, d_cutoff=1.0, predict_s=0.0, speed_axis=None):
+        self.shape = tuple(shape)
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.predict_s = predict_s
+        self.speed_axis = speed_axis
+        self._x = np.zeros(self.shape)     # filtered value
+        self._raw = np.zeros(self.shape)   # previous raw sample, for the velocity estimate
+        self._dx = np.zeros(self.shape)    # filtered velocity (units / s)
+        self._t = None
+
+    def reset(self):
+        self._t = None
+
+    def __call__(self, x, t):
+        """Filter sample `x` taken at time `t` (seconds) -> new array."""
+        if self._t is None:
+            self._x[...] = x
+            self._raw[...] = x
+            self._dx[...] = 0.0
+            self._t = t
+            return self.value()
+        dt = t - self._t
+        if dt <= 0:
+            return self.value()
+        self._t = t
+        x = np.asarray(x, dtype=np.float64)
+        dx = (x - self._raw) / dt
+        self._raw[...] = x
+        self._dx += _alpha(self.d_cutoff, dt) * (dx - self._dx)
+        if self.speed_axis is None:
+            speed = np.abs(self._dx)
+        else:
+            speed = np.sqrt((self._dx * self._dx).sum(axis=self.speed_axis, keepdims=True))
+        r = (2.0 * math.pi * dt) * (self.min_cutoff + self.beta * speed)
+        self._x += (r / (r + 1.0)) * (x - self._x)
+        return self.value()
+
+    def value(self):
+        if self.predict_s:
+            return self._x + self._dx * self.predict_s
+        return self._x.copy()
+
+    @property
+    def velocity(self):
+        return self._dx
+
+
+class HandFilterBank:
+    """
+    One OneEuroFilter per hand, keyed by handedness label.
+
+    A hand missing for longer than `forget_s` starts from scratch when it
+    comes back, instead of sliding in from where it was last seen.
+    Defaults are in MediaPipe's normalized image units: hold still ->
+    ~1.5 Hz cutoff; moving half a frame width per second -> ~20 Hz
+    (tuned with bench/smoothing_lag.py).
+    """
+    def __init__(self, min_cutoff=1.5, beta=40.0, d_cutoff=1.0, predict_s=0.0, forget_s=0.3):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.forget_s = forget_s
+        self._predict_s = predict_s
+        self._filters = {}   # label -> OneEuroFilter
+        self._seen = {}      # label -> last time it was filtered
+
+    @property
+    def predict_s(self):
+        return self._predict_s
+
+    @predict_s.setter
+    def predict_s(self, value):
+        self._predict_s = value
+        for f in self._filters.values():
+            f.predict_s = value
+
+    def reset(self):
+        self._filters.clear()
+        self._seen.clear()
+
+    def __call__(self, hands, handedness, t):
+        """(H,21,3) rows labelled by `handedness` at time t -> filtered (H,21,3) float32, or None."""
+        if hands is None:
+            return None
+        out = np.empty(hands.shape, dtype=np.float32)
+        for k in range(hands.shape[0]):
+            label = handedness[k] if k < len(handedness) else k
+            f = self._filters.get(label)
+            if f is None or t - self._seen[label] > self.forget_s:
+                f = self._filters[label] = OneEuroFilter(
+                    hands.shape[1:], self.min_cutoff, self.beta, self.d_cutoff,
+                    self._predict_s, speed_axis=-1)
+            out[k] = f(hands[k], t)
+            self._seen[label] = t
+        return out
@@ -0,0 +1,130 @@
+# Building blocks for the staged demo loop (see demo/run.py).
+#
+# Stages run on their own threads and hand data to each other through
+# LatestSlot mailboxes: a writer always overwrites, a reader only ever sees
+# the newest value. A slow consumer therefore drops stale frames instead of
+# building a queue, and a slow stage can't stall the ones upstream of it.
+
+import threading
+import time
+
+from perf.stats import Histogram
+
+
+class LatestSlot:
+    """Single-value mailbox with drop accounting."""
+    def __init__(self, name):
+        self.name = name
+        self._cv = threading.Condition()
+        self._value = None
+        self._version = 0
+        self._taken = 0            # version last handed to the consumer
+        self._closed = False
+        self.puts = 0
+        self.dropped = 0           # values overwritten before anyone took them
+
+    def put(self, value):
+        with self._cv:
+            if self._version > self._taken:
+                self.dropped += 1
+            self._value = value
+            self._version += 1
+            self.puts += 1
+            self._cv.notify_all()
+
+    def take(self, timeout=None):
+        """
+        Newest unread value, waiting up to `timeout` seconds (None = forever,
+        0 = don't wait). Returns None if nothing new arrived.
+        """
+        with self._cv:
+            if timeout == 0:
+                ready = self._version > self._taken
+            else:
+                ready = self._cv.wait_for(
+                    lambda: self._version > self._taken or self._closed, timeout)
+            if not ready or self._version == self._taken:
+                return None
+            self._taken = self._version
+            return self._value
+
+    def peek(self):
+        with self._cv:
+            return self._value
+
+    @property
+    def depth(self):
+        return 1 if self._version > self._taken else 0
+
+    def close(self):
+        with self._cv:
+            self._closed = True
+            self._cv.notify_all()
+
+    def stats(self):
+        return {"puts": self.puts, "dropped": self.dropped, "depth": self.depth}
+
+
+class Stage:
+    """
+    Calls `step()` in a loop until `stop` is set.
+
+    rate_hz=None: free-running (step is expected to block on its input slot)
+    rate_hz=N:    fixed tick on absolute deadlines, so slow steps don't
+                  accumulate drift; missed ticks are skipped, not bunched up.
+    """
+    def __init__(self, name, step, stop, rate_hz=None):
+        self.name = name
+        self.step = step
+        self.stop = stop
+        self.period = 1.0 / rate_hz if rate_hz else None
+        self.busy_ms = Histogram(f"{name}_busy_ms")
+        self.iterations = 0
+        self.missed_ticks = 0
+        self._t_start = None
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name=f"stage-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run(self):
+        self._t_start = time.perf_counter()
+        deadline = self._t_start
+        while not self.stop.is_set():
+            t0 = time.perf_counter()
+            try:
+                self.step()
+            except Exception as e:
+                print(f"[{self.name}] stage error:", e)
+            t1 = time.perf_counter()
+            self.busy_ms.observe((t1 - t0) * 1000.0)
+            self.iterations += 1
+
+            if self.period is not None:
+                deadline += self.period
+                if deadline < t1:
+                    skipped = int((t1 - deadline) / self.period) + 1
+                    self.missed_ticks += skipped
+                    deadline += skipped * self.period
+                self.stop.wait(max(0.0, deadline - time.perf_counter()))
+
+    @property
+    def rate_hz(self):
+        if self._t_start is None:
+            return 0.0
+        elapsed = time.perf_counter() - self._t_start
+        return self.iterations / elapsed if elapsed > 0 else 0.0
+
+    def stats(self):
+        return {
+            "hz": self.rate_hz,
+            "busy_p50_ms": self.busy_ms.quantile(0.50),
+            "busy_p95_ms": self.busy_ms.quantile(0.95),
+            "missed_ticks": self.missed_ticks,
+        }
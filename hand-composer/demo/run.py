@@ -1,198 +1,446 @@
-import torch, time
-import cv2
-import pygame
+import time
+import argparse
+import threading
 import numpy as np
-from perception.hands import HandTracker
-from music.midi_engine import MidiEngine
-from music.chord_mapper import (
-    right_hand_root, left_pose_quality, chord_from,
-    velocity_from_spread, tempo_from_distance, label_chord
-)
-from viz.hud import HUD
-from collections import deque
+from common.features import HandFeatures
+from common.filters import HandFilterBank
+from perception.recording import LandmarkRecorder, ReplayTracker
+from perception.pool import PerceptionPool, PerformerSpec
+from music.chord_mapper import left_pose_quality, velocity_from_spread, tempo_from_distance
+from music.chord_table import default_table
+from music.smoothing import RootSmoother, ROOT_SMOOTHING
+from demo.pipeline import LatestSlot, Stage
+from demo.startup import Startup
+from perf import trace
+from perf.stats import Histogram
+# cv2 / mediapipe / pygame / mido are imported inside the startup phases
+# that need them, so they load side by side instead of before main() runs
 
 SAFE_MODE = False # for debug, set to true if freezing / no audio desired
 
 KEY_NAMES = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
 
 ADC_URL = "http://localhost:8000/predict"
+STREAM_URL = "ws://localhost:8000/stream"
+USE_STREAM = True # persistent binary websocket; False = HTTP per frame (off the control thread)
+SHM_NAME = "hc-quality" # same-host classifier.shm_worker; "" = always go over the network
 
-import requests
-def gpu_quality(left_hand_21):
-    r = requests.post(ADC_URL, json={"left21": left_hand_21.tolist()})
-    r.raise_for_status()
-    return r.json()["quality"]
+from perception.quality_client import AsyncQualityClient, HttpQualityClient, StreamQualityClient, ShmQualityClient
+from classifier.cache import PredictionCache, Hysteresis
 
-class RootSmoother:
-    """
-    Smooths right-hand root changes:
-      - EMA on continuous root
-      - deadband in semitones around the committed root
-      - max semitone step per commit (slew-rate)
-      - minimum time between commits (debounce)
-    """
-    def __init__(self, low=36, high=72, alpha=0.35, deadband_semi=0.45,
-                 max_step_semi=2, min_interval_ms=90):
-        self.low, self.high = low, high
-        self.alpha = alpha
-        self.deadband = deadband_semi
-        self.max_step = max_step_semi
-        self.min_interval = min_interval_ms
-        self._ema = None           # continuous (float) root
-        self._commit = 60          # current committed MIDI root
-        self._last_commit_ms = 0
-
-    def _extract_y(self, hands):
-        if hands is None or hands.shape[0] == 0:
-            return None
-        # right hand avg y in [0..1]
-        return float(hands[0][:,1].mean())
-
-    def update(self, hands, now_ms):
-        y = self._extract_y(hands)
-        if y is None:
-            return self._commit
-
-        # map to float MIDI in [low..high], top of screen -> higher pitch
-        root_float = self.low + (1.0 - np.clip(y, 0.0, 1.0)) * (self.high - self.low)
-
-        # EMA smoothing
-        self._ema = root_float if self._ema is None else (self.alpha*root_float + (1-self.alpha)*self._ema)
-
-        # propose rounded target
-        target = int(round(self._ema))
-
-        # deadband: if within ±deadband of current commit, keep current
-        if abs(target - self._commit) <= self.deadband:
-            return self._commit
-
-        # debounce time
-        if (now_ms - self._last_commit_ms) < self.min_interval:
-            return self._commit
-
-        # slew-rate limit: move at most ±max_step per commit
-        delta = target - self._commit
-        if abs(delta) > self.max_step:
-            target = self._commit + (self.max_step if delta > 0 else -self.max_step)
-
-        # clamp to range & commit
-        target = int(max(self.low, min(self.high, target)))
-        self._commit = target
-        self._last_commit_ms = now_ms
-        return self._commit
-    
-
-
-def main():
-    tracker = HandTracker(smooth_alpha=0.6)
-    #synth = MidiEngine(soundfont_path="/Users/ellie/Downloads/FluidR3_GM.sf2")
 
-    hud = HUD()
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    from perception.classifier import load_classifier, predict_quality
-    clf = load_classifier(device)
-    use_gpu_classifier = torch.cuda.is_available()
+CONTROL_HZ = 200 # MIDI control tick, independent of camera / HUD rate
 
-    smoother = RootSmoother(low = 48, high = 72, alpha = 0.35, deadband_semi = 0.5, max_step_semi = 1, min_interval_ms = 100)
 
-    # control state
-    main_key_semitones = 0
-    scale_lock = False #toggle with "S" key
-    last_quit = False 
+class ControlState:
+    """Performer controls set from key events (render thread), read by the control stage."""
+    def __init__(self, use_gpu_classifier=False):
+        self.main_key_semitones = 0
+        self.scale_lock = False #toggle with "S" key
+        self.use_gpu_classifier = use_gpu_classifier
+        self.classifier_ready = False # set once the remote classifier has answered (warm_classifier)
+        self.panic = False      # set by UI, serviced on the control thread
 
-    clock = pygame.time.Clock()
+    @property
+    def remote_quality(self):
+        """Use the remote classifier? Until it is warm, the CPU left_pose_quality plays."""
+        return self.use_gpu_classifier and self.classifier_ready
 
-    # synth only when not in safe mode
-    synth = None
-    if not SAFE_MODE:
-        synth = MidiEngine(port_name="HandComposer")
 
-    last_notes = []
-    
-    try:
-        while True:
-            t0 = time.time()
-            # read key events
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    last_quit = True
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_UP:
-                        main_key_semitones = (main_key_semitones + 1) % 12
-                    elif event.key == pygame.K_DOWN:
-                        main_key_semitones = (main_key_semitones - 1) % 12
-                    elif event.key == pygame.K_s:
-                        scale_lock = not scale_lock
-                    elif event.key == pygame.K_SPACE:
-                        synth.panic() #stops all notes
-                    elif event.key == pygame.K_ESCAPE:
-                        last_quit = True
-                    elif event.key == pygame.K_g:
-                        use_gpu_classifier = not use_gpu_classifier
-            if last_quit:
-                synth.stop()
-                tracker.release()
-                hud.quit()
-                return
-            
-            frame, hands, fps_cam = tracker.read()
-            if frame is None:
-                continue
+def warm_classifier(ctl, quality_stream, stop, poll_s=0.1):
+    """
+    Startup phase, in the background: send a probe pose until the remote
+    classifier (shm worker / websocket / HTTP) answers, which connects and
+    warms the whole path, then hand quality over to it.
+    """
+    probe = np.zeros((21, 3), dtype=np.float32)
+    while not stop.is_set():
+        quality_stream.submit(probe, cached=False)  # a zero pose mustn't land in the cache / hysteresis
+        if stop.wait(poll_s):
+            return False
+        if quality_stream.latest() is not None:
+            break
+    # forget the probe's class: the CPU rule stays in charge until a real hand is classified
+    quality_stream.reset()
+    ctl.classifier_ready = True
+    return True
+
+
+class Performer:
+    """Control-stage state of one performer: own root smoother, chord and MIDI channel."""
+    def __init__(self, name, channel=0):
+        self.name = name
+        self.channel = channel
+        self.hands_in = LatestSlot(f"hands:{name}")
+        self.smoother = RootSmoother(**ROOT_SMOOTHING)
+        self.hands = None
+        self.feats = None       # None until the first landmarks arrive
+        self.ts = 0.0
+        self.root = 60
+        self.chord = None
+
+
+PERFORMER_COLORS = [(0, 255, 0), (255, 160, 0), (0, 160, 255), (255, 0, 200)]
+
+def draw_performers(canvas, specs, hands_per_performer):
+    """Landmark-only view for --performers: each performer's dots inside its own region."""
+    import cv2
+    canvas[:] = 0
+    h, w = canvas.shape[:2]
+    for i, (spec, hands) in enumerate(zip(specs, hands_per_performer)):
+        if hands is None:
+            continue
+        x0, y0, x1, y1 = spec.region or (0.0, 0.0, 1.0, 1.0)
+        color = PERFORMER_COLORS[i % len(PERFORMER_COLORS)]
+        for hand in hands:
+            for x, y, _ in hand:
+                cv2.circle(canvas, (int((x0 + x * (x1 - x0)) * w), int((y0 + y * (y1 - y0)) * h)), 4, color, -1)
+    return canvas.copy()
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Hand Composer demo")
+    src = p.add_mutually_exclusive_group()
+    src.add_argument("--camera", type=int, default=0, help="camera index (default 0)")
+    src.add_argument("--video", help="run the tracker on a video file instead of the camera")
+    src.add_argument("--replay", help="replay a recorded landmark session (.hclm)")
+    src.add_argument("--performers", nargs="+", metavar="SPEC",
+                     help="one tracker process per performer, e.g. camera:0@left camera:0@right "
+                          "or replay:a.hclm replay:b.hclm; performer N plays on MIDI channel N")
+    p.add_argument("--fast", action="store_true", help="video/replay as fast as possible instead of real time")
+    p.add_argument("--loop", action="store_true", help="loop video/replay at the end")
+    p.add_argument("--record", help="append tracked landmarks to this .hclm file")
+    p.add_argument("--record-midi", metavar="PATH",
+                   help="stream every note sent to this .mid file; with --record the landmarks share its clock")
+    p.add_argument("--roi", action="store_true", help="feed MediaPipe only a box around the tracked hands")
+    p.add_argument("--infer-width", type=int, help="downscale MediaPipe input to this width (e.g. 640)")
+    p.add_argument("--motion-threshold", type=float,
+                   help="skip the landmark model while the ROI changes less than this (mean grey level, e.g. 2)")
+    p.add_argument("--predict-ms", type=float, default=0.0,
+                   help="extrapolate landmarks this far ahead to cancel pipeline latency (One-Euro velocity)")
+    p.add_argument("--clock", action="store_true",
+                   help="send MIDI clock (24 PPQN) at the hand-distance tempo, for syncing a DAW")
+    p.add_argument("--quantize", choices=["beat", "8th", "16th", "8t", "16t"],
+                   help="delay chord changes to the next beat / subdivision of that tempo (implies --clock)")
+    p.add_argument("--trace", action="store_true", help="record per-stage timings from the start (T toggles the overlay)")
+    p.add_argument("--trace-dump", metavar="PATH", help="write stage timing percentiles + samples here on exit (implies --trace)")
+    p.add_argument("--serial-init", action="store_true",
+                   help="open camera, MediaPipe, window and MIDI one after another (startup comparison)")
+    p.add_argument("--startup-report", metavar="PATH",
+                   help="write startup phase timings (JSON) here once the first note is sent")
+    p.add_argument("--exit-after-startup", action="store_true", help="quit after the first note (bench.startup)")
+    return p.parse_args(argv)
+
+
+def open_source(args):
+    from perception.sources import CameraSource, VideoFileSource
+    if args.video:
+        return VideoFileSource(args.video, realtime=not args.fast, loop=args.loop)
+    return CameraSource(args.camera)
+
+
+def start_tracker(boot, args):
+    """Future of the tracker; the camera and the MediaPipe graph are set up side by side."""
+    if args.replay:
+        return boot.submit("tracker", ReplayTracker, args.replay, realtime=not args.fast, loop=args.loop)
+
+    def model():
+        from perception.hands import load_model
+        return load_model(warmup=True)
+
+    source = boot.submit("camera", open_source, args)
+    graph = boot.submit("mediapipe", model)
+
+    def assemble():
+        from perception.hands import HandTracker
+        return HandTracker(smooth_alpha=0.6, source=source.result(), model=graph.result(), roi=args.roi,
+                           infer_width=args.infer_width, motion_threshold=args.motion_threshold,
+                           smoothing=HandFilterBank(predict_s=args.predict_ms / 1000.0))
+    return boot.submit("tracker", assemble, after=(source, graph))
+
+
+def open_synth():
+    from music.midi_engine import MidiEngine
+    return MidiEngine(port_name="HandComposer", threaded=True)
+
+
+def open_hud():
+    from viz.hud import HUD
+    return HUD()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    trace.enable(args.trace or bool(args.trace_dump))
+    # camera + MediaPipe, MIDI port and window come up side by side; the remote
+    # classifier warms up in the background while the CPU fallback already plays
+    boot = Startup(serial=args.serial_init)
+    stop = threading.Event()
+    ctl = ControlState(use_gpu_classifier=True)
+    pool = None
+    tracker_f = None
+    if args.performers:
+        # one worker process per performer, each on its own MIDI channel
+        specs = [PerformerSpec.parse(text, channel=i % 16, realtime=not args.fast, loop=args.loop)
+                 for i, text in enumerate(args.performers)]
+        pool = boot.run("perception_pool", lambda: PerceptionPool(specs).start())
+        performers = [Performer(spec.name, spec.channel) for spec in specs]
+    else:
+        tracker_f = start_tracker(boot, args)
+        performers = [Performer("main", 0)]
+    # first performer only; with --record-midi the MIDI recorder's thread writes it
+    recorder = LandmarkRecorder(args.record) if args.record and not args.record_midi else None
+    #synth = MidiEngine(soundfont_path="/Users/ellie/Downloads/FluidR3_GM.sf2")
 
-            #safe mode
+    # synth only when not in safe mode
+    synth_f = boot.submit("midi", open_synth) if not SAFE_MODE else None
+
+    # held poses are answered locally; only real pose changes go to the server
+    if USE_STREAM:
+        network = lambda: StreamQualityClient(STREAM_URL, cache=PredictionCache(), hysteresis=Hysteresis())
+    else:
+        network = lambda: HttpQualityClient(ADC_URL, cache=PredictionCache(), hysteresis=Hysteresis())
+    # a local shm worker wins if one is running, otherwise the network
+    quality_stream = ShmQualityClient(SHM_NAME, fallback=network) if SHM_NAME else network()
+    if not USE_STREAM:
+        # HTTP is a blocking round-trip per call: keep it off the control thread
+        quality_stream = AsyncQualityClient(quality_stream)
+    boot.background("classifier", warm_classifier, ctl, quality_stream, stop)
+
+    hud = boot.run("hud", open_hud) # pygame must stay on the main thread
+    import pygame
+    tracker = tracker_f.result() if tracker_f is not None else None
+    synth = synth_f.result() if synth_f is not None else None
+    if synth is not None and (args.clock or args.quantize):
+        synth.start_clock(tempo_from_distance(None), args.quantize)
+    if synth is not None and args.record_midi:
+        midi_rec = synth.start_recording(args.record_midi, landmarks=args.record)
+        if args.record:
+            recorder = midi_rec
+    if args.record and recorder is None:
+        recorder = LandmarkRecorder(args.record) # no synth to record alongside
+    boot.mark("ready")
+
+    def startup_done():
+        """First note: write the startup report, optionally quit (bench.startup)."""
+        if "first_note" in boot.marks:
+            return
+        boot.mark("first_note")
+        if args.startup_report:
+            import json
+            with open(args.startup_report, "w") as f:
+                json.dump(boot.report(), f, indent=1)
+        if args.exit_after_startup:
+            stop.set()
+
+    # stage handoff: capture -> perception -> (control, render); control -> render
+    # (with --performers the pool's worker processes are capture + perception)
+    frames = LatestSlot("frames")
+    video = LatestSlot("video")
+    display = LatestSlot("display")
+    g2m_ms = Histogram("gesture_to_midi_ms")
+
+    def capture_step():
+        t0 = trace.start()
+        frame = tracker.grab()
+        trace.stop("capture", t0)
+        if frame is None:
+            stop.wait(0.01)
+            return
+        frames.put((time.perf_counter(), frame))
+
+    def perception_step():
+        item = frames.take(timeout=0.1)
+        if item is None:
+            return
+        ts, frame = item
+        frame, hands = tracker.process(frame)
+        if recorder is not None:
+            recorder.append(hands, tracker.handedness)
+        performers[0].hands_in.put((ts, hands))
+        video.put(frame)
+
+    pool_view = np.zeros((540, 960, 3), dtype=np.uint8)
+    pool_hands = [None] * len(performers)
+    def pool_step():
+        got = pool.poll()
+        if not got:
+            stop.wait(0.002)
+            return
+        for i, ts, hands, handedness in got:
+            performers[i].hands_in.put((ts, hands))
+            pool_hands[i] = hands
+            if i == 0 and recorder is not None:
+                recorder.append(hands, handedness)
+        video.put(draw_performers(pool_view, pool.specs, pool_hands))
+
+    chords = default_table() # all (root, quality) voicings/labels/diffs, precomputed
+    cs = {"infer_ms": 0.0}
+    def control_step():
+        if ctl.panic:
+            ctl.panic = False
+            if synth:
+                synth.panic() #stops all notes, every channel
+            for p in performers:
+                p.chord = None
+
+        now_ms = int(time.time() * 1000)
+        labels = []
+        for k, p in enumerate(performers):
+            item = p.hands_in.take(timeout=0)
+            if item is not None:
+                p.ts, p.hands = item
+                p.feats = HandFeatures.from_hands(p.hands) # shared by every mapper below
+                p.root = p.smoother.update(p.feats, now_ms)
+                # new left hand -> new classifier request (never blocks here); first performer only
+                hands = p.hands
+                if k == 0 and hands is not None and hands.shape[0] >= 2 and ctl.remote_quality:
+                    t0 = trace.start()
+                    quality_stream.submit(hands[1])
+                    cs["infer_ms"] = quality_stream.rtt_ms
+                    trace.stop("classifier", t0)
+            elif p.feats is None:
+                continue  # nothing from this performer yet
+
+            hands, feats = p.hands, p.feats
             if SAFE_MODE:
-                chord_lbl = "SAFE MODE (no audio)"
-                bpm = 0
-                velo = 0
-                infer_ms = (time.time() - t0) * 1000.0
-                help_line = "Press ESC to Quit. If smooth, turn SAFE_MODE = False"
-                hud.draw(frame, chord_lbl, bpm, velo, fps_cam, infer_ms, extra_lines =[help_line])
-                clock.tick(30) #cap fps at 30
-                continue
-
-            #normal mode
-            #root = right_hand_root(hands) + main_key_semitones
-            now_ms = int(time.time() * 1000)
-
-            root = smoother.update(hands, now_ms) + main_key_semitones
-            #qual = left_pose_quality(hands)
-            qual = "maj"
-            infer_ms = 0.0
-            if hands is not None and hands.shape[0] >= 2:
-                t0c = time.time()
-            try:
-                qual = gpu_quality(hands[1])
-            except Exception as e:
-                print("[GPU RPC] error, falling back to CPU:", e)
-                qual = left_pose_quality(hands)
-            infer_ms = (time.time() - t0c) * 1000.0
-            notes = chord_from(root, qual)
-            
-            from music.chord_mapper import voice_chord
-            notes = voice_chord(notes, low = 48, high = 72)
-            velo = velocity_from_spread(hands)
-            bpm = tempo_from_distance(hands)
-
-            if notes != last_notes:
-                try:   
-                    synth.play_chord(notes, velo)
-                    last_notes = notes
+                display.put(("SAFE MODE (no audio)", 0, 0, cs["infer_ms"]))
+                return
+
+            t0 = trace.start()
+            root = p.root + ctl.main_key_semitones
+            qual = left_pose_quality(feats) # CPU fallback
+            if k == 0 and ctl.remote_quality and hands is not None and hands.shape[0] >= 2:
+                remote = quality_stream.latest()
+                qual = remote or qual
+            if ctl.scale_lock:
+                chord = chords.scale_locked(root, qual, ctl.main_key_semitones)
+            else:
+                chord = chords.chord_id(root, qual)
+            velo = velocity_from_spread(feats)
+            bpm = tempo_from_distance(feats)
+            trace.stop("chord_map", t0)
+            if k == 0:
+                lead = (velo, bpm)
+                if synth is not None and synth.clock is not None:
+                    synth.clock.set_bpm(bpm)
+
+            if chord != p.chord:
+                try:
+                    synth.play_chord_id(chords, chord, velo, channel=p.channel)
+                    p.chord = chord
+                    g2m_ms.observe((time.perf_counter() - p.ts) * 1000.0)
+                    startup_done()
                 except Exception as e:
                     print("[MIDI] play_chord error:", e)
-
-            infer_ms = (time.time() - t0) * 1000.0
-            chord_lbl = label_chord(notes)
-            keyname = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"][main_key_semitones]
-            mode = "GPU" if (use_gpu_classifier and torch.cuda.is_available()) else "CPU"
-            help_line = f"Key: {keyname} | S: Scale lock [{'ON' if scale_lock else 'OFF'}] | Up/Down: Change key | G: Toggle [{mode}] | Space: Panic"
-            hud.draw(frame, chord_lbl, bpm, velo, fps_cam, infer_ms, extra_lines =[help_line])
-
-            clock.tick(30) #cap fps at 30
-        
+            labels.append(chords.label(chord))
+
+        if not labels or performers[0].feats is None:
+            return
+        velo, bpm = lead
+        display.put((" | ".join(labels), bpm, velo, cs["infer_ms"]))
+
+    if pool is None:
+        capture = Stage("capture", capture_step, stop)
+        perception = Stage("perception", perception_step, stop)
+    else:
+        capture = Stage("pool", pool_step, stop)
+        perception = None
+    control = Stage("control", control_step, stop, rate_hz=CONTROL_HZ)
+
+    last_frame = None
+    last_display = ("", 0, 0, 0.0)
+    def render_step():
+        nonlocal last_frame, last_display
+        # read key events
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                stop.set()
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_UP:
+                    ctl.main_key_semitones = (ctl.main_key_semitones + 1) % 12
+                elif event.key == pygame.K_DOWN:
+                    ctl.main_key_semitones = (ctl.main_key_semitones - 1) % 12
+                elif event.key == pygame.K_s:
+                    ctl.scale_lock = not ctl.scale_lock
+                elif event.key == pygame.K_SPACE:
+                    ctl.panic = True
+                elif event.key == pygame.K_ESCAPE:
+                    stop.set()
+                elif event.key == pygame.K_g:
+                    ctl.use_gpu_classifier = not ctl.use_gpu_classifier
+                elif event.key == pygame.K_t:
+                    trace.enable(not trace.enabled())
+        if stop.is_set():
+            return
+
+        last_frame = video.take(timeout=0) if video.depth else last_frame
+        last_display = display.take(timeout=0) or last_display
+        if last_frame is None:
+            stop.wait(0.005)
+            return
+        boot.mark("first_frame")
+        chord_lbl, bpm, velo, infer_ms = last_display
+
+        if SAFE_MODE:
+            help_line = "Press ESC to Quit. If smooth, turn SAFE_MODE = False"
+        else:
+            keyname = KEY_NAMES[ctl.main_key_semitones]
+            mode = "GPU" if ctl.remote_quality else ("CPU, classifier warming up" if ctl.use_gpu_classifier else "CPU")
+            help_line = f"Key: {keyname} | S: Scale lock [{'ON' if ctl.scale_lock else 'OFF'}] | Up/Down: Change key | G: Toggle [{mode}] | Space: Panic | T: Trace"
+        if pool is None:
+            cam_fps = capture.rate_hz
+            stage_line = (
+                f"cap {capture.rate_hz:.0f} Hz | perc {perception.rate_hz:.0f} Hz "
+                f"(q {frames.depth}, drop {frames.dropped}) | "
+            )
+        else:
+            per = pool.stats()
+            cam_fps = per[0]["fps"]
+            stage_line = " ".join(f"P{i + 1} {s['fps']:.0f} Hz" for i, s in enumerate(per)) + " | "
+        if hasattr(tracker, "stats"):
+            ts = tracker.stats()
+            stage_line += f"track {ts['cost_p50_ms']:.1f} ms, skip {ts['skip_rate'] * 100:.0f}% | "
+        stage_line += (
+            f"ctl {control.rate_hz:.0f} Hz "
+            f"(miss {control.missed_ticks}) | gesture->MIDI p95 {g2m_ms.quantile(0.95):.1f} ms"
+            f" | HUD p95 {hud.frame_ms.quantile(0.95):.1f} ms"
+        )
+        if synth is not None and synth.tx is not None:
+            tx = synth.tx.stats()
+            stage_line += f" | MIDI jitter {tx['jitter_ms']:.2f} ms, coalesced {tx['coalesced']}"
+            if synth.clock is not None:
+                stage_line += f" | clock {synth.clock.bpm:.0f} bpm" + (f", quantize {args.quantize}" if args.quantize else "")
+        extra = [help_line, stage_line]
+        if trace.enabled():
+            extra += trace.overlay_lines()
+        hud.draw(last_frame, chord_lbl, bpm, velo, cam_fps, infer_ms, extra_lines =extra)
+
+    render = Stage("render", render_step, stop) # pygame must stay on the main thread
+
+    stages = [stage for stage in (capture, perception, control) if stage is not None]
+    try:
+        for stage in stages:
+            stage.start()
+        render.run()
     finally:
+        stop.set()
+        for slot in [frames, video, display] + [p.hands_in for p in performers]:
+            slot.close()
+        for stage in stages:
+            stage.join(timeout=1.0)
+        quality_stream.close()
         if synth:
             synth.stop()
-        tracker.release()
+        if pool is not None:
+            pool.close()
+        else:
+            tracker.release()
+        if recorder is not None:
+            recorder.close()
+        if args.trace_dump:
+            print("[trace] stage timings written to", trace.dump(args.trace_dump))
+        boot.close()
         hud.quit()
 
     # try:
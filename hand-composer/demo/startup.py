@@ -0,0 +1,91 @@
+# Concurrent, timed initialization for the demo (see demo/run.py).
+#
+# Opening the camera, building the MediaPipe graph, opening the MIDI port
+# and creating the pygame window are each slow and mostly independent, so
+# they are submitted here as named phases and run side by side on a small
+# thread pool (the window stays on the caller's thread; pygame wants the
+# main thread). Every phase records when it started and finished relative
+# to Startup creation; mark() adds milestones such as the first note.
+# report() is what bench/startup.py collects.
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class Startup:
+    """
+    serial=True runs every submitted phase immediately on the calling
+    thread, i.e. the old one-after-another startup, for comparison.
+    """
+    def __init__(self, serial=False, workers=6):
+        self.serial = serial
+        self.t0 = time.perf_counter()
+        self.t0_unix = time.time()
+        self.phases = {}            # name -> {"start_ms", "end_ms", "ms", "thread", "error"}
+        self.marks = {}             # milestone -> ms since t0
+        self._lock = threading.Lock()
+        self._pool = None if serial else ThreadPoolExecutor(workers, thread_name_prefix="init")
+
+    def _ms(self):
+        return (time.perf_counter() - self.t0) * 1000.0
+
+    def _timed(self, name, fn, args, kw, after=()):
+        for dep in after:
+            dep.result()    # waiting for inputs is not part of this phase
+        phase = {"start_ms": self._ms(), "end_ms": None, "ms": None,
+                 "thread": threading.current_thread().name, "error": None}
+        with self._lock:
+            self.phases[name] = phase   # visible (unfinished) while it runs
+        try:
+            return fn(*args, **kw)
+        except BaseException as e:
+            phase["error"] = repr(e)
+            raise
+        finally:
+            phase["end_ms"] = self._ms()
+            phase["ms"] = phase["end_ms"] - phase["start_ms"]
+
+    def submit(self, name, fn, *args, after=(), **kw):
+        """Start phase `name` in the background -> Future. `after`: futures it needs first."""
+        if self._pool is not None:
+            return self._pool.submit(self._timed, name, fn, args, kw, after)
+        fut = Future()
+        try:
+            fut.set_result(self._timed(name, fn, args, kw, after))
+        except Exception as e:
+            fut.set_exception(e)
+        return fut
+
+    def background(self, name, fn, *args, **kw):
+        """Phase that nothing waits for (e.g. classifier warmup): own daemon thread, also when serial."""
+        def target():
+            try:
+                self._timed(name, fn, args, kw)
+            except Exception as e:
+                print(f"[startup] {name} failed:", e)
+        t = threading.Thread(target=target, name=f"init-{name}", daemon=True)
+        t.start()
+        return t
+
+    def run(self, name, fn, *args, **kw):
+        """Run phase `name` on this thread."""
+        return self._timed(name, fn, args, kw)
+
+    def mark(self, name):
+        """Record a milestone once (later calls are ignored)."""
+        with self._lock:
+            if name not in self.marks:
+                self.marks[name] = self._ms()
+
+    def report(self):
+        with self._lock:
+            phases = {k: dict(v) for k, v in sorted(self.phases.items(), key=lambda kv: kv[1]["start_ms"])}
+            marks = dict(self.marks)
+        return {"serial": self.serial, "pid": os.getpid(), "t0_unix": self.t0_unix,
+                "phases": phases, "marks": marks}
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
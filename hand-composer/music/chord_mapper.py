@@ -2,6 +2,8 @@
 
 import numpy as np
 
+from common.features import TIPS, features_of
+
 C_MAJOR = [0,2,4,5,7,9,11]  # scale degrees in semitones from C
 
 def _normalize01(y):
@@ -13,12 +15,12 @@ def _note_name(midi):
 
 def right_hand_root(hands):
     """Map right-hand average Y (lower Y = top of screen) -> root between C2..C5."""
-    # hands shape: (H,21,3) or None
-    if hands is None or hands.shape[0] == 0:
+    # hands: (H,21,3), HandFeatures or None
+    f = features_of(hands)
+    if f.n_hands == 0:
         return 60  # middle C default
     # right hand is index 0 in our ordering if present
-    right = hands[0]
-    y = right[:,1].mean()
+    y = f.centroid[0, 1]
     # invert Y: top (small) -> higher pitch
     y_inv = 1.0 - _normalize01(y)
     # map 0..1 to MIDI [36..72] (C2..C5)
@@ -27,22 +29,17 @@ def right_hand_root(hands):
 def hand_spread(hand):
     """Average distance of fingertips to wrist as a simple openness metric."""
     # landmarks: 0 wrist, fingertips: 4,8,12,16,20
-    tip_idx = [4,8,12,16,20]
-    wrist = hand[0,:2]
-    d = 0.0
-    for i in tip_idx:
-        d += np.linalg.norm(hand[i,:2]-wrist)
-    return d/len(tip_idx)
+    return float(np.linalg.norm(hand[TIPS, :2] - hand[0, :2], axis=1).mean())
 
 def left_pose_quality(hands, spread_thresholds=(0.065, 0.11)):
     """
     crude pose classifier using spread:
       small -> 'min', medium -> 'maj', large -> '7', thumb-ish -> 'sus'
     """
-    if hands is None or hands.shape[0] < 2:
+    f = features_of(hands)
+    if f.n_hands < 2:
         return "maj"
-    left = hands[1]
-    s = hand_spread(left)
+    s = f.spread[1]
     lo, hi = spread_thresholds
     if s < lo:   return "min"
     if s < hi:   return "maj"
@@ -76,24 +73,23 @@ def voice_chord(notes, low = 48, high = 72):
     return voiced
     notes = voice_chord(notes, 48, 72)
 
-def velocity_from_spread(hands):
-    if hands is None or hands.shape[0] == 0:
+def velocity_from_spread(hands, spread_lo=0.04, spread_span=0.10, v_min=50, v_max=127):
+    f = features_of(hands)
+    if f.n_hands == 0:
         return 80
-    right = hands[0]
-    s = hand_spread(right)
+    s = f.spread[0]
     # map approx spread in [0.04..0.14] to velocity [50..127]
-    v = 50 + (s - 0.04) * (77 / (0.10))
-    return int(max(50, min(127, v)))
+    v = v_min + (s - spread_lo) * ((v_max - v_min) / spread_span)
+    return int(max(v_min, min(v_max, v)))
 
-def tempo_from_distance(hands):
-    if hands is None or hands.shape[0] < 2:
+def tempo_from_distance(hands, dist_lo=0.05, dist_span=0.45, bpm_lo=80, bpm_hi=140):
+    f = features_of(hands)
+    if f.n_hands < 2:
         return 110
-    r = hands[0][:, :2].mean(axis=0)
-    l = hands[1][:, :2].mean(axis=0)
-    d = np.linalg.norm(r-l)
+    d = f.inter_hand
     # map approx distance [0.05..0.5] to [80..140] bpm
-    bpm = 80 + (d - 0.05) * (60 / 0.45)
-    return int(max(80, min(140, bpm)))
+    bpm = bpm_lo + (d - dist_lo) * ((bpm_hi - bpm_lo) / dist_span)
+    return int(max(bpm_lo, min(bpm_hi, bpm)))
 
 def label_chord(notes):
     if not notes: return "N.C."
@@ -0,0 +1,169 @@
+# Precomputed chord lookup.
+#
+# The input space of the chord path is tiny: root 0..127 x quality, voiced
+# into one fixed range. ChordTable resolves all of it once (using the
+# reference functions in chord_mapper, so results are identical) and turns
+# per-frame chord resolution into a few array lookups:
+#
+#   cid   = table.chord_id(root, quality)          # or table.scale_locked(...)
+#   notes = table.notes(cid); label = table.label(cid)
+#   on, off = table.diff(prev_cid, cid)            # note-on / note-off sets
+#
+# Chords that voice to the same notes share a voicing id; bitmasks of the
+# voicings (relative to `low`) give the pairwise on/off diffs.
+
+import numpy as np
+
+from music.chord_mapper import C_MAJOR, voice_chord, label_chord
+
+QUALITIES = {
+    "maj":  (0, 4, 7),
+    "min":  (0, 3, 7),
+    "7":    (0, 4, 7, 10),
+    "sus":  (0, 5, 7),
+    "sus2": (0, 2, 7),
+    "dim":  (0, 3, 6),
+    "maj7": (0, 4, 7, 11),
+    "min7": (0, 3, 7, 10),
+    "m7b5": (0, 3, 6, 10),
+    "9":    (0, 4, 7, 10, 14),
+    "maj9": (0, 4, 7, 11, 14),
+    "min9": (0, 3, 7, 10, 14),
+}
+
+# diatonic triad / seventh qualities on each degree of a major scale
+_DIATONIC_TRIADS = ("maj", "min", "min", "maj", "maj", "min", "dim")
+_DIATONIC_SEVENTHS = ("maj7", "min7", "min7", "maj7", "7", "min7", "m7b5")
+_SEVENTH_LIKE = {"7", "maj7", "min7", "m7b5", "9", "maj9", "min9"}
+
+
+class ChordTable:
+    def __init__(self, low=48, high=72, qualities=None, scale=C_MAJOR):
+        if high - low >= 64:
+            raise ValueError("voicing range must be < 64 semitones (bitmask width)")
+        self.low, self.high = low, high
+        self.scale = tuple(scale)
+        self.qualities = dict(QUALITIES if qualities is None else qualities)
+        self._build()
+
+    def add_quality(self, name, intervals):
+        """Register a new chord quality. Rebuilds the table (setup-time cost, not per frame)."""
+        self.qualities[name] = tuple(intervals)
+        self._build()
+
+    # ---- build ----
+    def _build(self):
+        self.names = list(self.qualities)
+        self.q_index = {q: i for i, q in enumerate(self.names)}
+        self._fallback_q = self.q_index.get("sus", 0)  # chord_from's catch-all
+        nq = len(self.names)
+
+        voicing_ids = {}
+        self.voicings = []                               # vid -> tuple of notes
+        self.voicing_of = np.empty(128 * nq, dtype=np.int32)  # cid -> vid
+        for root in range(128):
+            for qi, q in enumerate(self.names):
+                notes = tuple(voice_chord([root + i for i in self.qualities[q]], self.low, self.high))
+                vid = voicing_ids.setdefault(notes, len(self.voicings))
+                if vid == len(self.voicings):
+                    self.voicings.append(notes)
+                self.voicing_of[root * nq + qi] = vid
+
+        self.labels = [label_chord(list(v)) for v in self.voicings]
+        self.note_sets = [frozenset(v) for v in self.voicings]
+        self.masks = np.zeros(len(self.voicings), dtype=np.uint64)
+        for vid, notes in enumerate(self.voicings):
+            m = 0
+            for n in notes:
+                m |= 1 << (n - self.low)
+            self.masks[vid] = m
+        self._on = None   # (V, V) masks, built on first diff()
+        self._off = None
+        self._decoded = {}
+        self._build_scale_lock()
+
+    def _build_scale_lock(self):
+        # [key, root, seventh?] -> cid, root snapped to the key's major scale
+        nq = len(self.names)
+        lock = np.empty((12, 128, 2), dtype=np.int32)
+        for key in range(12):
+            pcs = [(key + d) % 12 for d in self.scale]
+            for root in range(128):
+                # nearest scale tone (signed distance -5..+6), ties resolve downward
+                _, _, degree, delta = min(
+                    (abs(dl), dl > 0, d, dl)
+                    for d, pc in enumerate(pcs)
+                    for dl in [((pc - root) % 12) - (12 if (pc - root) % 12 > 6 else 0)]
+                )
+                snapped = max(0, min(127, root + delta))
+                for s, table in enumerate((_DIATONIC_TRIADS, _DIATONIC_SEVENTHS)):
+                    q = table[degree % len(table)]
+                    qi = self.q_index.get(q, self._fallback_q)
+                    lock[key, root, s] = snapped * nq + qi
+        self._lock = lock
+
+    # ---- per-frame lookups ----
+    def chord_id(self, root, quality):
+        root = 0 if root < 0 else 127 if root > 127 else root
+        return root * len(self.names) + self.q_index.get(quality, self._fallback_q)
+
+    def scale_locked(self, root, quality, key=0):
+        """Diatonic chord of `key` nearest to `root`; seventh-type qualities pick the diatonic seventh."""
+        root = 0 if root < 0 else 127 if root > 127 else root
+        return int(self._lock[key % 12, root, 1 if quality in _SEVENTH_LIKE else 0])
+
+    # ---- whole timelines at once (music/offline.py) ----
+    def chord_ids(self, roots, quality_idx):
+        """chord_id over arrays; quality_idx indexes self.names."""
+        return np.clip(roots, 0, 127) * len(self.names) + quality_idx
+
+    def scale_locked_ids(self, roots, seventh, key=0):
+        """scale_locked over arrays; seventh: bool array (quality is seventh-like)."""
+        return self._lock[key % 12, np.clip(roots, 0, 127), np.asarray(seventh, dtype=np.intp)]
+
+    def voicing(self, cid):
+        return int(self.voicing_of[cid])
+
+    def notes(self, cid):
+        return self.voicings[self.voicing_of[cid]]
+
+    def label(self, cid):
+        return self.labels[self.voicing_of[cid]]
+
+    def note_set(self, cid):
+        return self.note_sets[self.voicing_of[cid]]
+
+    def diff(self, prev_cid, cid):
+        """-> (notes to turn on, notes to turn off) going from prev_cid to cid, ascending."""
+        a, b = self.voicing_of[prev_cid], self.voicing_of[cid]
+        key = (int(a), int(b))
+        hit = self._decoded.get(key)
+        if hit is not None:
+            return hit
+        if self._on is None:
+            m = self.masks
+            self._on = m[None, :] & ~m[:, None]    # [old, new]: in new, not in old
+            self._off = m[:, None] & ~m[None, :]   # [old, new]: in old, not in new
+        hit = (self._bits(int(self._on[a, b])), self._bits(int(self._off[a, b])))
+        self._decoded[key] = hit
+        return hit
+
+    def _bits(self, mask):
+        out = []
+        i = 0
+        while mask:
+            if mask & 1:
+                out.append(self.low + i)
+            mask >>= 1
+            i += 1
+        return tuple(out)
+
+
+_default = None
+
+def default_table():
+    """Shared table for the default 48..72 voicing range, built on first use."""
+    global _default
+    if _default is None:
+        _default = ChordTable()
+    return _default
@@ -0,0 +1,156 @@
+# MIDI clock (24 PPQN) at the gesture-controlled tempo.
+#
+# A scheduler thread computes every tick time from an absolute origin
+# (origin + n * period), never by adding sleeps, so late wakeups don't
+# accumulate into drift. It posts each 0xF8 a little ahead of time
+# through a MidiOutputThread (the same writer MidiEngine uses in threaded
+# mode), which waits and spins to the exact deadline. Tempo changes take
+# effect at the next tick: the grid is re-anchored there.
+#
+# schedule() holds an event (MidiEngine: a quantized chord change) until
+# the next beat / subdivision in clock ticks, and hands it the tick's time
+# only when the clock thread posts that tick. A time computed up front
+# would assume the tempo holds, and the tempo changes every control tick.
+
+import threading
+import time
+
+CLOCK = b"\xf8"
+START = b"\xfa"
+STOP = b"\xfc"
+
+PPQN = 24
+# quantize grid name -> clock ticks
+GRID = {"beat": 24, "8th": 12, "16th": 6, "8t": 8, "16t": 4}
+
+
+class MidiClock:
+    def __init__(self, tx, bpm=110.0, lookahead_ms=20.0, send_start=True, min_bpm=20.0, max_bpm=300.0):
+        self.tx = tx
+        self.lookahead = lookahead_ms / 1000.0
+        self.send_start = send_start
+        self.min_bpm = min_bpm
+        self.max_bpm = max_bpm
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._bpm = self._clamp(bpm)
+        self._pending = None        # bpm to switch to at the next tick
+        self._origin = None         # perf_counter time of tick `_base`
+        self._base = 0              # tick count at the origin
+        self._period = 60.0 / (self._bpm * PPQN)
+        self._next = 0              # index of the next tick to post
+        self._queued = {}           # key -> (tick index, fn(t)), see schedule()
+        self.replaced = 0           # scheduled events superseded before their tick
+        self.tempo_changes = 0
+        self.resyncs = 0            # times the thread fell so far behind it restarted the grid
+        self._thread = None
+
+    def _clamp(self, bpm):
+        return max(self.min_bpm, min(self.max_bpm, float(bpm)))
+
+    @property
+    def bpm(self):
+        return self._bpm if self._pending is None else self._pending
+
+    @property
+    def ticks(self):
+        """Clock ticks posted so far."""
+        return self._next
+
+    def set_bpm(self, bpm):
+        """New tempo from the next tick on (cheap; call it every control tick)."""
+        bpm = self._clamp(bpm)
+        with self._lock:
+            if bpm != self._bpm:
+                self._pending = bpm
+            else:
+                self._pending = None
+
+    def _tick_time(self, n):
+        return self._origin + (n - self._base) * self._period
+
+    def schedule(self, ticks, key, fn):
+        """
+        Call fn(t) on the clock thread as it posts the next grid point every
+        `ticks` clock ticks (24 = beat, 6 = 16th), t = that tick's send time.
+        A later call with the same `key` replaces one not yet run. False when
+        the clock isn't running.
+        """
+        with self._lock:
+            if self._origin is None:
+                return False
+            if key in self._queued:
+                self.replaced += 1
+            self._queued[key] = (self._next + (-self._next % ticks), fn)
+            return True
+
+    def cancel(self, key=None):
+        """Drop the scheduled event for `key`, or all of them when None."""
+        with self._lock:
+            if key is None:
+                self._queued.clear()
+            else:
+                self._queued.pop(key, None)
+
+    def start(self, at=None):
+        """Start ticking; first tick (and MIDI Start) at `at`, default one lookahead from now."""
+        if self._thread is not None:
+            return self
+        with self._lock:
+            self._origin = (time.perf_counter() + self.lookahead) if at is None else at
+            self._base = self._next = 0
+        if self.send_start:
+            self.tx.send_raw(START, at=self._origin)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="midi-clock", daemon=True)
+        self._thread.start()
+        return self
+
+    def _loop(self):
+        clock = time.perf_counter
+        while not self._stop.is_set():
+            with self._lock:
+                if self._pending is not None:
+                    # re-anchor the grid on the next tick with the new period
+                    self._origin = self._tick_time(self._next)
+                    self._base = self._next
+                    self._bpm = self._pending
+                    self._period = 60.0 / (self._bpm * PPQN)
+                    self._pending = None
+                    self.tempo_changes += 1
+                due = self._tick_time(self._next)
+                now = clock()
+                if now - due > 4 * self._period:
+                    # suspended / starved: don't burst out the missed ticks, restart the grid
+                    self._origin = now + self.lookahead
+                    self._base = self._next
+                    due = self._origin
+                    self.resyncs += 1
+            wait = due - self.lookahead - clock()
+            if wait > 0 and self._stop.wait(wait):
+                break
+            with self._lock:
+                # decided under the lock, so nothing scheduled for this tick slips to the next one
+                fire = [k for k, (n, _) in self._queued.items() if n <= self._next]
+                fire = [self._queued.pop(k)[1] for k in fire]
+                due = self._tick_time(self._next)
+                self._next += 1
+            self.tx.send_raw(CLOCK, at=due)
+            for fn in fire:
+                fn(due)
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+        self._thread = None
+        if self.send_start:
+            self.tx.send_raw(STOP)
+        with self._lock:
+            self._origin = None
+            self._queued.clear()
+
+    def stats(self):
+        return {"bpm": self.bpm, "ticks": self._next, "tempo_changes": self.tempo_changes, "resyncs": self.resyncs,
+                "replaced": self.replaced}
@@ -0,0 +1,79 @@
+# Offline: recorded landmark sessions (.hclm) -> Standard MIDI Files.
+#
+# Runs the demo's mapping chain over a whole recording without a clock
+# (music/offline.py: vectorized except for the root smoother), then turns
+# chord changes into note on/off events at the frame's recorded time,
+# written straight to an SmfWriter.
+#
+#   python -m music.export take.hclm [more.hclm ...] [-o out_dir] [--key 2] [--scale-lock]
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from music.chord_table import default_table
+from music.offline import ChainParams, Session, render
+from music.smf import SmfWriter
+
+
+def write_chords(path, t, cids, vel, table=None, channel=0, ppq=1920):
+    """Chord id per frame -> note events at the frames where it changes (legato, like MidiEngine)."""
+    table = table or default_table()
+    smf = SmfWriter(path, ppq=ppq)
+    on_status, off_status = 0x90 | channel, 0x80 | channel
+    changes = np.flatnonzero(np.diff(cids, prepend=cids[0] - 1)) if len(cids) else []
+    prev = None
+    for i in changes:
+        cid, ts = int(cids[i]), float(t[i])
+        if prev is None:
+            on, off = table.notes(cid), ()
+        else:
+            on, off = table.diff(prev, cid)
+        v = max(1, min(127, int(vel[i])))
+        for note in on:
+            smf.event(ts, bytes((on_status, note, v)))
+        for note in off:
+            smf.event(ts, bytes((off_status, note, 0)))
+        prev = cid
+    end = float(t[-1]) if len(t) else 0.0
+    if prev is not None:
+        for note in table.notes(prev):
+            smf.event(end, bytes((off_status, note, 0)))
+    smf.close(end)
+    return smf.events, len(changes)
+
+
+def export_session(src, out, key=0, scale_lock=False, channel=0, params=None):
+    t0 = time.perf_counter()
+    session = Session.load(src)
+    params = params or ChainParams(key=key, scale_lock=scale_lock)
+    r = render(session, params)
+    events, changes = write_chords(out, session.t, r["cid"], r["velocity"], channel=channel)
+    secs = time.perf_counter() - t0
+    t = session.t
+    duration = session.duration
+    return {"source": src, "out": out, "frames": int(len(t)), "duration_s": duration, "chord_changes": int(changes),
+            "events": events, "seconds": secs, "x_realtime": duration / secs if secs > 0 else None}
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="render recorded landmark sessions to MIDI files")
+    p.add_argument("sessions", nargs="+", help=".hclm recordings")
+    p.add_argument("-o", "--out-dir", help="where to write the .mid files (default: next to each session)")
+    p.add_argument("--key", type=int, default=0, help="transpose / key in semitones, like the demo's Up/Down")
+    p.add_argument("--scale-lock", action="store_true")
+    p.add_argument("--channel", type=int, default=0)
+    args = p.parse_args(argv)
+    for src in args.sessions:
+        base = os.path.splitext(os.path.basename(src))[0] + ".mid"
+        out = os.path.join(args.out_dir or os.path.dirname(src) or ".", base)
+        if args.out_dir:
+            os.makedirs(args.out_dir, exist_ok=True)
+        print(json.dumps(export_session(src, out, args.key, args.scale_lock, args.channel)))
+
+
+if __name__ == "__main__":
+    main()
@@ -15,15 +15,46 @@ except Exception:
 
 from mido import Message
 
+from music.clock import GRID, MidiClock
+from music.midi_output import MidiOutputThread
+from music.recorder import MidiRecorder
+from perf import trace
+
+
+class NullOutput:
+    """Stand-in output port: counts and drops messages. For benchmarks / runs without a DAW."""
+    def __init__(self):
+        self.sent = 0
+
+    def send(self, msg):
+        self.sent += 1
+
+    def send_raw(self, data):
+        self.sent += 1
+
+    def close(self):
+        pass
+
 
 class MidiEngine:
-    def __init__(self, port_name: str = "HandComposer"):
-        self._held = set()
-        self.channel = 0
+    def __init__(self, port_name: str = "HandComposer", output=None, threaded: bool = False):
+        self._held = {}       # channel -> notes held
+        self._held_id = {}    # channel -> ChordTable id of the held notes, when it came from play_chord_id
+        self.channel = 0      # default channel; pass channel= per performer
         self._dead = False
         self._port_name = port_name
         self.out = None
-        self._open_port()
+        if output is not None:
+            self.out = output  # any object with send(msg)/close(), e.g. NullOutput
+        else:
+            self._open_port()
+        # threaded: chords go through a dedicated writer thread (timestamps, coalescing, raw bytes)
+        self.tx = None
+        if threaded and not self._dead:
+            self.tx = MidiOutputThread(self.out, channel=self.channel)
+        self.clock = None     # MidiClock, see start_clock()
+        self.quantize = None  # clock ticks per grid step chord changes snap to, or None
+        self.recorder = None  # MidiRecorder, see start_recording()
         atexit.register(self.stop)
 
     def _open_port(self):
@@ -39,44 +70,141 @@ class MidiEngine:
     def _safe_send(self, msg: Message):
         if self._dead or self.out is None:
             return
+        t0 = trace.start()
         try:
             self.out.send(msg)
         except Exception as e:
             # Don’t crash the app if the DAW disconnects; mark dead and ignore further sends
             print("[MIDI] Send error; muting MIDI (port likely closed):", e)
             self._dead = True
+            return
+        trace.stop("midi_send", t0)
+        if self.recorder is not None:
+            self.recorder.midi(msg.bytes())
+
+    def start_clock(self, bpm: float = 110, quantize: str = None):
+        """Send MIDI clock at `bpm` (threaded mode only); quantize: None or a music.clock.GRID name."""
+        if self.tx is None:
+            print("[MIDI] clock needs threaded=True; not started")
+            return None
+        if self.clock is None:
+            self.clock = MidiClock(self.tx, bpm).start()
+        self.quantize = GRID[quantize] if quantize else None
+        return self.clock
+
+    def start_recording(self, path: str, landmarks: str = None):
+        """Stream everything sent from now on to a .mid file (+ optional .hclm landmark sidecar)."""
+        if self.recorder is None:
+            self.recorder = MidiRecorder(path, landmarks=landmarks)
+            if self.tx is not None:
+                self.tx.tap = self.recorder.midi
+        return self.recorder
+
+    def _set_chord(self, notes, velocity, at, ch):
+        # explicit times win; otherwise, when quantizing, the clock thread posts the
+        # chord as the next grid tick goes out, at that tick's (current-tempo) time
+        if self.clock is not None and self.quantize:
+            if at is None and self.clock.schedule(
+                    self.quantize, ch, lambda t: self.tx.set_chord(notes, velocity, t, channel=ch)):
+                return
+            self.clock.cancel(ch)
+        self.tx.set_chord(notes, velocity, at, channel=ch)
 
     def set_program(self, program_num: int, bank: int = 0, channel: int = 0):
         """Optional; many DAWs ignore program changes and use the track’s patch."""
         program_num = max(0, min(127, int(program_num)))
+        if self.tx is not None:
+            self.tx.send_raw(bytes((0xC0 | self.channel, program_num)))
+            return
         self._safe_send(Message('program_change', program=program_num, channel=self.channel))
 
-    def play_chord(self, notes: Iterable[int], velocity: int = 90):
-        """Legato-style: only change what differs; guarded against backend errors."""
+    def _voice(self, channel):
+        """-> (channel, held note set, held ChordTable id or None) for `channel` (default: self.channel)."""
+        ch = self.channel if channel is None else channel
+        return ch, self._held.get(ch, set()), self._held_id.get(ch)
+
+    def play_chord(self, notes: Iterable[int], velocity: int = 90, at: float = None, channel: int = None):
+        """Legato-style: only change what differs; guarded against backend errors.
+        `at` (perf_counter seconds) schedules the change; threaded mode only.
+        Without `at`, a running clock with quantize set delays it to the next grid point.
+        Each channel (performer) holds its own chord."""
         if self._dead:
             return
+        ch, held, _ = self._voice(channel)
+        if self.tx is not None:
+            self._set_chord(notes, velocity, at, ch)
+            self._held[ch] = set(notes or [])
+            self._held_id[ch] = None
+            return
         new = set(notes or [])
-        on_first  = new - self._held
-        off_later = self._held - new
+        on_first  = new - held
+        off_later = held - new
         vel = max(1, min(127, int(velocity)))
 
         for n in sorted(on_first):
-            self._safe_send(Message('note_on', note=n, velocity=vel, channel=self.channel))
+            self._safe_send(Message('note_on', note=n, velocity=vel, channel=ch))
         for n in sorted(off_later):
-            self._safe_send(Message('note_off', note=n, velocity=0, channel=self.channel))
-        self._held = new
+            self._safe_send(Message('note_off', note=n, velocity=0, channel=ch))
+        self._held[ch] = new
+        self._held_id[ch] = None
+
+    def play_chord_id(self, table, cid: int, velocity: int = 90, at: float = None, channel: int = None):
+        """play_chord(table.notes(cid)) using the table's precomputed on/off diff."""
+        if self._dead:
+            return
+        ch, held, held_id = self._voice(channel)
+        if self.tx is not None:
+            # the writer thread diffs against what actually sounds at send time
+            if held_id != cid:
+                self._set_chord(table.notes(cid), velocity, at, ch)
+                self._held[ch] = table.note_set(cid)
+                self._held_id[ch] = cid
+            return
+        if held_id is None:  # held notes didn't come from the table
+            self.play_chord(table.notes(cid), velocity, channel=ch)
+            self._held_id[ch] = cid
+            return
+        if held_id == cid:
+            return
+        on_first, off_later = table.diff(held_id, cid)
+        vel = max(1, min(127, int(velocity)))
+        for n in on_first:
+            self._safe_send(Message('note_on', note=n, velocity=vel, channel=ch))
+        for n in off_later:
+            self._safe_send(Message('note_off', note=n, velocity=0, channel=ch))
+        self._held[ch] = table.note_set(cid)
+        self._held_id[ch] = cid
 
-    def panic(self):
+    def panic(self, channel: int = None):
+        """Release `channel`, or every channel when None."""
         if self._dead:
             return
-        for n in list(self._held):
-            self._safe_send(Message('note_off', note=n, velocity=0, channel=self.channel))
-        self._held.clear()
+        channels = list(self._held) if channel is None else [channel]
+        if self.tx is not None:
+            if self.clock is not None:
+                self.clock.cancel(channel)
+            self.tx.all_notes_off(channel)
+        else:
+            for ch in channels:
+                for n in list(self._held.get(ch, ())):
+                    self._safe_send(Message('note_off', note=n, velocity=0, channel=ch))
+        for ch in channels:
+            self._held[ch] = set()
+            self._held_id[ch] = None
 
     def stop(self):
         try:
             self.panic()
+            if self.clock is not None:
+                self.clock.stop()
+                self.clock = None
+            if self.tx is not None:
+                self.tx.close()
+                self.tx = None
             time.sleep(0.01)
+            if self.recorder is not None:
+                self.recorder.close()   # after the writer: its final note-offs are recorded too
+                self.recorder = None
         finally:
             try:
                 if self.out is not None:
@@ -0,0 +1,245 @@
+# Dedicated MIDI output thread.
+#
+# The control loop only posts intents (a chord, a raw message, optionally
+# with a target perf_counter() timestamp); one writer thread turns them
+# into pre-encoded raw bytes on the port at the right moment:
+#
+#   - timed events wait on a condition variable, then spin the last few
+#     hundred microseconds, so lateness doesn't follow the OS timer slack
+#   - chords are latest-wins per channel: a chord posted before the previous
+#     one on that channel went out replaces it (even if that one had an
+#     earlier target time), so superseded note-ons are never sent
+#   - the raw event queue is bounded; overflow is counted, never blocks
+#   - send lateness (actual - target) is kept in a histogram for jitter stats
+
+import collections
+import heapq
+import os
+import threading
+import time
+
+import numpy as np
+
+from perf import trace
+from perf.stats import Histogram
+
+NOTE_ON = 0x90
+NOTE_OFF = 0x80
+
+# pre-encoded note-off messages [channel][note]
+_OFF_BYTES = [[bytes((NOTE_OFF | ch, n, 0)) for n in range(128)] for ch in range(16)]
+
+LATENESS_BUCKETS_MS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 50)
+
+
+def raw_writer(port):
+    """Fastest way to push raw MIDI bytes into `port`."""
+    if hasattr(port, "send_raw"):
+        return port.send_raw
+    rt = getattr(port, "_rt", None)  # mido's rtmidi backend wraps rtmidi.MidiOut
+    if rt is not None:
+        return rt.send_message
+    import mido
+    return lambda data: port.send(mido.Message.from_bytes(data))
+
+
+class LoopbackPort:
+    """In-memory port: keeps (perf_counter, bytes) of the last `maxlen` writes for tests."""
+    def __init__(self, maxlen=100_000):
+        self.log = collections.deque(maxlen=maxlen)
+        self.sent = 0
+
+    def send_raw(self, data):
+        self.log.append((time.perf_counter(), bytes(data)))
+        self.sent += 1
+
+    def send(self, msg):
+        self.send_raw(msg.bin())
+
+    def close(self):
+        pass
+
+
+class MidiOutputThread:
+    def __init__(self, port, channel=0, queue_size=1024, spin_us=300, priority=-10):
+        self._write = raw_writer(port)
+        self.port = port
+        self.channel = channel
+        self.queue_size = queue_size
+        self.spin = spin_us / 1e6
+        self.priority = priority
+
+        self._cv = threading.Condition()
+        self._events = []        # heap of (t, seq, bytes)
+        self._seq = 0
+        self._chords = {}        # channel -> pending (t, frozenset(notes), velocity)
+        self._sounding = {}      # channel -> notes currently on, owned by the writer thread
+        self._channels = {channel}  # every channel a chord was ever posted on
+        self._closed = False
+        self.dead = False
+        self.tap = None          # optional callable(bytes, t_sent), e.g. MidiRecorder.midi
+
+        self.sent = 0
+        self.dropped = 0         # raw events rejected because the queue was full
+        self.coalesced = 0       # chord changes superseded before they were sent
+        self.lateness_ms = Histogram("midi_lateness_ms", LATENESS_BUCKETS_MS)
+        self._late_sum = 0.0
+        self._late_sq = 0.0
+        self._late_n = 0
+
+        self._thread = threading.Thread(target=self._loop, name="midi-out", daemon=True)
+        self._thread.start()
+
+    # ---- producer side (any thread, never blocks on the port) ----
+    def send_raw(self, data, at=None):
+        """Queue raw MIDI bytes for `at` (perf_counter seconds; None = now)."""
+        t = time.perf_counter() if at is None else at
+        with self._cv:
+            if len(self._events) >= self.queue_size:
+                self.dropped += 1
+                return False
+            self._seq += 1
+            heapq.heappush(self._events, (t, self._seq, bytes(data)))
+            self._cv.notify()
+        return True
+
+    def set_chord(self, notes, velocity=90, at=None, channel=None):
+        """Make `notes` the sounding chord at `at`; replaces any chord not yet sent on that channel."""
+        t = time.perf_counter() if at is None else at
+        vel = max(1, min(127, int(velocity)))
+        ch = self.channel if channel is None else channel
+        with self._cv:
+            if ch in self._chords:
+                self.coalesced += 1
+            self._chords[ch] = (t, frozenset(notes or ()), vel)
+            self._channels.add(ch)
+            self._cv.notify()
+
+    def all_notes_off(self, channel=None):
+        """Release `channel`, or every channel that has sounded when None."""
+        if channel is not None:
+            self.set_chord((), 0, channel=channel)
+            return
+        with self._cv:
+            channels = sorted(self._channels)
+        for ch in channels:
+            self.set_chord((), 0, channel=ch)
+
+    # ---- writer thread ----
+    def _raise_priority(self):
+        # best effort: per-thread nice on Linux; elsewhere this is a no-op
+        if self.priority is None:
+            return
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), self.priority)
+        except (AttributeError, OSError):
+            pass
+
+    def _next_due(self):
+        t = self._events[0][0] if self._events else None
+        for chord in self._chords.values():
+            if t is None or chord[0] < t:
+                t = chord[0]
+        return t
+
+    def _loop(self):
+        self._raise_priority()
+        clock = time.perf_counter
+        while True:
+            with self._cv:
+                while not self._closed:
+                    due = self._next_due()
+                    if due is None:
+                        self._cv.wait()
+                        continue
+                    wait = due - clock() - self.spin
+                    if wait <= 0:
+                        break
+                    self._cv.wait(wait)
+                if self._closed:
+                    return
+            # spin out the last stretch without holding the lock
+            while clock() < due:
+                pass
+            with self._cv:
+                now = clock()
+                batch = []
+                while self._events and self._events[0][0] <= now:
+                    t, _, data = heapq.heappop(self._events)
+                    batch.append((t, data))
+                due_chords = [(ch, c) for ch, c in self._chords.items() if c[0] <= now]
+                for ch, _ in due_chords:
+                    del self._chords[ch]
+            for t, data in batch:
+                self._emit(data, t)
+            for ch, chord in due_chords:
+                self._emit_chord(ch, *chord)
+
+    def _emit(self, data, t):
+        if self.dead:
+            return
+        t0 = trace.start()
+        try:
+            self._write(data)
+        except Exception as e:
+            print("[MIDI] Send error; muting MIDI (port likely closed):", e)
+            self.dead = True
+            return
+        trace.stop("midi_send", t0)
+        self.sent += 1
+        now = time.perf_counter()
+        if self.tap is not None:
+            self.tap(data, now)
+        late = (now - t) * 1000.0
+        self.lateness_ms.observe(late)
+        self._late_sum += late
+        self._late_sq += late * late
+        self._late_n += 1
+
+    def _emit_chord(self, ch, t, notes, vel):
+        # legato: new notes on first, then release the ones that left
+        sounding = self._sounding.get(ch, frozenset())
+        status = NOTE_ON | ch
+        for n in sorted(notes - sounding):
+            self._emit(bytes((status, n, vel)), t)
+        off = _OFF_BYTES[ch]
+        for n in sorted(sounding - notes):
+            self._emit(off[n], t)
+        self._sounding[ch] = set(notes)
+
+    # ---- lifecycle / stats ----
+    def flush(self, timeout=1.0):
+        """Wait until everything queued so far has been written."""
+        end = time.perf_counter() + timeout
+        while time.perf_counter() < end:
+            with self._cv:
+                if not self._events and not self._chords:
+                    return True
+            time.sleep(0.0005)
+        return False
+
+    def close(self):
+        self.flush(0.1)
+        with self._cv:
+            self._closed = True
+            self._cv.notify()
+        self._thread.join(timeout=1.0)
+        # final safety: release anything still sounding, synchronously
+        for ch, notes in self._sounding.items():
+            for n in sorted(notes):
+                self._emit(_OFF_BYTES[ch][n], time.perf_counter())
+        self._sounding = {}
+
+    def stats(self):
+        n = self._late_n
+        mean = self._late_sum / n if n else 0.0
+        var = max(0.0, self._late_sq / n - mean * mean) if n else 0.0
+        return {
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "lateness_mean_ms": mean,
+            "jitter_ms": float(np.sqrt(var)),  # std-dev of lateness
+            "lateness_p50_ms": self.lateness_ms.quantile(0.50),
+            "lateness_p99_ms": self.lateness_ms.quantile(0.99),
+        }
@@ -0,0 +1,311 @@
+# Offline mapping chain: a whole recorded timeline at once, for tuning.
+#
+# render() takes a (T,H,21,3) landmark session and produces, per frame,
+# what the demo's control loop would have played: root, quality, chord id,
+# velocity and tempo. Everything without memory is vectorized over the
+# timeline (features, the spread-threshold quality rule, the velocity /
+# tempo maps, the chord table lookup); only the root smoother, which is
+# stateful, runs as a tight scalar loop. Results match the live chain
+# frame for frame (music/chord_mapper.py, music/smoothing.py).
+#
+# sweep() scores a grid of ChainParams over one or more sessions on a
+# process pool:
+#   changes_per_min  chord changes per minute
+#   flicker          share of chord changes that last less than --min-hold-ms
+#   stability        share of the time spent in chords that lasted at least that
+#   score            stability * min(cpm, target) / target - flicker
+# so an output that never changes scores 0, and one that flickers is
+# penalized, however stable the rest of it is.
+#
+#   python -m music.offline take.hclm                        # default params
+#   python -m music.offline take.hclm more.hclm --set spread_lo=0.05:0.08:7 \
+#       --set spread_hi=0.09,0.11,0.13 --set alpha=0.2,0.35,0.5 [--workers 4] [--top 10]
+
+import argparse
+import itertools
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, fields, replace
+
+import numpy as np
+
+from classifier.protocol import QUALITY
+from music.chord_table import default_table
+from music.smoothing import ROOT_SMOOTHING
+from common.features import HandFeatures
+from perception.recording import LandmarkRecording
+
+_SEVENTH = np.array([q == "7" for q in QUALITY])
+_MAJ = QUALITY.index("maj")
+
+
+@dataclass(frozen=True)
+class ChainParams:
+    # left_pose_quality
+    spread_lo: float = 0.065
+    spread_hi: float = 0.11
+    # RootSmoother (defaults: the demo's ROOT_SMOOTHING)
+    low: int = ROOT_SMOOTHING["low"]
+    high: int = ROOT_SMOOTHING["high"]
+    alpha: float = ROOT_SMOOTHING["alpha"]
+    deadband_semi: float = ROOT_SMOOTHING["deadband_semi"]
+    max_step_semi: int = ROOT_SMOOTHING["max_step_semi"]
+    min_interval_ms: int = ROOT_SMOOTHING["min_interval_ms"]
+    adaptive: bool = ROOT_SMOOTHING["adaptive"]
+    min_cutoff: float = 1.0
+    beta: float = 1.0
+    predict_ms: float = 0.0
+    # velocity_from_spread
+    vel_spread_lo: float = 0.04
+    vel_spread_span: float = 0.10
+    vel_min: int = 50
+    vel_max: int = 127
+    # tempo_from_distance
+    tempo_dist_lo: float = 0.05
+    tempo_dist_span: float = 0.45
+    bpm_lo: int = 80
+    bpm_hi: int = 140
+    # performer controls
+    key: int = 0
+    scale_lock: bool = False
+
+    def smoother_key(self):
+        return (self.low, self.high, self.alpha, self.deadband_semi, self.max_step_semi,
+                self.min_interval_ms, self.adaptive, self.min_cutoff, self.beta, self.predict_ms)
+
+
+class Session:
+    """The parameter-independent part of a recording: times and the features the chain reads."""
+    def __init__(self, t, n, xyz, name=""):
+        self.name = name
+        self.t = np.asarray(t, dtype=np.float64)
+        self.n = np.asarray(n, dtype=np.int64)
+        f = HandFeatures.from_hands(np.asarray(xyz, dtype=np.float32))
+        h = f.centroid.shape[1]
+        self.y = f.centroid[:, 0, 1].astype(np.float64)                 # right hand height -> root
+        self.spread0 = f.spread[:, 0]                                   # -> velocity
+        self.spread1 = f.spread[:, 1] if h > 1 else np.full(len(t), np.nan, np.float32)   # -> quality
+        self.inter = f.inter_hand if h > 1 else np.full(len(t), np.nan, np.float32)       # -> tempo
+        self.ms = (self.t * 1000).astype(np.int64)                      # the smoother's clock
+        self._roots = {}                                                 # smoother_key -> roots
+
+    @classmethod
+    def load(cls, path):
+        t, n, _, xyz = LandmarkRecording(path).as_arrays()
+        return cls(t, n, xyz, name=path)
+
+    @property
+    def duration(self):
+        return float(self.t[-1] - self.t[0]) if len(self.t) > 1 else 0.0
+
+    def roots(self, p):
+        """Committed root per frame; cached, since sweeps mostly vary the cheap stages."""
+        key = p.smoother_key()
+        if key not in self._roots:
+            if len(self._roots) > 64:
+                self._roots.clear()
+            self._roots[key] = smooth_roots(self.y, self.n, self.ms, p)
+        return self._roots[key]
+
+
+def smooth_roots(y, n, ms, p):
+    """
+    RootSmoother.update over a whole timeline, as one scalar loop (no numpy
+    per frame). Same arithmetic, in the same order, as RootSmoother and
+    OneEuroFilter, so the committed roots are identical.
+    """
+    root_float = (p.low + (1.0 - np.clip(y, 0.0, 1.0)) * (p.high - p.low)).tolist()
+    present = (n > 0).tolist()
+    ms = ms.tolist()
+    out = np.empty(len(root_float), dtype=np.int64)
+    low, high, alpha = p.low, p.high, p.alpha
+    deadband, max_step, min_interval = p.deadband_semi, p.max_step_semi, p.min_interval_ms
+    adaptive, min_cutoff, beta, predict_s = p.adaptive, p.min_cutoff, p.beta, p.predict_ms / 1000.0
+    d_alpha_r = 2.0 * math.pi * 1.0          # One-Euro d_cutoff = 1 Hz
+    two_pi = 2.0 * math.pi
+    ema = None
+    fx = fraw = fdx = 0.0
+    ft = None
+    commit, last_ms = 60, 0
+    for i in range(len(out)):
+        if not present[i]:
+            out[i] = commit
+            continue
+        x, now = root_float[i], ms[i]
+        if adaptive:
+            t = now / 1000.0
+            if ft is None:
+                fx = fraw = x
+                fdx = 0.0
+                ft = t
+            else:
+                dt = t - ft
+                if dt > 0:
+                    ft = t
+                    dx = (x - fraw) / dt
+                    fraw = x
+                    r = d_alpha_r * dt
+                    fdx += r / (r + 1.0) * (dx - fdx)
+                    r = (two_pi * dt) * (min_cutoff + beta * abs(fdx))
+                    fx += (r / (r + 1.0)) * (x - fx)
+            ema = fx + fdx * predict_s if predict_s else fx
+        else:
+            ema = x if ema is None else (alpha * x + (1 - alpha) * ema)
+        target = int(round(ema))
+        if abs(target - commit) <= deadband or (now - last_ms) < min_interval:
+            out[i] = commit
+            continue
+        delta = target - commit
+        if abs(delta) > max_step:
+            target = commit + (max_step if delta > 0 else -max_step)
+        commit = int(max(low, min(high, target)))
+        last_ms = now
+        out[i] = commit
+    return out
+
+
+def render(session, p=ChainParams(), table=None):
+    """Per-frame root, quality (QUALITY index), chord id, velocity and bpm for `session`."""
+    table = table or default_table()
+    n = session.n
+    root = session.roots(p) + p.key
+    with np.errstate(invalid="ignore"):
+        quality = np.where(n >= 2, np.digitize(session.spread1, (p.spread_lo, p.spread_hi)), _MAJ)
+        v = p.vel_min + (session.spread0 - p.vel_spread_lo) * ((p.vel_max - p.vel_min) / p.vel_spread_span)
+        velocity = np.where(n >= 1, np.clip(v, p.vel_min, p.vel_max), 80).astype(np.int64)
+        b = p.bpm_lo + (session.inter - p.tempo_dist_lo) * ((p.bpm_hi - p.bpm_lo) / p.tempo_dist_span)
+        bpm = np.where(n >= 2, np.clip(b, p.bpm_lo, p.bpm_hi), 110).astype(np.int64)
+    if p.scale_lock:
+        cid = table.scale_locked_ids(root, _SEVENTH[quality], p.key).astype(np.int64)
+    else:
+        q_index = np.array([table.q_index.get(q, table._fallback_q) for q in QUALITY])
+        cid = table.chord_ids(root, q_index[quality])
+    return {"root": root, "quality": quality, "cid": cid, "velocity": velocity, "bpm": bpm}
+
+
+def score(t, cid, min_hold_ms=250.0, target_cpm=20.0):
+    """Chord-change rate and stability of one rendered timeline."""
+    duration = float(t[-1] - t[0]) if len(t) > 1 else 0.0
+    starts = np.flatnonzero(np.diff(cid)) + 1               # frames where a new chord begins
+    seg_t = np.concatenate([[t[0]], t[starts], [t[-1]]]) if len(t) else np.zeros(2)
+    held = np.diff(seg_t)                                   # duration of every chord
+    short = held < min_hold_ms / 1000.0
+    changes = len(starts)
+    cpm = changes / (duration / 60.0) if duration > 0 else 0.0
+    flicker = float(short[1:].sum() / changes) if changes else 0.0
+    stability = float(held[~short].sum() / duration) if duration > 0 else 1.0
+    return {
+        "changes": changes,
+        "changes_per_min": cpm,
+        "flicker": flicker,
+        "stability": stability,
+        "mean_hold_s": float(held.mean()) if len(held) else 0.0,
+        "score": stability * min(cpm, target_cpm) / target_cpm - flicker,
+    }
+
+
+def evaluate(sessions, p, min_hold_ms=250.0, target_cpm=20.0, table=None):
+    """Duration-weighted score of `p` over several sessions."""
+    total = sum(s.duration for s in sessions) or 1.0
+    per = [score(s.t, render(s, p, table)["cid"], min_hold_ms, target_cpm) for s in sessions]
+    out = {k: sum(r[k] * s.duration for r, s in zip(per, sessions)) / total
+           for k in ("changes_per_min", "flicker", "stability", "mean_hold_s", "score")}
+    out["changes"] = sum(r["changes"] for r in per)
+    return out
+
+
+# ---- sweep ----
+_FIELDS = {f.name: f for f in fields(ChainParams)}
+
+
+def parse_set(text):
+    """'alpha=0.2,0.35' or 'spread_lo=0.05:0.08:4' (linspace) -> (name, [values])."""
+    name, sep, spec = text.partition("=")
+    if not sep or name not in _FIELDS:
+        raise ValueError(f"bad --set {text!r}; parameters: {', '.join(_FIELDS)}")
+    kind = type(getattr(ChainParams(), name))
+    if kind is bool:
+        cast = lambda v: v.lower() in ("1", "true", "yes", "on")
+    else:
+        cast = kind
+    if ":" in spec:
+        lo, hi, num = spec.split(":")
+        values = np.linspace(float(lo), float(hi), int(num)).tolist()
+        values = [cast(round(v)) if kind is int else cast(v) for v in values]
+    else:
+        values = [cast(v) for v in spec.split(",")]
+    return name, list(dict.fromkeys(values))
+
+
+def grid(base, sets):
+    """Every combination of the --set values, applied on top of `base`."""
+    names = [n for n, _ in sets]
+    for combo in itertools.product(*(v for _, v in sets)):
+        yield replace(base, **dict(zip(names, combo)))
+
+
+_worker = {}
+
+def _init(sessions, min_hold_ms, target_cpm):
+    _worker.update(sessions=sessions, min_hold_ms=min_hold_ms, target_cpm=target_cpm, table=default_table())
+
+
+def _evaluate(p):
+    w = _worker
+    return asdict(p), evaluate(w["sessions"], p, w["min_hold_ms"], w["target_cpm"], w["table"])
+
+
+def sweep(sessions, params, workers=None, min_hold_ms=250.0, target_cpm=20.0):
+    """[(params dict, metrics)] for every ChainParams in `params`, best score first."""
+    params = list(params)
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(params) < 2:
+        _init(sessions, min_hold_ms, target_cpm)
+        results = [_evaluate(p) for p in params]
+    else:
+        chunk = max(1, len(params) // (workers * 4))
+        with ProcessPoolExecutor(workers, initializer=_init,
+                                 initargs=(sessions, min_hold_ms, target_cpm)) as pool:
+            results = list(pool.map(_evaluate, params, chunksize=chunk))
+    results.sort(key=lambda r: r[1]["score"], reverse=True)
+    return results
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="render recorded sessions through the mapping chain / sweep its parameters")
+    p.add_argument("sessions", nargs="+", help=".hclm recordings")
+    p.add_argument("--set", action="append", default=[], metavar="NAME=VALUES",
+                   help="sweep a ChainParams field: a,b,c or start:stop:num (repeatable)")
+    p.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    p.add_argument("--top", type=int, default=10)
+    p.add_argument("--min-hold-ms", type=float, default=250.0, help="chords shorter than this count as flicker")
+    p.add_argument("--target-cpm", type=float, default=20.0, help="chord changes per minute that count as fully responsive")
+    args = p.parse_args(argv)
+
+    t0 = time.perf_counter()
+    sessions = [Session.load(path) for path in args.sessions]
+    sets = [parse_set(s) for s in args.set]
+    base = ChainParams()
+    combos = list(grid(base, sets))
+    results = sweep(sessions, combos, args.workers, args.min_hold_ms, args.target_cpm)
+    secs = time.perf_counter() - t0
+    default_metrics = evaluate(sessions, base, args.min_hold_ms, args.target_cpm)
+    swept = [n for n, _ in sets]
+    frames = sum(len(s.t) for s in sessions)
+    print(json.dumps({
+        "sessions": [s.name for s in sessions],
+        "frames": frames,
+        "minutes": sum(s.duration for s in sessions) / 60.0,
+        "combinations": len(combos),
+        "seconds": secs,
+        "frames_per_s": frames * len(combos) / secs if secs > 0 else None,
+        "default": default_metrics,
+        "top": [{"params": {k: pr[k] for k in swept}, **m} for pr, m in results[:args.top]],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# Performance recorder: everything MidiEngine sends, streamed to a .mid
+# file, plus (optionally) the tracked landmarks to a .hclm sidecar on the
+# same clock.
+#
+# The control / perception threads only put a small tuple on a bounded
+# queue (never blocking; overflow is counted); one writer thread does all
+# the encoding and file I/O, so an hour-long session costs a few KB of RAM
+# and no stalls. MIDI times are the moment the bytes actually went out
+# (MidiOutputThread reports them), relative to the recorder's start, and
+# the sidecar's record times use the same origin:
+#
+#   engine.start_recording("take.mid", landmarks="take.hclm")
+#   ... perception: engine.recorder.append(hands, handedness)
+#
+# music/export.py does the opposite direction offline: a recorded .hclm
+# through the mapping chain into a .mid, much faster than real time.
+
+import queue
+import threading
+import time
+
+from music.smf import SmfWriter
+from perception.recording import LandmarkRecorder
+
+_MIDI, _HANDS, _STOP = 0, 1, 2
+
+
+class MidiRecorder:
+    def __init__(self, path, landmarks=None, ppq=1920, queue_size=8192):
+        self.t0 = time.perf_counter()
+        self.smf = SmfWriter(path, ppq=ppq)
+        # always a fresh file: its t has to line up with the .mid written alongside
+        self.sidecar = LandmarkRecorder(landmarks, t0=self.t0, append=False) if landmarks else None
+        self._q = queue.Queue(maxsize=queue_size)
+        self.dropped = 0            # items rejected because the writer fell behind
+        self.frames = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._loop, name="midi-rec", daemon=True)
+        self._thread.start()
+
+    # ---- producer side (any thread, never blocks) ----
+    def _put(self, item):
+        try:
+            self._q.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def midi(self, data, t=None):
+        """Raw MIDI bytes sent at perf_counter time `t` (default now)."""
+        if data and data[0] < 0xF0:     # clock / realtime bytes aren't recorded
+            self._put((_MIDI, time.perf_counter() if t is None else t, bytes(data), None))
+
+    def append(self, hands, handedness=None, t=None):
+        """Same call as LandmarkRecorder.append; goes to the sidecar (no-op without one)."""
+        if self.sidecar is not None:
+            hands = None if hands is None else hands.copy()
+            self._put((_HANDS, time.perf_counter() if t is None else t, hands, list(handedness or ())))
+
+    # ---- writer thread ----
+    def _loop(self):
+        while True:
+            kind, t, payload, extra = self._q.get()
+            if kind == _STOP:
+                return
+            if kind == _MIDI:
+                self.smf.event(t - self.t0, payload)
+            else:
+                self.sidecar.append(payload, extra, t=t)
+                self.frames += 1
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._q.put((_STOP, 0.0, None, None))     # blocking: everything before it gets written
+        self._thread.join(timeout=5.0)
+        self.smf.close(time.perf_counter() - self.t0)
+        if self.sidecar is not None:
+            self.sidecar.close()
+
+    def stats(self):
+        return {"events": self.smf.events, "frames": self.frames, "dropped": self.dropped,
+                "queued": self._q.qsize()}
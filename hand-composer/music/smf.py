@@ -0,0 +1,124 @@
+# Minimal streaming Standard MIDI File (format 0) writer / reader.
+#
+# SmfWriter appends events as they come (absolute times in seconds,
+# converted to ticks against a fixed tempo so rounding never accumulates),
+# using running status, and keeps only a small byte buffer in memory. Each
+# flush also patches the track length, so a file cut short by a crash is
+# still readable up to the last flush.
+#
+# Default resolution: 1920 ticks per quarter at 120 bpm = 0.26 ms per tick.
+
+import struct
+
+END_OF_TRACK = b"\xff\x2f\x00"
+
+
+def vlq(n):
+    """MIDI variable-length quantity."""
+    out = bytearray((n & 0x7F,))
+    n >>= 7
+    while n:
+        out.append(0x80 | (n & 0x7F))
+        n >>= 7
+    return bytes(reversed(out))
+
+
+class SmfWriter:
+    def __init__(self, path, ppq=1920, bpm=120.0, flush_bytes=1 << 16):
+        self.path = path
+        self.ppq = int(ppq)
+        self.ticks_per_s = self.ppq * bpm / 60.0
+        self.flush_bytes = flush_bytes
+        self.f = open(path, "wb")
+        self.f.write(b"MThd" + struct.pack(">IHHH", 6, 0, 1, self.ppq))
+        self._len_pos = self.f.tell() + 4
+        self.f.write(b"MTrk" + struct.pack(">I", 0))
+        self._track_bytes = 0
+        self._buf = bytearray()
+        self._tick = 0
+        self._status = None
+        self.events = 0
+        # tempo meta event, so every player agrees on what a tick is
+        self._raw(0, b"\xff\x51\x03" + struct.pack(">I", int(round(60e6 / bpm)))[1:])
+
+    def _raw(self, tick, data):
+        self._buf += vlq(max(0, tick - self._tick))
+        self._tick = max(self._tick, tick)
+        self._buf += data
+        if len(self._buf) >= self.flush_bytes:
+            self.flush()
+
+    def event(self, t, data):
+        """Channel message `data` (bytes) at `t` seconds. Times must not go backwards (clamped)."""
+        status = data[0]
+        if status >= 0xF0:
+            return                  # realtime / system messages don't belong in an SMF
+        tick = int(round(t * self.ticks_per_s))
+        if status == self._status:
+            data = data[1:]         # running status
+        self._status = status
+        self._raw(tick, data)
+        self.events += 1
+
+    def flush(self):
+        if self._buf:
+            self.f.write(self._buf)
+            self._track_bytes += len(self._buf)
+            self._buf.clear()
+        end = self.f.tell()
+        self.f.seek(self._len_pos)
+        self.f.write(struct.pack(">I", self._track_bytes))
+        self.f.seek(end)
+        self.f.flush()
+
+    def close(self, t=None):
+        if self.f.closed:
+            return
+        tick = self._tick if t is None else max(self._tick, int(round(t * self.ticks_per_s)))
+        self._raw(tick, END_OF_TRACK)
+        self.flush()
+        self.f.close()
+
+
+def read_smf(path):
+    """Format-0 file -> (ppq, [(tick, bytes)]) of the channel messages (for checks / benches)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:4] != b"MThd":
+        raise ValueError(f"not a MIDI file: {path}")
+    ppq = struct.unpack_from(">H", data, 12)[0]
+    pos = 14
+    if data[pos:pos + 4] != b"MTrk":
+        raise ValueError(f"no track chunk in {path}")
+    length = struct.unpack_from(">I", data, pos + 4)[0]
+    pos += 8
+    end = min(len(data), pos + length)
+    events, tick, status = [], 0, None
+    while pos < end:
+        delta = 0
+        while True:
+            b = data[pos]
+            pos += 1
+            delta = (delta << 7) | (b & 0x7F)
+            if b < 0x80:
+                break
+        tick += delta
+        b = data[pos]
+        if b == 0xFF:                       # meta: type, vlq length, payload
+            pos += 2
+            n = 0
+            while True:
+                c = data[pos]
+                pos += 1
+                n = (n << 7) | (c & 0x7F)
+                if c < 0x80:
+                    break
+            pos += n
+            continue
+        if b & 0x80:
+            status = b
+            pos += 1
+        size = 1 if status & 0xF0 in (0xC0, 0xD0) else 2
+        events.append((tick, bytes((status,)) + data[pos:pos + size]))
+        pos += size
+    return ppq, events
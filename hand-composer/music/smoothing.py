@@ -0,0 +1,78 @@
+# Temporal smoothing of mapped controls
+
+import numpy as np
+
+from common.features import features_of
+from common.filters import OneEuroFilter
+
+
+# what the demo plays with (also the offline renderers' default)
+ROOT_SMOOTHING = dict(low=48, high=72, alpha=0.35, deadband_semi=0.5, max_step_semi=1,
+                      min_interval_ms=100, adaptive=True)
+
+
+class RootSmoother:
+    """
+    Smooths right-hand root changes:
+      - EMA on continuous root (or, with adaptive=True, a One-Euro filter:
+        steady while the hand holds, near lag-free when it sweeps)
+      - deadband in semitones around the committed root
+      - max semitone step per commit (slew-rate)
+      - minimum time between commits (debounce)
+    """
+    def __init__(self, low=36, high=72, alpha=0.35, deadband_semi=0.45,
+                 max_step_semi=2, min_interval_ms=90, adaptive=False,
+                 min_cutoff=1.0, beta=1.0, predict_ms=0.0):
+        self.low, self.high = low, high
+        self.alpha = alpha
+        # One-Euro in semitone units: ~1 Hz at rest, ~25 Hz at 24 semitones/s
+        self.filter = OneEuroFilter((), min_cutoff, beta, predict_s=predict_ms / 1000.0) if adaptive else None
+        self.deadband = deadband_semi
+        self.max_step = max_step_semi
+        self.min_interval = min_interval_ms
+        self._ema = None           # continuous (float) root
+        self._commit = 60          # current committed MIDI root
+        self._last_commit_ms = 0
+
+    def _extract_y(self, hands):
+        f = features_of(hands)
+        if f.n_hands == 0:
+            return None
+        # right hand avg y in [0..1]
+        return float(f.centroid[0, 1])
+
+    def update(self, hands, now_ms):
+        y = self._extract_y(hands)
+        if y is None:
+            return self._commit
+
+        # map to float MIDI in [low..high], top of screen -> higher pitch
+        root_float = self.low + (1.0 - np.clip(y, 0.0, 1.0)) * (self.high - self.low)
+
+        if self.filter is not None:
+            self._ema = float(self.filter(root_float, now_ms / 1000.0))
+        else:
+            # EMA smoothing
+            self._ema = root_float if self._ema is None else (self.alpha*root_float + (1-self.alpha)*self._ema)
+
+        # propose rounded target
+        target = int(round(self._ema))
+
+        # deadband: if within ±deadband of current commit, keep current
+        if abs(target - self._commit) <= self.deadband:
+            return self._commit
+
+        # debounce time
+        if (now_ms - self._last_commit_ms) < self.min_interval:
+            return self._commit
+
+        # slew-rate limit: move at most ±max_step per commit
+        delta = target - self._commit
+        if abs(delta) > self.max_step:
+            target = self._commit + (self.max_step if delta > 0 else -self.max_step)
+
+        # clamp to range & commit
+        target = int(max(self.low, min(self.high, target)))
+        self._commit = target
+        self._last_commit_ms = now_ms
+        return self._commit
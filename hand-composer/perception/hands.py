@@ -1,21 +1,91 @@
 import time
 import cv2
 import numpy as np
-import mediapipe as mp
+
+from common.filters import HandFilterBank
+from perception.sources import CameraSource
+from perf import trace
+from perf.stats import Histogram, RateMeter
+
+def load_model(max_num_hands=2, detection=0.6, tracking=0.6, warmup=True):
+    """
+    MediaPipe Hands graph, optionally with one inference on a blank frame so
+    the first real frame doesn't pay for graph / delegate setup. Slow (the
+    mediapipe import alone is ~1 s), so callers may run it on a thread
+    while the camera opens.
+    """
+    import mediapipe as mp
+    hands = mp.solutions.hands.Hands(
+        max_num_hands=max_num_hands,
+        min_detection_confidence=detection,
+        min_tracking_confidence=tracking)
+    if warmup:
+        hands.process(np.zeros((240, 320, 3), dtype=np.uint8))
+    return hands
+
 
 class HandTracker:
-    def __init__(self, max_num_hands=2, detection=0.6, tracking=0.6, smooth_alpha=0.6):
-        self.cap = cv2.VideoCapture(0)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH,  1280)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-        self.hands = mp.solutions.hands.Hands(
-            max_num_hands=max_num_hands,
-            min_detection_confidence=detection,
-            min_tracking_confidence=tracking)
+    """
+    MediaPipe Hands on frames from `source`.
+
+    Default behaviour is the original one: the whole frame, every frame.
+    The cheaper tracking mode is opt-in:
+      roi=True             once hands are found, only a box around them (plus
+                           `roi_margin`) is fed to MediaPipe; the full frame is
+                           re-scanned every `full_every` frames and whenever
+                           the hands are lost, so new hands still get found
+      infer_width=640      downscale what goes to MediaPipe to this width
+      motion_threshold=2.0 mean abs grey-level change (0..255) in the ROI
+                           below which the landmark model is skipped and the
+                           previous landmarks are reused (at most `max_skip`
+                           frames in a row)
+    stats() reports per-frame cost and how often each path was taken.
+
+    Smoothing is a per-hand One-Euro filter bank (common/filters.py);
+    pass a configured HandFilterBank as `smoothing`, or "ema" for the old
+    fixed-alpha EMA over the stacked array (`smooth_alpha`).
+
+    `model` takes an already built load_model() graph (see demo/startup.py).
+    """
+    def __init__(self, max_num_hands=2, detection=0.6, tracking=0.6, smooth_alpha=0.6,
+                 source=None, mirror=True, roi=False, roi_margin=0.25, full_every=30,
+                 infer_width=None, motion_threshold=None, max_skip=10, smoothing=None, model=None):
+        # any object with read() -> BGR frame | None and release(); default: webcam 0
+        self.source = source if source is not None else CameraSource(0)
+        self.mirror = mirror
+        self.handedness = []  # labels matching the rows of the last returned array
+        import mediapipe as mp
+        self.hands = model if model is not None else load_model(max_num_hands, detection, tracking, warmup=False)
         self.drawer = mp.solutions.drawing_utils
+        self._connections = mp.solutions.hands.HAND_CONNECTIONS
         self.ema_prev = None
         self.alpha = smooth_alpha
-        self.last_ts = time.time()
+        if smoothing == "ema":
+            self.bank = None
+        else:
+            self.bank = smoothing if smoothing is not None else HandFilterBank()
+        self.fps_meter = RateMeter(30)
+
+        self.roi = roi
+        self.roi_margin = roi_margin
+        self.full_every = full_every
+        self.infer_width = infer_width
+        self.motion_threshold = motion_threshold
+        self.max_skip = max_skip
+        self._box = None            # current ROI in pixels (x0, y0, x1, y1); None = full frame
+        self._since_full = 0
+        self._skipped_run = 0
+        self._motion_ref = None     # small grey ROI at the last frame the model ran on
+        self._last = None           # (raw (H,21,3) landmarks, handedness) from the last model run
+        self._xyz = np.zeros((max_num_hands, 21, 3), dtype=np.float32)  # extraction buffer
+        self._flat = self._xyz.reshape(max_num_hands, 63)
+        self._rgb = None            # preallocated colour-conversion target
+
+        self.frames = 0
+        self.skipped = 0            # frames answered from the previous landmarks
+        self.roi_frames = 0         # frames where MediaPipe saw only the ROI
+        self.cost_ms = Histogram("tracker_frame_ms")
+        self.infer_ms = Histogram("tracker_mediapipe_ms")
 
     def _ema(self, arr):
         if arr is None:
@@ -26,42 +96,169 @@ class HandTracker:
         self.ema_prev = self.alpha * arr + (1 - self.alpha) * self.ema_prev
         return self.ema_prev
 
-    def read(self):
-        ok, frame = self.cap.read()
-        if not ok:
-            return None, None, 0.0
-        frame = cv2.flip(frame, 1)
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        res = self.hands.process(rgb)
+    def _smooth(self, raw, t):
+        t0 = trace.start()
+        out = self._ema(raw) if self.bank is None else self.bank(raw, self.handedness, t)
+        trace.stop("smoothing", t0)
+        return out
+
+    def grab(self):
+        """Source read only; returns the (mirrored) BGR frame or None."""
+        frame = self.source.read()
+        if frame is None:
+            return None
+        return cv2.flip(frame, 1) if self.mirror else frame
 
-        hands_xyz = []
+    # ---- ROI / motion gating ----
+    def _update_box(self, raw, w, h):
+        """Follow the hands; only move the box when they get close to its edge,
+        so MediaPipe's own tracker sees a stable crop."""
+        if raw is None or self._since_full >= self.full_every:
+            self._box = None
+            return
+        xs, ys = raw[..., 0] * w, raw[..., 1] * h
+        bx0, bx1, by0, by1 = xs.min(), xs.max(), ys.min(), ys.max()
+        if self._box is not None:
+            x0, y0, x1, y1 = self._box
+            inner_x, inner_y = (x1 - x0) * 0.1, (y1 - y0) * 0.1
+            if bx0 > x0 + inner_x and bx1 < x1 - inner_x and by0 > y0 + inner_y and by1 < y1 - inner_y:
+                return
+        mx = (bx1 - bx0) * self.roi_margin + 0.05 * w
+        my = (by1 - by0) * self.roi_margin + 0.05 * h
+        x0, x1 = int(max(0, bx0 - mx)), int(min(w, bx1 + mx))
+        y0, y1 = int(max(0, by0 - my)), int(min(h, by1 + my))
+        self._box = None if (x1 - x0) * (y1 - y0) > 0.7 * w * h else (x0, y0, x1, y1)
+
+    def _grey_small(self, view):
+        h, w = view.shape[:2]
+        sw = max(64, w // 8)   # ~8 px cells: a full frame keeps enough detail to see a hand move
+        small = cv2.resize(view, (sw, max(1, int(sw * h / w))), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    def _still(self, view):
+        """True if the ROI barely changed since the last frame the model ran on."""
+        ref = self._motion_ref
+        if ref is None:
+            return False
+        small = self._grey_small(view)
+        return small.shape == ref.shape and float(cv2.absdiff(small, ref).mean()) < self.motion_threshold
+
+    def _extract(self, res, x0, y0, cw, ch, w, h):
+        """Landmarks into the preallocated buffer, mapped back to full-frame coordinates."""
+        labels = []
+        for k, (lm, handedness) in enumerate(zip(res.multi_hand_landmarks, res.multi_handedness)):
+            if k >= len(self._xyz):
+                break
+            row, j = self._flat[k], 0
+            for p in lm.landmark:   # scalar stores: no per-hand list (and as fast as building one)
+                row[j] = p.x
+                row[j + 1] = p.y
+                row[j + 2] = p.z
+                j += 3
+            labels.append(handedness.classification[0].label.lower())  # 'left' or 'right'
+        if labels and (cw != w or ch != h):
+            xyz = self._xyz[:len(labels)]
+            xyz[..., 0] = (x0 + xyz[..., 0] * cw) / w
+            xyz[..., 1] = (y0 + xyz[..., 1] * ch) / h
+            xyz[..., 2] *= cw / w   # MediaPipe z is in units of image width
+        return labels
+
+    def _infer(self, view):
+        ch, cw = view.shape[:2]
+        if self.infer_width and cw > self.infer_width:
+            view = cv2.resize(view, (self.infer_width, int(ch * self.infer_width / cw)),
+                              interpolation=cv2.INTER_AREA)
+        if self._rgb is None or self._rgb.shape != view.shape:
+            self._rgb = np.empty_like(view)
+        cv2.cvtColor(view, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        t0 = time.perf_counter()
+        res = self.hands.process(self._rgb)
+        ms = (time.perf_counter() - t0) * 1000.0
+        self.infer_ms.observe(ms)
+        trace.record("mediapipe", ms)
+        return res
+
+    def _draw_cached(self, frame, raw):
+        h, w = frame.shape[:2]
+        for hand in raw:
+            for x, y, _ in hand:
+                cv2.circle(frame, (int(x * w), int(y * h)), 3, (0, 255, 0), -1)
+
+    def process(self, frame):
+        """MediaPipe + smoothing on a grabbed frame -> (annotated frame, (H,21,3) or None)."""
+        t_start = time.perf_counter()
+        self.frames += 1
+        h, w = frame.shape[:2]
+        x0, y0, x1, y1 = self._box if self._box is not None else (0, 0, w, h)
+        view = frame[y0:y1, x0:x1]
+
+        if (self.motion_threshold is not None and self._last is not None
+                and self._skipped_run < self.max_skip and self._still(view)):
+            # nothing moved: reuse the last landmarks, don't run the model
+            self.skipped += 1
+            self._skipped_run += 1
+            raw, self.handedness = self._last
+            if raw is not None:
+                self._draw_cached(frame, raw)
+            smoothed = self._smooth(raw, t_start)
+            self.cost_ms.observe((time.perf_counter() - t_start) * 1000.0)
+            return frame, smoothed
+        self._skipped_run = 0
+        if self._box is not None:
+            self.roi_frames += 1
+            self._since_full += 1
+        else:
+            self._since_full = 0
+
+        res = self._infer(view)
+        found = {}
         if res.multi_hand_landmarks and res.multi_handedness:
-            for lm, handedness in zip(res.multi_hand_landmarks, res.multi_handedness):
-                xyz = np.array([[p.x, p.y, p.z] for p in lm.landmark], dtype=np.float32)  # (21,3)
-                label = handedness.classification[0].label.lower()  # 'left' or 'right'
-                hands_xyz.append((label, xyz))
-                self.drawer.draw_landmarks(frame, lm, mp.solutions.hands.HAND_CONNECTIONS)
+            labels = self._extract(res, x0, y0, x1 - x0, y1 - y0, w, h)
+            found = {label: k for k, label in enumerate(labels)}
 
         smoothed = None
-        if hands_xyz:
+        raw = None
+        if found:
             # pack to fixed order: right, left (if present)
-            ordered = []
-            # collect dict for easy fetch
-            d = {h: xyz for (h, xyz) in hands_xyz}
-            for name in ("right", "left"):
-                if name in d:
-                    ordered.append(d[name])
-            if ordered:
-                concat = np.stack(ordered, axis=0)  # (H, 21, 3)
-                smoothed = self._ema(concat)
+            self.handedness = [name for name in ("right", "left") if name in found]
+            raw = np.stack([self._xyz[found[name]] for name in self.handedness], axis=0)  # (H, 21, 3)
+            smoothed = self._smooth(raw, t_start)
         else:
-            self._ema(None)
+            self.handedness = []
+            self._smooth(None, t_start)
+        self._last = (raw, list(self.handedness))
+        if self.roi:
+            self._update_box(raw, w, h)
+        if self.motion_threshold is not None:
+            if (self._box or (0, 0, w, h)) != (x0, y0, x1, y1):
+                self._motion_ref = None  # new crop: let the model see it once before gating again
+            else:
+                # reference for the next frame's motion check, taken before anything is drawn on it
+                self._motion_ref = self._grey_small(view)
+        if found:
+            for lm in res.multi_hand_landmarks:
+                self.drawer.draw_landmarks(view, lm, self._connections)
+        self.cost_ms.observe((time.perf_counter() - t_start) * 1000.0)
+        return frame, smoothed
+
+    def read(self):
+        frame = self.grab()
+        if frame is None:
+            return None, None, 0.0
+        frame, smoothed = self.process(frame)
+        return frame, smoothed, self.fps_meter.tick()
 
-        now = time.time()
-        fps = 1.0 / (now - self.last_ts) if now != self.last_ts else 0.0
-        self.last_ts = now
-        return frame, smoothed, fps
+    def stats(self):
+        n = max(1, self.frames)
+        return {
+            "frames": self.frames,
+            "skip_rate": self.skipped / n,
+            "roi_rate": self.roi_frames / n,
+            "cost_p50_ms": self.cost_ms.quantile(0.50),
+            "cost_p95_ms": self.cost_ms.quantile(0.95),
+            "mediapipe_p50_ms": self.infer_ms.quantile(0.50),
+        }
 
     def release(self):
-        self.cap.release()
+        self.source.release()
         self.hands.close()
@@ -0,0 +1,401 @@
+# Multi-performer perception: one worker process per performer.
+#
+# Each worker owns its source and its own MediaPipe graph (or a replayed
+# .hclm session), so N performers use N cores instead of sharing one GIL.
+# Results come back through a single shared-memory "board" with one
+# RECORD_DTYPE row per performer (same layout as recorded sessions, but `t`
+# is the capture perf_counter(), comparable across processes on the same
+# host). Rows are guarded by a seqlock: the worker makes `seq` odd while it
+# writes and even when done, readers retry if it changed under them.
+#
+# Splitting one camera into regions (two performers in front of one lens):
+# the parent process owns the camera and publishes each frame into a
+# double-buffered SharedFrameBuffer; each region's worker crops its part.
+# Landmarks are then normalized to the performer's own region.
+#
+#   pool = PerceptionPool([PerformerSpec.parse("camera:0@left", channel=0),
+#                          PerformerSpec.parse("camera:0@right", channel=1)])
+#   pool.start()
+#   for i, ts, hands, handedness in pool.poll(): ...
+
+import multiprocessing as mp
+import os
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from perception.recording import RECORD_DTYPE, MAX_HANDS, HAND_CODES, HAND_NAMES, NO_HAND
+from perf.stats import RateMeter
+
+REGIONS = {
+    "left":   (0.0, 0.0, 0.5, 1.0),
+    "right":  (0.5, 0.0, 1.0, 1.0),
+    "top":    (0.0, 0.0, 1.0, 0.5),
+    "bottom": (0.0, 0.5, 1.0, 1.0),
+}
+
+BOARD_DTYPE = np.dtype([
+    ("seq", "<u8"),         # seqlock: odd while the worker is writing the row
+    ("status", "<u8"),      # STARTING / RUNNING / FINISHED / FAILED
+    ("fps", "<f8"),
+    ("proc_ms", "<f8"),     # tracker time for the last frame
+    ("rec", RECORD_DTYPE),  # t = capture perf_counter()
+])
+STARTING, RUNNING, FINISHED, FAILED = range(4)
+STATUS_NAMES = ("starting", "running", "finished", "failed")
+
+
+@dataclass
+class PerformerSpec:
+    kind: str                   # camera | video | replay
+    target: str                 # camera index or file path
+    region: tuple = None        # (x0, y0, x1, y1) in 0..1 of the source frame; None = whole frame
+    channel: int = 0            # MIDI channel this performer plays on
+    realtime: bool = True       # video / replay: pace at recorded speed
+    loop: bool = False          # video / replay: start over at the end
+    mirror: bool = True         # camera / video: selfie view, like HandTracker
+
+    @classmethod
+    def parse(cls, text, **kw):
+        """'camera:0', 'camera:0@left', 'camera:1@0,0,0.5,1', 'video:clip.mp4', 'replay:take.hclm'"""
+        kind, _, rest = text.partition(":")
+        if kind not in ("camera", "video", "replay") or not rest:
+            raise ValueError(f"bad performer spec {text!r}, expected camera:N[@region], video:PATH or replay:PATH")
+        target, _, region = rest.partition("@")
+        if region:
+            if region in REGIONS:
+                region = REGIONS[region]
+            else:
+                region = tuple(float(v) for v in region.split(","))
+                if len(region) != 4:
+                    raise ValueError(f"region must be a name or x0,y0,x1,y1: {text!r}")
+            if kind != "camera":
+                raise ValueError("regions are only supported on cameras")
+        return cls(kind, target, region or None, **kw)
+
+    @property
+    def name(self):
+        return f"{self.kind}:{self.target}" + ("" if self.region is None else f"@{self.region}")
+
+
+def _attach(name):
+    # Attach to a segment the parent created without registering it with a
+    # resource tracker: only the creator unlinks it. A worker that ends up
+    # with a tracker of its own would otherwise report it as leaked (and
+    # unlink it) when it exits, and unregistering afterwards instead drops
+    # the parent's entry when the tracker is shared.
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+# ---- one camera, several regions ----
+class SharedFrameBuffer:
+    """
+    Latest frame in shared memory: header (seq, capture time per slot), then
+    a ring of three HxWx3 slots. Frame seq and its time live in slot seq % 3,
+    so a reader copying it is only overwritten once seq + 2 has been
+    published (see read_into).
+    """
+    SLOTS = 3
+    HEADER = 8 + 8 * SLOTS
+
+    def __init__(self, shape, name=None, create=True):
+        self.shape = tuple(shape)
+        size = self.HEADER + self.SLOTS * int(np.prod(self.shape))
+        if create:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        else:
+            self.shm = _attach(name)
+        self.owner = create
+        self.name = self.shm.name
+        self._seq = np.ndarray((1,), dtype="<u8", buffer=self.shm.buf)
+        self._ts = np.ndarray((self.SLOTS,), dtype="<f8", buffer=self.shm.buf, offset=8)
+        self.slots = np.ndarray((self.SLOTS,) + self.shape, dtype=np.uint8, buffer=self.shm.buf, offset=self.HEADER)
+        if create:
+            self._seq[0] = 0
+
+    def publish(self, frame, ts):
+        seq = int(self._seq[0]) + 1
+        self.slots[seq % self.SLOTS] = frame
+        self._ts[seq % self.SLOTS] = ts
+        self._seq[0] = seq
+
+    def seq(self):
+        return int(self._seq[0])
+
+    def read_into(self, seq, out, region=None):
+        """Copy frame `seq` (optionally a pixel-region crop) into `out`; False if it was overwritten meanwhile."""
+        src = self.slots[seq % self.SLOTS]
+        if region is not None:
+            y0, y1, x0, x1 = region
+            src = src[y0:y1, x0:x1]
+        ts = float(self._ts[seq % self.SLOTS])
+        np.copyto(out, src)
+        # the writer of seq + 2 (counter still at seq + 1) fills another slot;
+        # seq + 3 reuses ours and only starts once the counter reads seq + 2
+        return int(self._seq[0]) - seq < self.SLOTS - 1, ts
+
+    def close(self):
+        self._seq = self._ts = self.slots = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class SharedFrameSource:
+    """Frame source (read/release) over a SharedFrameBuffer region, for use inside a worker."""
+    def __init__(self, name, shape, region):
+        self.buf = SharedFrameBuffer(shape, name=name, create=False)
+        h, w = shape[:2]
+        x0, y0, x1, y1 = region
+        self.px = (int(y0 * h), int(y1 * h), int(x0 * w), int(x1 * w))
+        self.frame = np.empty((self.px[1] - self.px[0], self.px[3] - self.px[2], 3), dtype=np.uint8)
+        self.last_ts = None
+        self._seen = 0
+
+    def read(self, timeout=1.0):
+        end = time.perf_counter() + timeout
+        while time.perf_counter() < end:
+            seq = self.buf.seq()
+            if seq != self._seen:
+                ok, ts = self.buf.read_into(seq, self.frame, self.px)
+                self._seen = seq
+                if ok:
+                    self.last_ts = ts
+                    return self.frame
+            else:
+                time.sleep(0.001)
+        return None
+
+    def release(self):
+        self.buf.close()
+
+
+class _CameraPublisher:
+    """Parent-side thread: camera -> SharedFrameBuffer, for region performers."""
+    def __init__(self, index, mirror=True):
+        import cv2
+        from perception.sources import CameraSource
+        self.cv2 = cv2
+        self.source = CameraSource(index)
+        self.mirror = mirror
+        first = None
+        for _ in range(50):  # some cameras return a few empty frames while starting
+            first = self.source.read()
+            if first is not None:
+                break
+            time.sleep(0.02)
+        if first is None:
+            raise IOError(f"camera {index} gave no frames")
+        self.buf = SharedFrameBuffer(first.shape)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name=f"cam{index}-publish", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            frame = self.source.read()
+            if frame is None:
+                time.sleep(0.005)
+                continue
+            ts = time.perf_counter()
+            if self.mirror:
+                frame = self.cv2.flip(frame, 1)
+            self.buf.publish(frame, ts)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+        self.source.release()
+        self.buf.close()
+
+
+# ---- worker process ----
+def _build_tracker(spec, frame_buf):
+    if spec.kind == "replay":
+        from perception.recording import ReplayTracker
+        return ReplayTracker(spec.target, realtime=spec.realtime, loop=spec.loop, size=(320, 180))
+    from perception.hands import HandTracker
+    if frame_buf is not None:
+        name, shape = frame_buf
+        # the publisher already mirrored the full frame
+        return HandTracker(source=SharedFrameSource(name, shape, spec.region), mirror=False)
+    if spec.kind == "video":
+        from perception.sources import VideoFileSource
+        source = VideoFileSource(spec.target, realtime=spec.realtime, loop=spec.loop)
+    else:
+        from perception.sources import CameraSource
+        source = CameraSource(int(spec.target))
+    return HandTracker(source=source, mirror=spec.mirror)
+
+
+def _worker(index, spec, board_name, n_rows, frame_buf, stop):
+    shm = _attach(board_name)             # the parent owns (and unlinks) the board
+    board = np.ndarray((n_rows,), dtype=BOARD_DTYPE, buffer=shm.buf)
+    row = board[index:index + 1]         # 1-element views, writes land in shared memory
+    seq, rec = row["seq"], row["rec"]
+    tracker = None
+    try:
+        tracker = _build_tracker(spec, frame_buf)
+        source = getattr(tracker, "source", None)
+        row["status"] = RUNNING
+        rate = RateMeter(30)
+        while not stop.is_set():
+            token = tracker.grab()
+            if token is None:
+                if spec.kind != "camera":
+                    break       # replay / video ran out
+                time.sleep(0.005)
+                continue
+            # prefer the publisher's capture time when the frame came through shared memory
+            ts = getattr(source, "last_ts", None) or time.perf_counter()
+            t0 = time.perf_counter()
+            _, hands = tracker.process(token)
+            done = time.perf_counter()
+
+            n = 0 if hands is None else min(MAX_HANDS, hands.shape[0])
+            seq += 1                          # odd: writing
+            rec["t"] = ts
+            rec["n"] = n
+            rec["hand"] = NO_HAND
+            if n:
+                rec["xyz"][0, :n] = hands[:n]
+                for h in range(n):
+                    label = tracker.handedness[h] if h < len(tracker.handedness) else None
+                    rec["hand"][0, h] = HAND_CODES.get(label, NO_HAND)
+            seq += 1                          # even: consistent
+            row["proc_ms"] = (done - t0) * 1000.0
+            row["fps"] = rate.tick(done)
+        row["status"] = FINISHED
+    except Exception as e:
+        print(f"[perception-pool] performer {index} ({spec.name}) failed:", e, flush=True)
+        row["status"] = FAILED
+    finally:
+        if tracker is not None:
+            tracker.release()
+        del row, seq, rec, board
+        shm.close()
+
+
+# ---- parent side ----
+class PerceptionPool:
+    def __init__(self, specs):
+        self.specs = list(specs)
+        self._shm = None
+        self._board = None
+        self._procs = []
+        self._publishers = {}
+        self._seen = [0] * len(self.specs)
+        self._ctx = mp.get_context("spawn")  # no forked MediaPipe / OpenCV state
+        self._stop = self._ctx.Event()
+        self._out = np.zeros(1, dtype=RECORD_DTYPE)
+
+    def start(self):
+        n = len(self.specs)
+        self._shm = shared_memory.SharedMemory(name=f"hc-perc-{os.getpid()}-{uuid.uuid4().hex[:6]}",
+                                               create=True, size=max(1, n) * BOARD_DTYPE.itemsize)
+        self._board = np.ndarray((n,), dtype=BOARD_DTYPE, buffer=self._shm.buf)
+        self._board[:] = np.zeros(n, dtype=BOARD_DTYPE)
+        for i, spec in enumerate(self.specs):
+            frame_buf = None
+            if spec.kind == "camera" and spec.region is not None:
+                pub = self._publishers.get(spec.target)
+                if pub is None:
+                    pub = self._publishers[spec.target] = _CameraPublisher(int(spec.target), spec.mirror)
+                frame_buf = (pub.buf.name, pub.buf.shape)
+            p = self._ctx.Process(target=_worker, name=f"perception-{i}",
+                                  args=(i, spec, self._shm.name, n, frame_buf, self._stop), daemon=True)
+            p.start()
+            self._procs.append(p)
+        return self
+
+    def wait_ready(self, timeout=30.0):
+        """Block until every worker is past start-up (MediaPipe init can take seconds)."""
+        end = time.perf_counter() + timeout
+        while time.perf_counter() < end:
+            if (self._board["status"] != STARTING).all():
+                return True
+            time.sleep(0.01)
+        return False
+
+    def latest(self, i):
+        """-> (seq, capture ts, (H,21,3) or None, handedness) for performer i, or None before its first frame."""
+        seq = self._board["seq"]
+        rec = self._board["rec"]
+        for _ in range(100):
+            s = int(seq[i])
+            if s & 1:
+                continue
+            self._out[0] = rec[i]
+            if int(seq[i]) == s:
+                break
+        else:
+            return None
+        if s == 0:
+            return None
+        r = self._out[0]
+        n = int(r["n"])
+        if n == 0:
+            return s // 2, float(r["t"]), None, []
+        return s // 2, float(r["t"]), np.array(r["xyz"][:n]), [HAND_NAMES.get(int(c), "?") for c in r["hand"][:n]]
+
+    def poll(self):
+        """New results since the last poll: [(performer index, capture ts, hands, handedness)]."""
+        out = []
+        seq = self._board["seq"]
+        for i in range(len(self.specs)):
+            if int(seq[i]) // 2 == self._seen[i]:
+                continue
+            item = self.latest(i)
+            if item is None:
+                continue
+            s, ts, hands, handedness = item
+            self._seen[i] = s
+            out.append((i, ts, hands, handedness))
+        return out
+
+    @property
+    def running(self):
+        """True while any performer is still starting or producing frames."""
+        return bool(((self._board["status"] == STARTING) | (self._board["status"] == RUNNING)).any())
+
+    def stats(self):
+        b = self._board
+        return [{
+            "performer": spec.name,
+            "channel": spec.channel,
+            "status": STATUS_NAMES[int(b["status"][i])],
+            "frames": int(b["seq"][i]) // 2,
+            "fps": float(b["fps"][i]),
+            "proc_ms": float(b["proc_ms"][i]),
+        } for i, spec in enumerate(self.specs)]
+
+    def close(self):
+        self._stop.set()
+        for p in self._procs:
+            p.join(timeout=2.0)
+            if p.is_alive():
+                p.terminate()
+        self._procs = []
+        for pub in self._publishers.values():
+            pub.close()
+        self._publishers = {}
+        if self._shm is not None:
+            self._board = None
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
@@ -0,0 +1,439 @@
+# Clients for the remote chord-quality classifier (server.py).
+#
+# HttpQualityClient   – one blocking POST per call, but on a kept-alive session
+# StreamQualityClient – persistent binary WebSocket; submit() never blocks and
+#                       `quality` is whatever the server answered most recently
+# ShmQualityClient    – same API as both, over a shared-memory ring to a local
+#                       classifier.shm_worker; falls back to HTTP / WebSocket
+#                       whenever no live worker is attached
+# AsyncQualityClient  – submit()/latest() around any blocking predict() client
+#                       (HTTP, or Shm over HTTP): the calls run on a thread of
+#                       their own, newest frame wins, so a real-time loop never
+#                       waits on a round-trip
+#
+# Both take an optional PredictionCache / Hysteresis (classifier/cache.py) so a
+# held pose is answered locally instead of costing a classifier call.
+# cached=False sends a frame (e.g. a warm-up probe) past both, leaving them
+# untouched; reset() forgets the current answer and any still in flight.
+
+import os
+import threading
+import time
+
+from classifier.cache import normalize_pose
+from classifier.shm_ring import ShmRing, DEFAULT_NAME
+from classifier.protocol import (
+    QUALITY, RESULT_BYTES, pack_frame, unpack_result,
+)
+
+
+class HttpQualityClient:
+    def __init__(self, url="http://localhost:8000/predict", timeout=0.25, cache=None, hysteresis=None):
+        import requests
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()  # reuse the TCP connection
+        self.cache = cache
+        self.hysteresis = hysteresis
+        self.calls = 0
+
+    def predict(self, left21, cached=True):
+        norm = key = None
+        if cached and (self.cache is not None or self.hysteresis is not None):
+            norm, key = self.cache.key(left21) if self.cache is not None else (normalize_pose(left21), None)
+            idx = self.hysteresis.check(norm) if self.hysteresis is not None else None
+            if idx is not None:
+                return QUALITY[idx]     # like server.classify: no update on a hysteresis hit
+            idx = self.cache.get(key) if self.cache is not None else None
+            if idx is not None:
+                if self.hysteresis is not None:
+                    self.hysteresis.update(norm, idx)
+                return QUALITY[idx]
+
+        self.calls += 1
+        r = self.session.post(self.url, json={"left21": left21.tolist()}, timeout=self.timeout)
+        r.raise_for_status()
+        quality = r.json()["quality"]
+        if norm is not None:
+            idx = QUALITY.index(quality)
+            if self.cache is not None:
+                self.cache.put(key, idx)
+            if self.hysteresis is not None:
+                self.hysteresis.update(norm, idx)
+        return quality
+
+    def reset(self):
+        pass        # blocking: there is no answer kept between calls
+
+    def close(self):
+        self.session.close()
+
+
+class StreamQualityClient:
+    """
+    Fire-and-forget frames over one long-lived WebSocket.
+
+    A sender thread pushes only the newest submitted frame (older unsent
+    frames are dropped), a receiver thread records the newest answer.
+    Reconnects with backoff if the server goes away.
+    """
+    def __init__(self, url="ws://localhost:8000/stream", stale_ms=250, reconnect_s=1.0,
+                 cache=None, hysteresis=None):
+        self.url = url
+        self.stale_ms = stale_ms
+        self.reconnect_s = reconnect_s
+        self.cache = cache
+        self.hysteresis = hysteresis
+
+        self._cv = threading.Condition()
+        self._frame = None          # newest unsent packed frame
+        self._seq = 0
+        self._sent_at = {}          # seq -> perf_counter, for round-trip time
+        self._pending = {}          # seq -> (normalized pose, cache key) awaiting a reply
+        self._ignore_upto = 0       # replies to frames up to this seq are dropped (reset())
+        self._ws = None
+        self._closed = False
+
+        self.quality = None         # newest prediction (None until first reply)
+        self.result_seq = -1
+        self.result_ts = 0.0
+        self.rtt_ms = 0.0
+        self.dropped = 0            # frames replaced before they were sent
+        self.local = 0              # frames answered by cache / hysteresis
+
+        self._sender = threading.Thread(target=self._send_loop, name="quality-tx", daemon=True)
+        self._sender.start()
+
+    # ---- control-loop side (never blocks on the network) ----
+    def submit(self, left21, cached=True):
+        norm = key = None
+        if cached and (self.cache is not None or self.hysteresis is not None):
+            norm, key = self.cache.key(left21) if self.cache is not None else (normalize_pose(left21), None)
+            idx = self.hysteresis.check(norm) if self.hysteresis is not None else None
+            if idx is not None:
+                self._answer_locally(None, idx)
+                return None
+            idx = self.cache.get(key) if self.cache is not None else None
+            if idx is not None:
+                self._answer_locally(norm, idx)
+                return None
+        with self._cv:
+            self._seq += 1
+            if self._frame is not None:
+                self.dropped += 1
+                self._pending.pop(self._frame[0], None)
+            if norm is not None:
+                self._pending[self._seq] = (norm, key)
+            self._frame = (self._seq, pack_frame(self._seq, left21))
+            self._cv.notify()
+        return self._seq
+
+    def _answer_locally(self, norm, idx):
+        # norm is None for a hysteresis hit: the reference pose only moves on a
+        # new answer (server or cache), else a slow move never crosses the threshold
+        self.local += 1
+        if self.hysteresis is not None and norm is not None:
+            self.hysteresis.update(norm, idx)
+        self.result_ts = time.perf_counter()
+        self.quality = QUALITY[idx]
+
+    def reset(self):
+        with self._cv:
+            self._ignore_upto = self._seq
+            self.quality = None
+            self.result_ts = 0.0
+
+    def latest(self):
+        """Newest quality, or None if there is none or it is older than `stale_ms`."""
+        if self.quality is None:
+            return None
+        if (time.perf_counter() - self.result_ts) * 1000.0 > self.stale_ms:
+            return None
+        return self.quality
+
+    @property
+    def connected(self):
+        return self._ws is not None
+
+    # ---- network side ----
+    def _connect(self):
+        from websockets.sync.client import connect
+        ws = connect(self.url, open_timeout=1.0, compression=None)
+        threading.Thread(target=self._recv_loop, args=(ws,), name="quality-rx", daemon=True).start()
+        return ws
+
+    def _send_loop(self):
+        while not self._closed:
+            if self._ws is None:
+                try:
+                    self._ws = self._connect()
+                except Exception:
+                    time.sleep(self.reconnect_s)
+                    continue
+            with self._cv:
+                while self._frame is None and not self._closed:
+                    self._cv.wait(timeout=0.5)
+                if self._closed:
+                    break
+                seq, data = self._frame
+                self._frame = None
+                self._sent_at[seq] = time.perf_counter()
+            try:
+                self._ws.send(data)
+            except Exception:
+                self._drop_connection()
+
+    def _recv_loop(self, ws):
+        try:
+            for msg in ws:
+                if not isinstance(msg, bytes) or len(msg) != RESULT_BYTES:
+                    continue
+                seq, idx = unpack_result(msg)
+                now = time.perf_counter()
+                with self._cv:
+                    sent = self._sent_at.pop(seq, None)
+                    pending = self._pending.pop(seq, None)
+                    # forget anything older than this reply; it will never come back
+                    for s in [s for s in self._sent_at if s < seq]:
+                        del self._sent_at[s]
+                    for s in [s for s in self._pending if s < seq]:
+                        del self._pending[s]
+                if pending is not None:
+                    norm, key = pending
+                    if self.cache is not None:
+                        self.cache.put(key, idx)
+                    if self.hysteresis is not None:
+                        self.hysteresis.update(norm, idx)
+                if seq < self.result_seq or seq <= self._ignore_upto:
+                    continue
+                if sent is not None:
+                    self.rtt_ms = (now - sent) * 1000.0
+                self.result_seq, self.result_ts = seq, now
+                self.quality = QUALITY[idx]
+        except Exception:
+            pass
+        if self._ws is ws:
+            self._drop_connection()
+
+    def _drop_connection(self):
+        ws, self._ws = self._ws, None
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+
+    def close(self):
+        self._closed = True
+        with self._cv:
+            self._cv.notify_all()
+        self._drop_connection()
+
+
+_yield = getattr(os, "sched_yield", lambda: time.sleep(0))
+
+
+class ShmQualityClient:
+    """
+    Talks to `python -m classifier.shm_worker` through shared memory.
+
+    `fallback` is a zero-argument factory for an HttpQualityClient or
+    StreamQualityClient; it is only built the first time the worker is
+    missing (not started yet, crashed, stopped heartbeating), and the
+    ring is re-checked every `reattach_s` so a worker started later is
+    picked up.
+    """
+    def __init__(self, name=DEFAULT_NAME, fallback=None, timeout=0.25, stale_ms=250, reattach_s=1.0):
+        self.name = name
+        self.timeout = timeout
+        self.stale_ms = stale_ms
+        self.reattach_s = reattach_s
+        self._fallback_factory = fallback
+        self._fallback = None
+        self._ring = None
+        self._next_attach = 0.0
+
+        self.quality = None
+        self.result_seq = 0
+        self.result_ts = 0.0
+        self._rtt_ms = 0.0
+        self._sent_seq = 0
+        self._sent_at = 0.0
+        self.dropped = 0            # frames overwritten before the worker answered them
+
+    def _live_ring(self):
+        ring = self._ring
+        if ring is not None:
+            if ring.worker_alive():
+                return ring
+            ring.close()
+            self._ring = ring = None
+        now = time.perf_counter()
+        if now < self._next_attach:
+            return None
+        self._next_attach = now + self.reattach_s
+        try:
+            ring = ShmRing.attach(self.name)
+        except (FileNotFoundError, ValueError):
+            return None
+        if not ring.worker_alive():
+            ring.close()
+            return None
+        self._ring = ring
+        return ring
+
+    def fallback(self):
+        if self._fallback is None:
+            if self._fallback_factory is None:
+                raise RuntimeError(f"no shared-memory classifier at {self.name!r} and no fallback")
+            self._fallback = self._fallback_factory()
+        return self._fallback
+
+    @property
+    def connected(self):
+        return self._ring is not None
+
+    @property
+    def rtt_ms(self):
+        if self._ring is None and self._fallback is not None:
+            return self._fallback.rtt_ms if hasattr(self._fallback, "rtt_ms") else 0.0
+        return self._rtt_ms
+
+    # ---- blocking, HttpQualityClient-style ----
+    def predict(self, left21, cached=True):
+        ring = self._live_ring()
+        if ring is not None:
+            t0 = time.perf_counter()
+            seq = ring.publish(left21)
+            deadline = t0 + self.timeout
+            while True:
+                rseq, idx = ring.result()
+                if rseq >= seq:
+                    now = time.perf_counter()
+                    self._rtt_ms = (now - t0) * 1000.0
+                    self.result_seq, self.result_ts = rseq, now
+                    self.quality = QUALITY[idx]
+                    return self.quality
+                if time.perf_counter() > deadline:
+                    break
+                _yield()
+        return self.fallback().predict(left21, cached)
+
+    # ---- non-blocking, StreamQualityClient-style ----
+    def submit(self, left21, cached=True):
+        ring = self._live_ring()
+        if ring is None:
+            return self.fallback().submit(left21, cached)
+        if self._sent_seq > self.result_seq:
+            self.dropped += 1
+        self._sent_seq = ring.publish(left21)
+        self._sent_at = time.perf_counter()
+        return self._sent_seq
+
+    def latest(self):
+        if self._ring is None:
+            return self._fallback.latest() if self._fallback is not None else None
+        rseq, idx = self._ring.result()
+        now = time.perf_counter()
+        if rseq > self.result_seq:
+            if rseq == self._sent_seq:
+                self._rtt_ms = (now - self._sent_at) * 1000.0
+            self.result_seq, self.result_ts = rseq, now
+            self.quality = QUALITY[idx]
+        if self.quality is None or (now - self.result_ts) * 1000.0 > self.stale_ms:
+            return None
+        return self.quality
+
+    def reset(self):
+        # answers up to the last frame published are old news
+        self.result_seq = max(self.result_seq, self._sent_seq)
+        self.quality = None
+        self.result_ts = 0.0
+        if self._fallback is not None:
+            self._fallback.reset()
+
+    def close(self):
+        if self._ring is not None:
+            self._ring.close()
+            self._ring = None
+        if self._fallback is not None:
+            self._fallback.close()
+
+
+class AsyncQualityClient:
+    """
+    StreamQualityClient's non-blocking API over a blocking client.
+
+    One thread calls `client.predict()` on the newest submitted frame;
+    frames submitted while a call is in flight replace each other. Errors
+    are counted and leave the previous answer to go stale.
+    """
+    def __init__(self, client, stale_ms=250):
+        self.client = client
+        self.stale_ms = stale_ms
+        self._cv = threading.Condition()
+        self._frame = None          # (seq, left21, cached) waiting for the worker thread
+        self._seq = 0
+        self._ignore_upto = 0       # results for frames up to this seq are dropped (reset())
+        self._closed = False
+
+        self.quality = None
+        self.result_seq = 0
+        self.result_ts = 0.0
+        self.rtt_ms = 0.0
+        self.dropped = 0            # frames replaced before they were sent
+        self.errors = 0
+
+        self._thread = threading.Thread(target=self._loop, name="quality-rpc", daemon=True)
+        self._thread.start()
+
+    def submit(self, left21, cached=True):
+        with self._cv:
+            self._seq += 1
+            if self._frame is not None:
+                self.dropped += 1
+            self._frame = (self._seq, left21.copy(), cached)
+            self._cv.notify()
+        return self._seq
+
+    def latest(self):
+        if self.quality is None or (time.perf_counter() - self.result_ts) * 1000.0 > self.stale_ms:
+            return None
+        return self.quality
+
+    def reset(self):
+        with self._cv:
+            self._ignore_upto = self._seq
+            self.quality = None
+            self.result_ts = 0.0
+        self.client.reset()
+
+    def _loop(self):
+        while True:
+            with self._cv:
+                while self._frame is None and not self._closed:
+                    self._cv.wait()
+                if self._closed:
+                    return
+                seq, left21, cached = self._frame
+                self._frame = None
+            t0 = time.perf_counter()
+            try:
+                quality = self.client.predict(left21, cached)
+            except Exception as e:
+                self.errors += 1
+                if self.errors == 1 or self.errors % 100 == 0:
+                    print(f"[quality] {type(self.client).__name__}.predict failed ({self.errors}x):", e)
+                continue
+            now = time.perf_counter()
+            self.rtt_ms = (now - t0) * 1000.0
+            with self._cv:
+                if seq > self._ignore_upto:
+                    self.result_seq, self.result_ts, self.quality = seq, now, quality
+
+    def close(self):
+        with self._cv:
+            self._closed = True
+            self._cv.notify_all()
+        self._thread.join(timeout=1.0)
+        self.client.close()
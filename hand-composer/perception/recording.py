@@ -0,0 +1,200 @@
+# Recorded landmark sessions: a compact append-only binary log of what the
+# tracker saw, and a replay tracker that feeds it back into demo/run.py.
+#
+# File layout (little-endian):
+#   header  64 bytes   magic b"HCLM" | u4 version | u4 max_hands | u4 record size | zero pad
+#   records RECORD_DTYPE, back to back
+#
+# Records are fixed size, so a session is simply np.memmap(...)[n] and a
+# file cut short by a crash loses at most the last partial record.
+# `t` never decreases through a file: a take appended to an existing one
+# continues TAKE_GAP_S after its last record.
+
+import os
+import struct
+import time
+import numpy as np
+
+from perf.stats import RateMeter
+
+MAGIC = b"HCLM"
+VERSION = 1
+MAX_HANDS = 2
+HEADER_BYTES = 64
+TAKE_GAP_S = 1.0    # pause left between takes appended to one file
+
+HAND_CODES = {"right": 0, "left": 1}
+HAND_NAMES = {0: "right", 1: "left"}
+NO_HAND = 255
+
+RECORD_DTYPE = np.dtype([
+    ("t", "<f8"),                           # seconds since recording start
+    ("n", "u1"),                            # hands present (rows 0..n-1 valid)
+    ("hand", "u1", (MAX_HANDS,)),           # HAND_CODES per row, NO_HAND if empty
+    ("_pad", "u1", (5,)),
+    ("xyz", "<f4", (MAX_HANDS, 21, 3)),
+])
+
+
+_HEADER = struct.Struct("<4sIII")
+
+
+def _header():
+    return _HEADER.pack(MAGIC, VERSION, MAX_HANDS, RECORD_DTYPE.itemsize).ljust(HEADER_BYTES, b"\0")
+
+
+def _check_header(head, path):
+    if len(head) < HEADER_BYTES or head[:4] != MAGIC:
+        raise ValueError(f"not a landmark recording: {path}")
+    _, version, max_hands, rec_size = _HEADER.unpack_from(head)
+    if version != VERSION or max_hands != MAX_HANDS or rec_size != RECORD_DTYPE.itemsize:
+        raise ValueError(f"unsupported recording format in {path}")
+
+
+class LandmarkRecorder:
+    """
+    Appends one record per tracker frame. A single preallocated record is
+    reused and the OS file buffer does the batching, so leaving this on
+    during a performance costs one small memcpy per frame.
+    """
+    def __init__(self, path, flush_every=300, t0=None, append=True):
+        """
+        t0: perf_counter time that record times count from (default: the first append).
+        append: add to an existing recording, continuing its timeline; False starts the file afresh.
+        """
+        self.path = path
+        self._offset = 0.0      # added to every record's t: where this take starts in the file
+        if append and os.path.exists(path) and os.path.getsize(path) > 0:
+            self.f = open(path, "r+b")
+            _check_header(self.f.read(HEADER_BYTES), path)
+            n = (os.path.getsize(path) - HEADER_BYTES) // RECORD_DTYPE.itemsize
+            self.f.truncate(HEADER_BYTES + n * RECORD_DTYPE.itemsize)   # drop a partial last record
+            if n:
+                self.f.seek(HEADER_BYTES + (n - 1) * RECORD_DTYPE.itemsize)
+                last = np.frombuffer(self.f.read(RECORD_DTYPE.itemsize), dtype=RECORD_DTYPE)
+                self._offset = float(last["t"][0]) + TAKE_GAP_S
+            self.f.seek(0, os.SEEK_END)
+        else:
+            self.f = open(path, "wb")
+            self.f.write(_header())
+        self._rec = np.zeros(1, dtype=RECORD_DTYPE)
+        self._t0 = t0
+        self.flush_every = flush_every
+        self.count = 0
+
+    def append(self, hands, handedness=None, t=None):
+        """hands: (H,21,3) or None; handedness: labels per row ('right'/'left')."""
+        now = time.perf_counter() if t is None else t
+        if self._t0 is None:
+            self._t0 = now
+        r = self._rec[0]
+        r["t"] = self._offset + (now - self._t0)
+        r["hand"][:] = NO_HAND
+        n = 0 if hands is None else min(MAX_HANDS, hands.shape[0])
+        r["n"] = n
+        if n:
+            r["xyz"][:n] = hands[:n]
+            for i in range(n):
+                label = handedness[i] if handedness and i < len(handedness) else None
+                r["hand"][i] = HAND_CODES.get(label, NO_HAND)
+        self.f.write(self._rec.tobytes())
+        self.count += 1
+        if self.count % self.flush_every == 0:
+            self.f.flush()
+
+    def close(self):
+        if not self.f.closed:
+            self.f.close()
+
+
+class LandmarkRecording:
+    """Read-only memory-mapped view of a recorded session."""
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            head = f.read(HEADER_BYTES)
+        _check_header(head, path)
+        n = (os.path.getsize(path) - HEADER_BYTES) // RECORD_DTYPE.itemsize
+        self.records = np.memmap(path, dtype=RECORD_DTYPE, mode="r",
+                                 offset=HEADER_BYTES, shape=(n,)) if n else np.zeros(0, RECORD_DTYPE)
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def t(self):
+        return self.records["t"]
+
+    @property
+    def duration(self):
+        return float(self.records["t"][-1]) if len(self) else 0.0
+
+    def hands(self, i):
+        """-> ((H,21,3) float32 or None, [handedness labels]) for record i."""
+        r = self.records[i]
+        n = int(r["n"])
+        if n == 0:
+            return None, []
+        return np.array(r["xyz"][:n]), [HAND_NAMES.get(int(c), "?") for c in r["hand"][:n]]
+
+    def as_arrays(self):
+        """Whole session as (T,), (T,), (T,MAX_HANDS), (T,MAX_HANDS,21,3) views - no copy."""
+        r = self.records
+        return r["t"], r["n"], r["hand"], r["xyz"]
+
+
+class ReplayTracker:
+    """
+    Drop-in HandTracker replacement that plays back a LandmarkRecording.
+
+    realtime=True waits out the recorded inter-frame gaps (scaled by
+    `speed`); realtime=False returns frames as fast as they are asked for.
+    grab() returns an opaque token that process() turns into a frame.
+    """
+    def __init__(self, path, realtime=True, speed=1.0, loop=False, size=(1280, 720)):
+        self.rec = LandmarkRecording(path)
+        self.realtime = realtime
+        self.speed = speed
+        self.loop = loop
+        self.w, self.h = size
+        self.handedness = []
+        self._i = 0
+        self._t_start = None
+        self._canvas = np.zeros((self.h, self.w, 3), dtype=np.uint8)
+        self.fps_meter = RateMeter(30)
+
+    def grab(self):
+        if self._i >= len(self.rec):
+            if not self.loop or len(self.rec) == 0:
+                return None
+            self._i = 0
+            self._t_start = None
+        i = self._i
+        self._i += 1
+        if self.realtime:
+            now = time.perf_counter()
+            if self._t_start is None:
+                self._t_start = now - self.rec.t[i] / self.speed
+            delay = self._t_start + self.rec.t[i] / self.speed - now
+            if delay > 0:
+                time.sleep(delay)
+        return i
+
+    def process(self, i):
+        import cv2
+        hands, self.handedness = self.rec.hands(i)
+        frame = self._canvas.copy()
+        if hands is not None:
+            for hand in hands:
+                for x, y, _ in hand:
+                    cv2.circle(frame, (int(x * self.w), int(y * self.h)), 4, (0, 255, 0), -1)
+        return frame, hands
+
+    def read(self):
+        i = self.grab()
+        if i is None:
+            return None, None, 0.0
+        frame, hands = self.process(i)
+        return frame, hands, self.fps_meter.tick()
+
+    def release(self):
+        pass
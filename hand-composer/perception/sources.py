@@ -0,0 +1,58 @@
+# Frame sources for HandTracker. Anything with read() -> BGR frame | None
+# and release() works; these cover the live camera and video files.
+# Recorded landmark streams (no frames at all) live in perception/recording.py.
+
+import time
+import cv2
+
+
+class CameraSource:
+    def __init__(self, index=0, width=1280, height=720):
+        self.cap = cv2.VideoCapture(index)
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH,  width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+
+    def read(self):
+        ok, frame = self.cap.read()
+        return frame if ok else None
+
+    def release(self):
+        self.cap.release()
+
+
+class VideoFileSource:
+    """
+    Plays a video file through the tracker. realtime=True paces frames at
+    the file's own fps (like a camera would); False delivers them as fast
+    as they can be decoded.
+    """
+    def __init__(self, path, realtime=True, loop=False):
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise IOError(f"cannot open video: {path}")
+        fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.period = 1.0 / fps
+        self.realtime = realtime
+        self.loop = loop
+        self._next_t = None
+
+    def read(self):
+        ok, frame = self.cap.read()
+        if not ok and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self.cap.read()
+        if not ok:
+            return None
+        if self.realtime:
+            now = time.perf_counter()
+            if self._next_t is None:
+                self._next_t = now
+            delay = self._next_t - now
+            if delay > 0:
+                time.sleep(delay)
+            self._next_t = max(self._next_t + self.period, now - self.period)
+        return frame
+
+    def release(self):
+        self.cap.release()
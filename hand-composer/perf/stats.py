@@ -0,0 +1,120 @@
+# Lightweight latency / size statistics shared by the server and the demo.
+
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+# bucket upper bounds (ms) that cover sub-ms inference up to a stalled frame
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 50, 100, 250, 1000)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram (Prometheus style: cumulative `le` buckets on export).
+    observe() is O(log buckets) and thread-safe.
+    """
+    def __init__(self, name, buckets=LATENCY_BUCKETS_MS):
+        self.name = name
+        self.bounds = np.asarray(buckets, dtype=np.float64)
+        self._counts = np.zeros(len(buckets) + 1, dtype=np.int64)  # last = +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value, n=1):
+        i = int(np.searchsorted(self.bounds, value, side="left"))
+        with self._lock:
+            self._counts[i] += n
+            self._sum += float(value) * n
+            self._count += n
+
+    def quantile(self, q):
+        """Bucket-interpolated quantile estimate (q in [0..1])."""
+        with self._lock:
+            counts = self._counts.copy()
+            total = self._count
+        if total == 0:
+            return 0.0
+        target = q * total
+        cum = np.cumsum(counts)
+        i = int(np.searchsorted(cum, target, side="left"))
+        if i >= len(self.bounds):
+            return float(self.bounds[-1])
+        lo = 0.0 if i == 0 else float(self.bounds[i - 1])
+        hi = float(self.bounds[i])
+        prev = 0 if i == 0 else int(cum[i - 1])
+        frac = (target - prev) / max(1, counts[i])
+        return float(lo + (hi - lo) * frac)
+
+    def snapshot(self):
+        with self._lock:
+            counts = self._counts.tolist()
+            s, n = self._sum, self._count
+        return {
+            "name": self.name,
+            "count": n,
+            "sum": s,
+            "mean": s / n if n else 0.0,
+            "buckets": dict(zip([*map(float, self.bounds), "+Inf"], counts)),
+            "p50": self.quantile(0.50),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+    def reset(self):
+        with self._lock:
+            self._counts[:] = 0
+            self._sum = 0.0
+            self._count = 0
+
+    def prometheus(self, metric, help_text="", scale=1.0, labels=None, header=True):
+        """
+        Prometheus text-format lines for this histogram. `scale` converts the
+        recorded unit on export (e.g. 0.001 for ms -> seconds); header=False
+        for the 2nd+ label set of the same metric.
+        """
+        with self._lock:
+            counts = self._counts.copy()
+            s, n = self._sum, self._count
+        base = _labels(labels)
+        sep = base[:-1] + "," if base else "{"
+        lines = [f"# HELP {metric} {help_text or self.name}", f"# TYPE {metric} histogram"] if header else []
+        for bound, c in zip([*(f"{b * scale:g}" for b in self.bounds), "+Inf"], np.cumsum(counts)):
+            lines.append(f'{metric}_bucket{sep}le="{bound}"}} {int(c)}')
+        lines.append(f"{metric}_sum{base} {s * scale:.9g}")
+        lines.append(f"{metric}_count{base} {n}")
+        return lines
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+
+def prometheus_metric(metric, kind, help_text, samples):
+    """Counter / gauge lines; `samples` is [(labels dict or None, value), ...]."""
+    lines = [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+    for labels, value in samples:
+        lines.append(f"{metric}{_labels(labels)} {value:.9g}")
+    return lines
+
+
+class RateMeter:
+    """Events per second over the last `window` ticks (steadier than 1 / last interval)."""
+    def __init__(self, window=30):
+        self._t = deque(maxlen=window)
+
+    def tick(self, t=None):
+        self._t.append(time.perf_counter() if t is None else t)
+        return self.rate
+
+    @property
+    def rate(self):
+        if len(self._t) < 2:
+            return 0.0
+        span = self._t[-1] - self._t[0]
+        return (len(self._t) - 1) / span if span > 0 else 0.0
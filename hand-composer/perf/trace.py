@@ -0,0 +1,180 @@
+# Stage tracer: per-stage durations in fixed-size ring buffers.
+#
+# Off by default. While disabled, start() returns 0.0 and stop() returns on
+# its first check, so call sites can stay in the hot paths permanently:
+#
+#   from perf import trace
+#   t0 = trace.start()
+#   ...work...
+#   trace.stop("mediapipe", t0)
+#
+#   with trace.span("render"):   # same thing, for less hot code
+#       ...
+#
+# trace.enable() turns recording on; summary() gives rolling percentiles
+# over the last RING_SIZE samples of each stage, overlay_lines() formats
+# them for the HUD and dump(path) writes them (plus raw samples) as JSON.
+
+import json
+import threading
+import time
+
+import numpy as np
+
+RING_SIZE = 1024
+# display order for the overlay; other names are shown after these
+STAGES = ("capture", "mediapipe", "smoothing", "classifier", "chord_map", "midi_send", "render")
+
+_enabled = False
+_rings = {}
+_rings_lock = threading.Lock()
+
+
+class Ring:
+    """Last `size` (end time, duration ms) samples of one stage."""
+    def __init__(self, name, size=RING_SIZE):
+        self.name = name
+        self.size = size
+        self._ms = np.zeros(size, dtype=np.float64)
+        self._t = np.zeros(size, dtype=np.float64)
+        self._n = 0              # total samples ever recorded
+        self._lock = threading.Lock()
+
+    def add(self, ms, t):
+        with self._lock:
+            i = self._n % self.size
+            self._ms[i] = ms
+            self._t[i] = t
+            self._n += 1
+
+    def samples(self):
+        """(end times, durations) of the retained samples, oldest first."""
+        with self._lock:
+            n = self._n
+            if n <= self.size:
+                return self._t[:n].copy(), self._ms[:n].copy()
+            i = n % self.size
+            return np.roll(self._t, -i), np.roll(self._ms, -i)
+
+    @property
+    def count(self):
+        return self._n
+
+    def summary(self):
+        t, ms = self.samples()
+        if not len(ms):
+            return {"count": 0}
+        p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+        span = t[-1] - t[0]
+        return {
+            "count": self._n,
+            "window": len(ms),
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+            "max_ms": float(ms.max()),
+            "rate_hz": (len(ms) - 1) / span if span > 0 else 0.0,
+        }
+
+
+def enable(on=True):
+    global _enabled
+    _enabled = bool(on)
+
+
+def enabled():
+    return _enabled
+
+
+def ring(name):
+    r = _rings.get(name)
+    if r is None:
+        with _rings_lock:
+            r = _rings.setdefault(name, Ring(name))
+    return r
+
+
+def start():
+    """Timestamp to hand to stop(); 0.0 while tracing is off."""
+    return time.perf_counter() if _enabled else 0.0
+
+
+def stop(name, t0):
+    """Record the time since `t0` (from start()) under stage `name`."""
+    if not t0:
+        return
+    t = time.perf_counter()
+    ring(name).add((t - t0) * 1000.0, t)
+
+
+def record(name, ms):
+    """Record a duration measured elsewhere."""
+    if _enabled:
+        ring(name).add(ms, time.perf_counter())
+
+
+class _Span:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = start()
+        return self
+
+    def __exit__(self, *exc):
+        stop(self.name, self.t0)
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name):
+    return _Span(name) if _enabled else _NO_SPAN
+
+
+def reset():
+    with _rings_lock:
+        _rings.clear()
+
+
+def _ordered():
+    names = [n for n in STAGES if n in _rings]
+    return names + sorted(n for n in _rings if n not in STAGES)
+
+
+def summary():
+    return {name: _rings[name].summary() for name in _ordered()}
+
+
+def overlay_lines(per_line=4):
+    """HUD text: 'stage p50/p95 ms' for every stage seen so far."""
+    cells = []
+    for name, s in summary().items():
+        if s["count"]:
+            cells.append(f"{name} {s['p50_ms']:.2f}/{s['p95_ms']:.2f}")
+    if not cells:
+        return ["trace: no samples yet"]
+    lines = ["trace p50/p95 ms: " + " | ".join(cells[:per_line])]
+    for i in range(per_line, len(cells), per_line):
+        lines.append("    " + " | ".join(cells[i:i + per_line]))
+    return lines
+
+
+def dump(path, raw=True):
+    """Write summary (and the retained samples unless raw=False) as JSON."""
+    out = {"time": time.time(), "ring_size": RING_SIZE, "stages": summary()}
+    if raw:
+        out["samples_ms"] = {name: _rings[name].samples()[1].round(4).tolist() for name in _ordered()}
+    with open(path, "w") as f:
+        json.dump(out, f, indent=1)
+    return path
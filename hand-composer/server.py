@@ -1,32 +1,407 @@
+# Quality classifier service.
+#
+#   uvicorn server:app                  one process
+#   python -m server --workers 4        N processes on one listening socket;
+#                                       weights are loaded once, before forking
+#
+# Requests go through an async path into the micro-batcher, whose fixed pool
+# of HC_INFER_WORKERS threads runs the model. /predict and /predict_batch
+# are admission-controlled: beyond HC_MAX_INFLIGHT concurrent requests the
+# server answers 503 at once instead of queueing, and a request whose
+# deadline (HC_DEADLINE_MS, or the client's X-Deadline-Ms header) passes
+# before it is answered gets 503 too, without its row being computed.
+
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import threading
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Optional
+
 import numpy as np
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
-import torch, torch.nn as nn, torch.nn.functional as F
 
-class SimpleMLP(nn.Module):
-    def __init__(self, in_dim=63, hidden=64, out_dim=3):
-        super().__init__()
-        self.fc1 = nn.Linear(in_dim, hidden)
-        self.fc2 = nn.Linear(hidden, hidden)
-        self.fc3 = nn.Linear(hidden, out_dim)
-    def forward(self, x):
-        x = F.relu(self.fc1(x)); x = F.relu(self.fc2(x)); return self.fc3(x)
+from classifier.backends import make_backend
+from classifier.batcher import DeadlineExceeded, MicroBatcher
+from classifier.cache import PredictionCache, Hysteresis, normalize_pose
+from classifier.protocol import QUALITY, pack_result, unpack_frame
+from perf.stats import Histogram, prometheus_metric
+
+
+def _default_device():
+    try:
+        import torch
+    except ImportError:
+        return "cpu"
+    return "cuda" if torch.cuda.is_available() else "cpu"  # ROCm shows as 'cuda'
+
+
+@dataclass
+class Settings:
+    """Server knobs, overridable through HC_* environment variables."""
+    batch_max_size: int = 32        # rows per forward pass
+    batch_max_wait_ms: float = 2.0  # latency cap a request may wait for company
+    backend: str = "torch"          # torch | torchscript | compile | int8 | numpy
+    weights: str = ""               # .npz / .pt trained weights; empty = random init
+    device: str = "auto"            # auto | cpu | cuda (torch backends)
+    threads: int = 1                # torch intra-op threads
+    cache_size: int = 4096          # LRU entries of quantized poses; 0 = no cache
+    cache_quant: float = 0.1        # quantization step, in hand-size units
+    hysteresis: float = 0.05        # /stream: reuse last result below this motion; 0 = off
+    warm_start: bool = True         # answer via NumPy while a torch backend imports / warms up
+    infer_workers: int = 1          # inference threads behind the batcher
+    max_inflight: int = 64          # concurrent /predict(_batch) requests before 503; 0 = unlimited
+    deadline_ms: float = 250.0      # default per-request deadline; 0 = none
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            batch_max_size=int(os.getenv("HC_BATCH_MAX_SIZE", cls.batch_max_size)),
+            batch_max_wait_ms=float(os.getenv("HC_BATCH_MAX_WAIT_MS", cls.batch_max_wait_ms)),
+            backend=os.getenv("HC_BACKEND", cls.backend),
+            weights=os.getenv("HC_WEIGHTS", cls.weights),
+            device=os.getenv("HC_DEVICE", cls.device),
+            threads=int(os.getenv("HC_THREADS", cls.threads)),
+            cache_size=int(os.getenv("HC_CACHE_SIZE", cls.cache_size)),
+            cache_quant=float(os.getenv("HC_CACHE_QUANT", cls.cache_quant)),
+            hysteresis=float(os.getenv("HC_HYSTERESIS", cls.hysteresis)),
+            warm_start=os.getenv("HC_WARM_START", "1" if cls.warm_start else "0") not in ("0", "false", ""),
+            infer_workers=int(os.getenv("HC_INFER_WORKERS", cls.infer_workers)),
+            max_inflight=int(os.getenv("HC_MAX_INFLIGHT", cls.max_inflight)),
+            deadline_ms=float(os.getenv("HC_DEADLINE_MS", cls.deadline_ms)),
+        )
+
+
+settings = Settings.from_env()
+shared_weights = None   # (state, meta) loaded by the launcher before forking workers
+
+def _weights():
+    return shared_weights or settings.weights or None
+
+def load_backend():
+    """The configured backend, warmed up. Torch ones take seconds (import, JIT), so this may run on a thread."""
+    if settings.device == "auto":
+        settings.device = "cpu" if settings.backend in ("numpy", "int8") else _default_device()
+    # numpy backend: no torch import anywhere in the serving path
+    return make_backend(settings.backend, _weights(),
+                        device=settings.device, threads=settings.threads, warmup=True)
+
+backend = None          # set in lifespan(); may be swapped once the configured one is warm
+backend_ready = threading.Event()
+batcher = MicroBatcher(None, max_batch=settings.batch_max_size,
+                       max_wait_ms=settings.batch_max_wait_ms, workers=settings.infer_workers)
+
+def use_backend(b):
+    global backend
+    backend = b
+    batcher.infer_fn = b.predict  # picked up by the next batch
+cache = PredictionCache(settings.cache_size, settings.cache_quant) if settings.cache_size else None
+
+# /metrics counters: requests (stream: frames answered) and poses classified, per endpoint
+ENDPOINTS = ("predict", "predict_batch", "stream")
+requests_total = dict.fromkeys(ENDPOINTS, 0)
+rows_total = dict.fromkeys(ENDPOINTS, 0)
+request_ms = {e: Histogram(f"{e}_request_ms") for e in ENDPOINTS}
+
+def count(endpoint, rows, t0):
+    requests_total[endpoint] += 1
+    rows_total[endpoint] += rows
+    request_ms[endpoint].observe((time.perf_counter() - t0) * 1000.0)
+
+# admission control (event loop thread only, so plain ints)
+LIMITED = ("/predict", "/predict_batch")
+inflight = 0
+shed_total = {"overload": 0, "deadline": 0}
+
+class Admission:
+    """
+    ASGI middleware: answer 503 before the body is even read when
+    max_inflight requests are already being served. The websocket is not
+    limited here; each connection has at most one frame in flight anyway.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global inflight
+        if scope["type"] != "http" or scope["path"] not in LIMITED:
+            return await self.app(scope, receive, send)
+        if settings.max_inflight and inflight >= settings.max_inflight:
+            shed_total["overload"] += 1
+            await send({"type": "http.response.start", "status": 503,
+                        "headers": [(b"content-type", b"application/json"), (b"retry-after", b"1")]})
+            await send({"type": "http.response.body", "body": b'{"detail":"overloaded"}'})
+            return
+        inflight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            inflight -= 1
 
-QUALITY = ["min", "maj", "7"]
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")  # ROCm shows as 'cuda'
-model = SimpleMLP().to(device).eval()
+def deadline_of(t0, header_ms):
+    """perf_counter deadline from the X-Deadline-Ms header or HC_DEADLINE_MS; None = no deadline."""
+    ms = settings.deadline_ms if header_ms is None else header_ms
+    return t0 + ms / 1000.0 if ms and ms > 0 else None
+
+async def answer(fut, deadline):
+    """Await a batcher Future, giving up (and cancelling it) at the deadline."""
+    try:
+        if deadline is None:
+            return await asyncio.wrap_future(fut)
+        return await asyncio.wait_for(asyncio.wrap_future(fut), max(0.0, deadline - time.perf_counter()))
+    except (DeadlineExceeded, asyncio.TimeoutError):
+        shed_total["deadline"] += 1
+        raise HTTPException(503, "deadline exceeded", headers={"Retry-After": "0"})
+
+async def classify(arr, hyst=None, deadline=None):
+    """One (63,) pose -> class index: hysteresis, then cache, then the batcher."""
+    if cache is None and hyst is None:
+        return await answer(batcher.submit(arr, deadline), deadline)
+    if cache is not None:
+        norm, key = cache.key(arr)
+    else:
+        norm, key = normalize_pose(arr), None
+    if hyst is not None:
+        idx = hyst.check(norm)
+        if idx is not None:
+            return idx
+    idx = cache.get(key) if cache is not None else None
+    if idx is None:
+        idx = await answer(batcher.submit(arr, deadline), deadline)
+        if cache is not None:
+            cache.put(key, idx)
+    if hyst is not None:
+        hyst.update(norm, idx)
+    return idx
 
 class Landmarks(BaseModel):
     left21: list  # 21 items, each [x,y,z]
 
-app = FastAPI()
+class LandmarksBatch(BaseModel):
+    hands: list  # N items, each 21 x [x,y,z]
+
+@asynccontextmanager
+async def lifespan(app):
+    interim = (settings.warm_start and settings.backend != "numpy"
+               and not settings.weights.endswith((".pt", ".pth")))  # torch state_dicts need torch to read
+    if interim:
+        # same weights through NumPy: right answers from the first request, and the
+        # torch import / tracing happens on a thread instead of before we listen
+        use_backend(make_backend("numpy", _weights(), warmup=True))
+
+        def swap():
+            t0 = time.perf_counter()
+            try:
+                use_backend(load_backend())
+                backend_ready.set()
+                print(f"[server] {backend.name} backend ready after {time.perf_counter() - t0:.1f} s")
+            except Exception as e:
+                print("[server] backend failed, staying on numpy:", e)
+        threading.Thread(target=swap, name="backend-load", daemon=True).start()
+    else:
+        use_backend(load_backend())
+        backend_ready.set()
+    batcher.start()
+    yield
+    batcher.close()
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(Admission)
 
-@torch.inference_mode()
 @app.post("/predict")
-def predict(payload: Landmarks):
+async def predict(payload: Landmarks, x_deadline_ms: Optional[float] = Header(None)):
+    t0 = time.perf_counter()
     arr = np.array(payload.left21, dtype="float32").reshape(-1)  # 63
-    x = torch.from_numpy(arr).to(device).unsqueeze(0)
-    logits = model(x)
-    idx = int(torch.argmax(logits, dim=1))
+    idx = await classify(arr, deadline=deadline_of(t0, x_deadline_ms))
+    count("predict", 1, t0)
     return {"quality": QUALITY[idx]}
 
+@app.post("/predict_batch")
+async def predict_batch(payload: LandmarksBatch, x_deadline_ms: Optional[float] = Header(None)):
+    t0 = time.perf_counter()
+    deadline = deadline_of(t0, x_deadline_ms)
+    arr = np.array(payload.hands, dtype="float32").reshape(-1, 63)  # (N, 63)
+    if cache is None:
+        idx = await answer(batcher.submit_many(arr, deadline), deadline)
+        count("predict_batch", len(arr), t0)
+        return {"qualities": [QUALITY[i] for i in idx]}
+    keys = [cache.key(row)[1] for row in arr]
+    idx = [cache.get(k) for k in keys]
+    miss = [i for i, v in enumerate(idx) if v is None]
+    if miss:
+        out = await answer(batcher.submit_many(arr[miss], deadline), deadline)
+        for i, v in zip(miss, out):
+            idx[i] = int(v)
+            cache.put(keys[i], idx[i])
+    count("predict_batch", len(arr), t0)
+    return {"qualities": [QUALITY[i] for i in idx]}
+
+@app.get("/stats")
+def stats():
+    return {"settings": vars(settings), "backend": backend.name, "backend_ready": backend_ready.is_set(),
+            "pid": os.getpid(), "inflight": inflight, "shed": dict(shed_total),
+            "cache": cache.stats() if cache is not None else None, **batcher.stats()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text format. Rates come from the counters (rate(hc_requests_total[1m]))."""
+    lines = prometheus_metric("hc_requests_total", "counter", "requests answered (stream: frames)",
+                              [({"endpoint": e}, n) for e, n in requests_total.items()])
+    lines += prometheus_metric("hc_poses_total", "counter", "poses classified",
+                               [({"endpoint": e}, n) for e, n in rows_total.items()])
+    for i, e in enumerate(ENDPOINTS):
+        lines += request_ms[e].prometheus("hc_request_seconds", "request latency incl. queueing",
+                                          scale=0.001, labels={"endpoint": e}, header=i == 0)
+    lines += batcher.batch_size_hist.prometheus("hc_batch_size", "rows per model forward pass")
+    lines += batcher.queue_wait_hist.prometheus("hc_batch_queue_wait_seconds", "time a row waited for its batch",
+                                                scale=0.001)
+    lines += batcher.infer_hist.prometheus("hc_inference_seconds", "model forward pass per batch",
+                                           scale=0.001)
+    lines += prometheus_metric("hc_inflight_requests", "gauge", "admitted /predict(_batch) requests being served",
+                               [(None, inflight)])
+    lines += prometheus_metric("hc_shed_total", "counter", "requests answered 503 (overload: not admitted, "
+                               "deadline: not answered in time)", [({"reason": r}, n) for r, n in shed_total.items()])
+    lines += prometheus_metric("hc_backend_ready", "gauge", "configured backend loaded (0 = interim numpy)",
+                               [(None, int(backend_ready.is_set()))])
+    if cache is not None:
+        c = cache.stats()
+        lines += prometheus_metric("hc_cache_lookups_total", "counter", "prediction cache lookups",
+                                   [({"result": "hit"}, c["hits"]), ({"result": "miss"}, c["misses"])])
+        lines += prometheus_metric("hc_cache_entries", "gauge", "prediction cache size", [(None, c["size"])])
+    return "\n".join(lines) + "\n"
+
+@app.websocket("/stream")
+async def stream(ws: WebSocket):
+    """
+    Long-lived binary channel (see classifier/protocol.py). Only the newest
+    frame is classified: frames that arrive while one is in flight replace
+    each other, so a slow round-trip never builds a backlog.
+    """
+    await ws.accept()
+    latest = None
+    ready = asyncio.Event()
+    hyst = Hysteresis(settings.hysteresis) if settings.hysteresis > 0 else None  # per performer
+
+    async def infer_loop():
+        while True:
+            await ready.wait()
+            ready.clear()
+            seq, arr = latest
+            t0 = time.perf_counter()
+            try:
+                idx = await classify(arr, hyst)
+            except Exception as e:
+                # a dead loop would leave the client waiting on an open socket forever:
+                # close with an error instead (the client reconnects)
+                print("[server] stream classify failed, closing:", repr(e))
+                try:
+                    await ws.close(code=1011, reason="classify failed")
+                except Exception:
+                    pass
+                return
+            await ws.send_bytes(pack_result(seq, idx))
+            count("stream", 1, t0)
+
+    task = asyncio.create_task(infer_loop())
+    try:
+        while True:
+            data = await ws.receive_bytes()
+            try:
+                latest = unpack_frame(data)
+            except ValueError:
+                continue  # malformed frame; keep the channel open
+            ready.set()
+    except (WebSocketDisconnect, RuntimeError):
+        pass  # client went away, or infer_loop closed the socket
+    finally:
+        task.cancel()
+
+# ---- multi-process launcher ----
+def listen_socket(host, port, backlog=2048):
+    # created with an explicit IPPROTO_TCP: asyncio only turns on TCP_NODELAY for
+    # accepted connections when the listener says so, and without it Nagle +
+    # delayed ACK add ~40 ms to small responses
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+def _serve(sock, log_level):
+    import uvicorn
+    config = uvicorn.Config(app, log_level=log_level, timeout_graceful_shutdown=2)
+    uvicorn.Server(config).run(sockets=[sock])
+
+def main(argv=None):
+    global shared_weights
+    p = argparse.ArgumentParser(description="quality classifier service")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8000)
+    p.add_argument("--workers", type=int, default=1, help="server processes sharing the socket and the weights")
+    p.add_argument("--log-level", default="warning")
+    args = p.parse_args(argv)
+
+    sock = listen_socket(args.host, args.port)
+    if args.workers <= 1 or not hasattr(os, "fork"):
+        _serve(sock, args.log_level)
+        return
+    if settings.weights.endswith(".npz"):
+        # read once here; forked workers share these pages copy-on-write and only read them
+        from classifier.weights import load_weights
+        shared_weights = load_weights(settings.weights)
+    # nothing heavy (torch, threads) may start in this process before forking
+    children = {}
+    stopping = False
+
+    def spawn(slot):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            code = 0
+            try:
+                _serve(sock, args.log_level)
+            except BaseException:
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = slot
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+    for slot in range(args.workers):
+        spawn(slot)
+    print(f"[server] {args.workers} workers on http://{args.host}:{args.port}", flush=True)
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        slot = children.pop(pid, None)
+        if slot is not None and not stopping:
+            print(f"[server] worker {pid} exited ({status}), restarting", flush=True)
+            time.sleep(0.5)
+            spawn(slot)
+    sock.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,11 @@
+import time
+import cv2
 import pygame
 import numpy as np
 
+from perf import trace
+from perf.stats import Histogram
+
 class HUD:
     def __init__(self, width=960, height=540):
         pygame.init()
@@ -10,31 +15,72 @@ class HUD:
         self.font = pygame.font.SysFont("Arial", 20)
         self.clock = pygame.time.Clock()
 
-    def _frame_to_surface(self, frame_bgr):
-        if frame_bgr is None:
-            return None
-        frame_rgb = frame_bgr[:, :, ::-1]
-        h, w, _ = frame_rgb.shape
-        surf = pygame.image.frombuffer(frame_rgb.tobytes(), (w, h), "RGB")
-        # scale to fit width
-        new_h = int(self.w * h / w)
-        surf = pygame.transform.smoothscale(surf, (self.w, new_h))
-        # center vertically (letterbox)
-        canvas = pygame.Surface((self.w, self.h))
-        canvas.fill((10,10,12))
-        y0 = max(0, (self.h - new_h) // 2)
-        canvas.blit(surf, (0, y0))
-        return canvas
+        # video path, (re)built when the incoming frame size changes
+        self._src_shape = None
+        self._small = None       # preallocated resize target, shared with _video
+        self._video = None       # Surface viewing _small's memory (no per-frame copy)
+        self._rgb = None         # only used if pygame can't read BGR directly
+        self._x0 = self._y0 = 0
+        self._bars = []
+
+        self._text = {}          # line slot -> (string, rendered Surface)
+        self.frame_ms = Histogram("hud_frame_ms")
+
+    def _layout(self, shape):
+        h, w = shape[:2]
+        # scale to fit inside the window keeping aspect, center on both axes
+        # (letterbox or pillarbox)
+        scale = min(self.w / w, self.h / h)
+        new_w = max(1, min(self.w, int(w * scale)))
+        new_h = max(1, min(self.h, int(h * scale)))
+        self._x0 = (self.w - new_w) // 2
+        self._y0 = (self.h - new_h) // 2
+        self._small = np.empty((new_h, new_w, 3), dtype=np.uint8)
+        try:
+            self._video = pygame.image.frombuffer(self._small, (new_w, new_h), "BGR")
+            self._rgb = None
+        except ValueError:
+            # older pygame: convert into a second persistent buffer instead
+            self._rgb = np.empty_like(self._small)
+            self._video = pygame.image.frombuffer(self._rgb, (new_w, new_h), "RGB")
+        x1, y1 = self._x0 + new_w, self._y0 + new_h
+        self._bars = [pygame.Rect(0, 0, self.w, self._y0),
+                      pygame.Rect(0, y1, self.w, self.h - y1),
+                      pygame.Rect(0, self._y0, self._x0, new_h),
+                      pygame.Rect(x1, self._y0, self.w - x1, new_h)]
+        self._src_shape = shape
+        self.screen.fill((10,10,12))
+
+    def _blit_frame(self, frame_bgr):
+        if frame_bgr.shape != self._src_shape:
+            self._layout(frame_bgr.shape)
+        # resize straight into the buffer the video Surface reads from
+        cv2.resize(frame_bgr, (self._small.shape[1], self._small.shape[0]), dst=self._small,
+                   interpolation=cv2.INTER_AREA)
+        if self._rgb is not None:
+            cv2.cvtColor(self._small, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        for r in self._bars:
+            if r.w > 0 and r.h > 0:
+                self.screen.fill((10,10,12), r)
+        self.screen.blit(self._video, (self._x0, self._y0))
+
+    def _text_surface(self, slot, s):
+        cached = self._text.get(slot)
+        if cached is not None and cached[0] == s:
+            return cached[1]
+        surf = self.font.render(s, True, (255,255,255))
+        self._text[slot] = (s, surf)
+        return surf
 
     def draw(self, frame_bgr, chord_label, bpm, velocity, fps_cam, infer_ms, extra_lines=None):
         # NOTE: we DON'T consume pygame events here; demo.run handles them.
-        cam = self._frame_to_surface(frame_bgr)
-        if cam is None:
+        t0 = time.perf_counter()
+        if frame_bgr is None:
             self.screen.fill((10,10,12))
         else:
-            self.screen.blit(cam, (0,0))
+            self._blit_frame(frame_bgr)
 
-        # overlay HUD text
+        # overlay HUD text (re-rendered only when a line's text changes)
         lines = [
             f"Chord: {chord_label}",
             f"BPM: {bpm}    Velocity: {velocity}",
@@ -44,14 +90,23 @@ class HUD:
             lines.extend(extra_lines)
 
         y = 10
-        for s in lines:
-            surf = self.font.render(s, True, (255,255,255))
-            self.screen.blit(surf, (12, y))
+        for i, s in enumerate(lines):
+            self.screen.blit(self._text_surface(i, s), (12, y))
             y += 24
 
         pygame.display.flip()
+        ms = (time.perf_counter() - t0) * 1000.0
+        self.frame_ms.observe(ms)
+        trace.record("render", ms)
         self.clock.tick(60)
         return True
 
+    def stats(self):
+        return {
+            "frame_p50_ms": self.frame_ms.quantile(0.50),
+            "frame_p95_ms": self.frame_ms.quantile(0.95),
+            "text_cached": len(self._text),
+        }
+
     def quit(self):
         pygame.quit()